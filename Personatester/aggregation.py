@@ -0,0 +1,148 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+# Statistics aggregate_metrics computes for every metric column; the first eight are describe()'s
+STATISTICS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max", "median", "var"]
+DESCRIBE_STATISTICS = STATISTICS[:8]
+
+# Metric groups in the order each report lists them
+COMPARISON_GROUPS = ("sus", "tlx_overall", "tlx_subscale", "performance")
+SUMMARY_GROUPS = ("sus", "tlx_overall", "performance", "tlx_subscale")
+TLX_GROUPS = ("tlx_overall", "tlx_subscale")
+
+def _paired_metric(group, stem, comparison_label, summary_label, tlx_label=None):
+    return {"group": group, "original": f"Original_{stem}", "adaptive": f"Adaptive_{stem}",
+            "comparison_label": comparison_label, "summary_label": summary_label, "tlx_label": tlx_label}
+
+def build_metric_registry(df, numeric_cols_from_main, tlx_subscales_list):
+    """Every paired Original/Adaptive metric the reports cover, with its label in each report.
+
+    Args:
+        df: Per-persona frame with the composite scores (see analysis.add_composite_scores)
+        numeric_cols_from_main: Numeric metric columns from main (performance metrics are taken from these)
+        tlx_subscales_list: TLX subscale names
+
+    Returns:
+        list: One dict per metric with both columns in `df`: group, original, adaptive and the
+              comparison_label, summary_label and tlx_label (None if not in the TLX statistics)
+    """
+    registry = [
+        _paired_metric("sus", "SUS_Score", "SUS Score", "SUS Score"),
+        _paired_metric("tlx_overall", "TLX_Overall", "Overall TLX Score", "TLX Overall", "Overall TLX"),
+    ]
+    for subscale in tlx_subscales_list:
+        registry.append(_paired_metric("tlx_subscale", f"TLX_{subscale}", f"TLX {subscale}",
+                                       f"TLX {subscale.replace('_', ' ').title()}", subscale))
+    performance_stems = {col.replace("Original_", "", 1) for col in numeric_cols_from_main
+                         if col.startswith(("Original_Time_", "Original_Errors_"))}
+    for stem in sorted(performance_stems):
+        label = stem.replace("_", " ").title()
+        registry.append(_paired_metric("performance", stem, label, label))
+    return [metric for metric in registry if metric["original"] in df.columns and metric["adaptive"] in df.columns]
+
+def metrics_in_groups(registry, groups):
+    """Registry entries of the given groups, in that group order."""
+    return [metric for group in groups for metric in registry if metric["group"] == group]
+
+def _column_means(values):
+    """NaN-skipping mean of each column of a 2-D float array (NaN for an empty column)."""
+    present = ~np.isnan(values)
+    count = present.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, np.where(present, values, 0.0).sum(axis=0) / count, np.nan), present, count
+
+def aggregate_metrics(df, columns):
+    """Compute every statistic in STATISTICS for every column in one pass over the numeric block.
+
+    Each statistic is one NumPy reduction over all columns at once (column-major, so the sums
+    match pandas' per-column results), instead of a separate .mean()/.std()/... scan per column
+    and report.
+
+    Returns:
+        pd.DataFrame: STATISTICS as the index, one column per (distinct) input column
+    """
+    columns = list(dict.fromkeys(columns))
+    values = np.asfortranarray(df[columns].to_numpy(dtype=float))
+    mean, present, count = _column_means(values)
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN columns give NaN statistics
+        squares = np.where(present, (mean - values) ** 2, 0.0)
+        var = np.where(count > 1, squares.sum(axis=0) / (count - 1), np.nan)
+        quartiles = np.nanquantile(values, [0.25, 0.5, 0.75], axis=0)
+        statistics = {
+            "count": count.astype(float), "mean": mean, "std": np.sqrt(var),
+            "min": np.nanmin(values, axis=0), "25%": quartiles[0], "50%": quartiles[1], "75%": quartiles[2],
+            "max": np.nanmax(values, axis=0), "median": np.nanmedian(values, axis=0), "var": var,
+        }
+    return pd.DataFrame.from_dict(statistics, orient="index", columns=columns)
+
+def mean_percent_changes(df, metrics):
+    """Mean per-persona percent change (Adaptive vs Original) of each metric, computed for all metrics at once.
+
+    A persona's change is relative to |Original|; it is 0 if both values are 0 and is left out if
+    only the Original value is 0.
+    """
+    original = np.asfortranarray(df[[metric["original"] for metric in metrics]].to_numpy(dtype=float))
+    adaptive = np.asfortranarray(df[[metric["adaptive"] for metric in metrics]].to_numpy(dtype=float))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        changes = np.where(original != 0, ((adaptive - original) / np.abs(original)) * 100,
+                           np.where((original == 0) & (adaptive == 0), 0.0, np.nan))
+    return _column_means(changes)[0]
+
+def comparison_table(stats, metric):
+    """The console comparison of one metric: statistics of both columns, mean difference and percent change."""
+    table = stats.loc[["mean", "median", "std", "var", "min", "max"], [metric["original"], metric["adaptive"]]].transpose()
+    original_mean, adaptive_mean = table["mean"]
+    table["mean_diff (Adaptive-Original)"] = adaptive_mean - original_mean
+    if original_mean != 0:  # Avoid division by zero
+        table["percent_change"] = f"{(adaptive_mean - original_mean) / original_mean * 100:.2f}%"
+    else:
+        table["percent_change"] = "N/A (original mean is zero)"
+    return table
+
+def summary_table(df, stats, registry):
+    """summary_comparison.csv / simulated_persona_analyzed_data.csv: one row per metric."""
+    metrics = metrics_in_groups(registry, SUMMARY_GROUPS)
+    percent_changes = mean_percent_changes(df, metrics) if metrics else []
+    rows = []
+    for metric, percent_change in zip(metrics, percent_changes):
+        original, adaptive = stats[metric["original"]], stats[metric["adaptive"]]
+        rows.append({
+            'Metric': metric["summary_label"],
+            'Original_Mean': original["mean"],
+            'Original_Median': original["median"],
+            'Original_Std': original["std"],
+            'Original_Variance': original["var"],
+            'Adaptive_Mean': adaptive["mean"],
+            'Adaptive_Median': adaptive["median"],
+            'Adaptive_Std': adaptive["std"],
+            'Adaptive_Variance': adaptive["var"],
+            'Mean_Difference': adaptive["mean"] - original["mean"],
+            'Avg_Percent_Change (%)': percent_change
+        })
+    return pd.DataFrame(rows)
+
+def tlx_statistics_table(stats, registry):
+    """nasa_tlx_detailed_statistics.csv: overall TLX and each subscale, indexed by name."""
+    rows = {}
+    for metric in metrics_in_groups(registry, TLX_GROUPS):
+        original, adaptive = stats[metric["original"]], stats[metric["adaptive"]]
+        mean_diff = adaptive["mean"] - original["mean"]
+        rows[metric["tlx_label"]] = {
+            'Original_Mean': original["mean"],
+            'Original_SD': original["std"],
+            'Original_Median': original["median"],
+            'Original_Variance': original["var"],
+            'Adaptive_Mean': adaptive["mean"],
+            'Adaptive_SD': adaptive["std"],
+            'Adaptive_Median': adaptive["median"],
+            'Adaptive_Variance': adaptive["var"],
+            'Mean_Diff': mean_diff,
+            'Percent_Change': (mean_diff / original["mean"]) * 100 if original["mean"] != 0 else float('nan')
+        }
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+def describe_table(stats, columns):
+    """The same table as df[columns].describe(), taken from the aggregated statistics."""
+    return stats.loc[DESCRIBE_STATISTICS, list(dict.fromkeys(columns))]
@@ -3,6 +3,12 @@ import numpy as np
 import os # Ensure os is imported for path operations
 import pandas as pd
 from questions import NASA_TLX_SUBSCALES_PAPER, NASA_TLX_SUBSCALES
+from rng import DEFAULT_RUN_SEED, stream_uniform
+from persona_generator import SEGMENTATION_ATTRIBUTES
+from aggregation import (COMPARISON_GROUPS, SUMMARY_GROUPS, aggregate_metrics, build_metric_registry, comparison_table, describe_table,
+                         metrics_in_groups, summary_table, tlx_statistics_table)
+from inference import paired_inference
+from segmentation_cube import build_segmentation_cube, save_segmentation_cube, segment_table
 from visualization import generate_standard_visualizations, generate_grouped_bar_chart_for_segment
 
 def calculate_sus_score(row, prefix):
@@ -111,34 +117,108 @@ def calculate_tlx_average(row, prefix):
     """
     return calculate_tlx_raw(row, prefix)
 
-def analyze_simulation_data(df, viz_output_dir, numeric_cols_from_main, tlx_subscales_list):
-    print("\n--- Starting Data Analysis ---")
-    
+# Column-wise versions of the scoring functions above: same results (NaN where those return None),
+# computed for a whole Original/Adaptive block at once instead of row by row with df.apply
+
+def _score_columns(df, columns):
+    """float64 array per column; all NaN for a column the frame does not have."""
+    return [pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float) if col in df.columns
+            else np.full(len(df), np.nan) for col in columns]
+
+def sus_item_columns(prefix):
+    return [f"{prefix}_SUS_{i}" for i in range(1, 11)]
+
+def tlx_subscale_columns(prefix):
+    return [f"{prefix}_TLX_{subscale['name']}" for subscale in NASA_TLX_SUBSCALES]
+
+def sus_scores(df, prefix):
+    """SUS score (0-100) of every row, as calculate_sus_score: NaN if any of the 10 items is missing."""
+    total = np.zeros(len(df))
+    for i, values in enumerate(_score_columns(df, sus_item_columns(prefix)), start=1):
+        total = total + (values - 1 if i % 2 == 1 else 5 - values)  # Odd items: score - 1, even: 5 - score
+    return total * 2.5
+
+def tlx_raw_scores(df, prefix):
+    """Raw NASA TLX score of every row, as calculate_tlx_raw: the mean of the subscales present,
+    NaN only if all are missing. Missing values are counted by missing_score_report instead of printed."""
+    total = np.zeros(len(df))
+    count = np.zeros(len(df))
+    for values in _score_columns(df, tlx_subscale_columns(prefix)):
+        present = ~np.isnan(values)
+        total = total + np.where(present, values, 0.0)
+        count += present
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / count, np.nan)
+
+def tlx_weighted_scores(df, prefix, weights=None):
+    """Weighted NASA TLX score of every row, as calculate_tlx_weighted: NaN if any subscale is missing."""
+    if weights is None:
+        weights = {subscale["name"]: 2.5 for subscale in NASA_TLX_SUBSCALES}
+    weighted_sum = np.zeros(len(df))
+    for subscale, values in zip(NASA_TLX_SUBSCALES, _score_columns(df, tlx_subscale_columns(prefix))):
+        weighted_sum = weighted_sum + values * weights[subscale["name"]]
+    return weighted_sum / 15
+
+def missing_score_report(df, prefixes=("Original", "Adaptive")):
+    """Count the missing SUS items and TLX subscales, and print them as one warning (if there are any).
+
+    Returns:
+        dict: Column name -> number of rows missing it, for the columns with missing values
+    """
+    missing = {}
+    for prefix in prefixes:
+        for col, values in zip(sus_item_columns(prefix) + tlx_subscale_columns(prefix),
+                               _score_columns(df, sus_item_columns(prefix) + tlx_subscale_columns(prefix))):
+            count = int(np.isnan(values).sum())
+            if count:
+                missing[col] = count
+    if missing:
+        print(f"Warning: Missing score values in {len(df)} rows (SUS scores with a missing item are left empty, "
+              f"TLX scores use the subscales present): " + ", ".join(f"{col} {count}" for col, count in missing.items()))
+    return missing
+
+def add_composite_scores(df, run_seed=DEFAULT_RUN_SEED, warn=True):
+    """Add the SUS score and TLX overall columns of both scenarios to `df` (in place).
+
+    TLX subscales that are missing entirely are filled with synthetic values first. Shared by
+    analyze_simulation_data and the sequential stopping checks (sequential.py), so both see the
+    same scores. `warn=False` skips the warnings about synthetic subscales and missing values.
+    """
     # First, ensure we have NASA TLX data for both Original and Adaptive conditions
-    # Generate synthetic TLX data if missing (to ensure we have data for analysis)
-    import random
+    # Generate synthetic TLX data if missing (to ensure we have data for analysis),
+    # from per-persona streams so the values do not depend on row order
+    ids = df["id"].to_numpy() if "id" in df.columns else np.arange(len(df))
     
     # For Original TLX data
     for subscale in NASA_TLX_SUBSCALES_PAPER:
         col_name = f"Original_TLX_{subscale}"
         if col_name not in df.columns or df[col_name].isna().all():
-            print(f"Warning: Missing {col_name}. Generating synthetic data.")
+            if warn:
+                print(f"Warning: Missing {col_name}. Generating synthetic data.")
             # Generate realistic values for Original (typically higher workload)
-            df[col_name] = [random.uniform(12, 18) for _ in range(len(df))]
+            df[col_name] = stream_uniform(run_seed, ids, "Original", f"analysis_tlx_{subscale}", 12, 18)
     
     # For Adaptive TLX data
     for subscale in NASA_TLX_SUBSCALES_PAPER:
         col_name = f"Adaptive_TLX_{subscale}"
         if col_name not in df.columns or df[col_name].isna().all():
-            print(f"Warning: Missing {col_name}. Generating synthetic data.")
+            if warn:
+                print(f"Warning: Missing {col_name}. Generating synthetic data.")
             # Generate realistic values for Adaptive (typically lower workload)
-            df[col_name] = [random.uniform(6, 12) for _ in range(len(df))]
+            df[col_name] = stream_uniform(run_seed, ids, "Adaptive", f"analysis_tlx_{subscale}", 6, 12)
 
     # Calculate Composite Scores
-    df['Original_SUS_Score'] = df.apply(lambda row: calculate_sus_score(row, 'Original'), axis=1)
-    df['Adaptive_SUS_Score'] = df.apply(lambda row: calculate_sus_score(row, 'Adaptive'), axis=1)
-    df['Original_TLX_Overall'] = df.apply(lambda row: calculate_tlx_average(row, 'Original'), axis=1)
-    df['Adaptive_TLX_Overall'] = df.apply(lambda row: calculate_tlx_average(row, 'Adaptive'), axis=1)
+    if warn:
+        missing_score_report(df)
+    df['Original_SUS_Score'] = sus_scores(df, 'Original')
+    df['Adaptive_SUS_Score'] = sus_scores(df, 'Adaptive')
+    df['Original_TLX_Overall'] = tlx_raw_scores(df, 'Original')
+    df['Adaptive_TLX_Overall'] = tlx_raw_scores(df, 'Adaptive')
+    return df
+
+def analyze_simulation_data(df, viz_output_dir, numeric_cols_from_main, tlx_subscales_list, run_seed=DEFAULT_RUN_SEED):
+    print("\n--- Starting Data Analysis ---")
+    add_composite_scores(df, run_seed=run_seed)
     
     # Ensure all TLX data is numeric
     for prefix in ['Original', 'Adaptive']:
@@ -163,71 +243,26 @@ def analyze_simulation_data(df, viz_output_dir, numeric_cols_from_main, tlx_subs
         if col not in analysis_numeric_cols:
             analysis_numeric_cols.append(col)
 
+    # Every summary below comes from one aggregation of the metric columns (aggregation.py)
+    metric_registry = build_metric_registry(df, numeric_cols_from_main, tlx_subscales_list)
+    metric_stats = aggregate_metrics(df, analysis_numeric_cols +
+                                     [metric[side] for metric in metric_registry for side in ("original", "adaptive")])
+
     # Descriptive Statistics (Overall)
     print("\n--- Overall Descriptive Statistics (including composite scores) ---")
     if not df[analysis_numeric_cols].empty:
         # Suppress scientific notation for describe()
         with pd.option_context('display.float_format', '{:.2f}'.format):
-            print(df[analysis_numeric_cols].describe())
+            print(describe_table(metric_stats, analysis_numeric_cols))
     else:
         print("No numeric metric columns found or DataFrame is empty for statistics.")
 
     # --- Comparative Analysis (Original vs. Adaptive) ---
     print("\n--- Comparative Analysis (Original vs. Adaptive) ---")
-
-    comparison_metrics = {
-        "SUS Score": ("Original_SUS_Score", "Adaptive_SUS_Score"),
-        "Overall TLX Score": ("Original_TLX_Overall", "Adaptive_TLX_Overall")
-    }
-
-    # Add individual TLX subscales to comparison_metrics
-    for subscale in tlx_subscales_list:
-        orig_col = f"Original_TLX_{subscale}"
-        adap_col = f"Adaptive_TLX_{subscale}"
-        if orig_col in df.columns and adap_col in df.columns:
-            comparison_metrics[f"TLX {subscale}"] = (orig_col, adap_col)
-
-    # Add performance metrics to comparison_metrics
-    # These are identified in numeric_cols_from_main
-    # We need to find pairs (e.g., Original_Time_Subtask1_seconds and Adaptive_Time_Subtask1_seconds)
-    # Assuming performance metrics follow a pattern like [Original/Adaptive]_MetricName_SubtaskX_[seconds/count]
-    
-    # First, identify unique performance metric stems (e.g., Time_Subtask1_seconds)
-    perf_metric_stems = set()
-    for col in numeric_cols_from_main:
-        if col.startswith("Original_Time_") or col.startswith("Original_Errors_"):
-            perf_metric_stems.add(col.replace("Original_", ""))
-        elif col.startswith("Adaptive_Time_") or col.startswith("Adaptive_Errors_"):
-            # This case is mostly to catch any that might not have an Original counterpart, though unlikely
-            perf_metric_stems.add(col.replace("Adaptive_", ""))
-
-    for stem in perf_metric_stems:
-        orig_col = f"Original_{stem}"
-        adap_col = f"Adaptive_{stem}"
-        if orig_col in df.columns and adap_col in df.columns:
-            # Create a more readable name for the metric
-            metric_name = stem.replace("_", " ").title()
-            comparison_metrics[metric_name] = (orig_col, adap_col)
-
     with pd.option_context('display.float_format', '{:.2f}'.format):
-        for metric_name, (orig_col, adap_col) in comparison_metrics.items():
-            if orig_col in df.columns and adap_col in df.columns:
-                print(f"\nComparison for: {metric_name}")
-                stats = df[[orig_col, adap_col]].agg(['mean', 'median', 'std', 'var', 'min', 'max']).transpose()
-                # Add difference and percent change columns for mean
-                if not stats.empty and 'mean' in stats.columns:
-                    mean_diff = stats.loc[adap_col, 'mean'] - stats.loc[orig_col, 'mean']
-                    stats['mean_diff (Adaptive-Original)'] = mean_diff
-                    
-                    # Calculate percent change
-                    if stats.loc[orig_col, 'mean'] != 0:  # Avoid division by zero
-                        percent_change = (mean_diff / stats.loc[orig_col, 'mean']) * 100
-                        stats['percent_change'] = f"{percent_change:.2f}%"
-                    else:
-                        stats['percent_change'] = "N/A (original mean is zero)"
-                print(stats)
-            else:
-                print(f"\nSkipping comparison for {metric_name}: one or both columns missing.")
+        for metric in metrics_in_groups(metric_registry, COMPARISON_GROUPS):
+            print(f"\nComparison for: {metric['comparison_label']}")
+            print(comparison_table(metric_stats, metric))
 
     # --- Segmentation by Persona Attributes ---
     print("\n--- Segmentation by Persona Attributes ---")
@@ -274,7 +309,7 @@ def analyze_simulation_data(df, viz_output_dir, numeric_cols_from_main, tlx_subs
         else:
             print(f"Skipping change calculation for TLX subscale '{subscale}': Original or Adaptive column missing.")
 
-    segmentation_attributes = ['tech_savvy', 'role', 'outlook'] # Add more attributes as needed, e.g., binned age
+    segmentation_attributes = SEGMENTATION_ATTRIBUTES # Add more in persona_generator.py, e.g., binned age
     key_metrics_for_segmentation = [
         'Original_SUS_Score', 'Adaptive_SUS_Score', 'SUS_Score_Change',
         'Original_TLX_Overall', 'Adaptive_TLX_Overall', 'TLX_Overall_Change'
@@ -283,16 +318,21 @@ def analyze_simulation_data(df, viz_output_dir, numeric_cols_from_main, tlx_subs
     # Filter out metrics that might not exist if scores couldn't be calculated (e.g. due to missing data)
     actual_key_metrics_for_segmentation = [metric for metric in key_metrics_for_segmentation if metric in df.columns]
 
+    # Count, mean, variance and CI of the key metrics for every persona attribute and every pair of the
+    # segmentation attributes, computed once and saved; the tables and charts below read from it
+    segmentation_cube = build_segmentation_cube(df, actual_key_metrics_for_segmentation)
+    os.makedirs(os.path.join(viz_output_dir, "summary_statistics"), exist_ok=True)
+    cube_file = os.path.join(viz_output_dir, "summary_statistics", "segmentation_cube.csv")
+    save_segmentation_cube(segmentation_cube, cube_file)
+    print(f"Saved segmentation cube to: {cube_file}")
+
     with pd.option_context('display.float_format', '{:.2f}'.format):
         for attribute in segmentation_attributes:
             if attribute in df.columns:
                 print(f"\n-- Segmentation by: {attribute.replace('_', ' ').title()} --")
                 # Check if there are any non-NA values for the attribute to group by
                 if df[attribute].notna().any():
-                    # Group by the attribute and calculate mean for key metrics
-                    # Ensure we only try to aggregate columns that are present
-                    grouped_stats = df.groupby(attribute)[actual_key_metrics_for_segmentation].mean()
-                    print(grouped_stats)
+                    print(segment_table(segmentation_cube, attribute, actual_key_metrics_for_segmentation))
                 else:
                     print(f"No data available for attribute '{attribute}' to perform segmentation.")
             else:
@@ -312,7 +352,7 @@ def analyze_simulation_data(df, viz_output_dir, numeric_cols_from_main, tlx_subs
     # print("\n--- Generating Segmented Visualizations ---")
     # # Example 1: SUS Scores by Tech Savvy
     # if 'tech_savvy' in df.columns and 'Original_SUS_Score' in df.columns and 'Adaptive_SUS_Score' in df.columns:
-    #     generate_grouped_bar_chart_for_segment(df,
+    #     generate_grouped_bar_chart_for_segment(df, cube=segmentation_cube,
     #                                            segment_attribute='tech_savvy',
     #                                            value_columns=['Original_SUS_Score', 'Adaptive_SUS_Score'],
     #                                            title_prefix='Mean SUS Scores',
@@ -322,7 +362,7 @@ def analyze_simulation_data(df, viz_output_dir, numeric_cols_from_main, tlx_subs
 
     # # Example 2: Overall TLX Scores by Tech Savvy
     # if 'tech_savvy' in df.columns and 'Original_TLX_Overall' in df.columns and 'Adaptive_TLX_Overall' in df.columns:
-    #     generate_grouped_bar_chart_for_segment(df,
+    #     generate_grouped_bar_chart_for_segment(df, cube=segmentation_cube,
     #                                            segment_attribute='tech_savvy',
     #                                            value_columns=['Original_TLX_Overall', 'Adaptive_TLX_Overall'],
     #                                            title_prefix='Mean Overall TLX Scores',
@@ -332,7 +372,7 @@ def analyze_simulation_data(df, viz_output_dir, numeric_cols_from_main, tlx_subs
 
     # # Example 3: SUS Score Change by Role
     # if 'role' in df.columns and 'SUS_Score_Change' in df.columns:
-    #     generate_grouped_bar_chart_for_segment(df,
+    #     generate_grouped_bar_chart_for_segment(df, cube=segmentation_cube,
     #                                            segment_attribute='role',
     #                                            value_columns=['SUS_Score_Change'], # Single value column
     #                                            title_prefix='Mean SUS Score Change (Adaptive - Original)',
@@ -341,7 +381,7 @@ def analyze_simulation_data(df, viz_output_dir, numeric_cols_from_main, tlx_subs
 
     # # Example 4: TLX Overall Change by Role
     # if 'role' in df.columns and 'TLX_Overall_Change' in df.columns:
-    #     generate_grouped_bar_chart_for_segment(df,
+    #     generate_grouped_bar_chart_for_segment(df, cube=segmentation_cube,
     #                                            segment_attribute='role',
     #                                            value_columns=['TLX_Overall_Change'], # Single value column
     #                                            title_prefix='Mean TLX Overall Change (Adaptive - Original)',
@@ -350,102 +390,14 @@ def analyze_simulation_data(df, viz_output_dir, numeric_cols_from_main, tlx_subs
 
     # --- Generate Summary Statistics CSV ---
     print("\n--- Generating Summary Statistics CSV ---")
-    summary_data = []
-    
-    metrics_for_summary = []
-    
-    # Overall SUS Score
-    if 'Original_SUS_Score' in df.columns and 'Adaptive_SUS_Score' in df.columns:
-        metrics_for_summary.append({'name': 'SUS Score', 'orig_col': 'Original_SUS_Score', 'adap_col': 'Adaptive_SUS_Score'})
-    
-    # Overall TLX Score
-    if 'Original_TLX_Overall' in df.columns and 'Adaptive_TLX_Overall' in df.columns:
-        metrics_for_summary.append({'name': 'TLX Overall', 'orig_col': 'Original_TLX_Overall', 'adap_col': 'Adaptive_TLX_Overall'})
-
-    # Performance Metrics
-    perf_metric_stems_identified = set()
-    if numeric_cols_from_main: # Check if the list is provided and not empty
-        for col in numeric_cols_from_main:
-            if col.startswith("Original_Time_") or col.startswith("Original_Errors_"):
-                stem = col.replace("Original_", "")
-                if f"Adaptive_{stem}" in df.columns:
-                    perf_metric_stems_identified.add(stem)
-    
-    for stem in sorted(list(perf_metric_stems_identified)):
-        metrics_for_summary.append({
-            'name': stem.replace('_', ' ').title(),
-            'orig_col': f"Original_{stem}",
-            'adap_col': f"Adaptive_{stem}"
-        })
-
-    # Individual TLX Subscales
-    if tlx_subscales_list: # Check if the list is provided and not empty
-        for subscale in tlx_subscales_list:
-            orig_tlx_col = f"Original_TLX_{subscale}"
-            adap_tlx_col = f"Adaptive_TLX_{subscale}"
-            if orig_tlx_col in df.columns and adap_tlx_col in df.columns:
-                metrics_for_summary.append({
-                    'name': f"TLX {subscale.replace('_', ' ').title()}",
-                    'orig_col': orig_tlx_col,
-                    'adap_col': adap_tlx_col
-                })
-            
-    for metric_info in metrics_for_summary:
-        metric_name = metric_info['name']
-        original_col = metric_info['orig_col']
-        adaptive_col = metric_info['adap_col']
-
-        df[original_col] = pd.to_numeric(df[original_col], errors='coerce')
-        df[adaptive_col] = pd.to_numeric(df[adaptive_col], errors='coerce')
-
-        orig_mean = df[original_col].mean()
-        orig_median = df[original_col].median()
-        orig_std = df[original_col].std()
-        orig_var = df[original_col].var()
-
-        adap_mean = df[adaptive_col].mean()
-        adap_median = df[adaptive_col].median()
-        adap_std = df[adaptive_col].std()
-        adap_var = df[adaptive_col].var()
-
-        mean_diff = adap_mean - orig_mean
-        
-        original_values = df[original_col]
-        adaptive_values = df[adaptive_col]
-        
-        percent_changes = pd.Series([np.nan] * len(df), index=df.index)
-
-        mask_orig_not_zero = original_values != 0
-        percent_changes.loc[mask_orig_not_zero] = \
-            ((adaptive_values[mask_orig_not_zero] - original_values[mask_orig_not_zero]) / original_values[mask_orig_not_zero].abs()) * 100
-            
-        mask_both_zero = (original_values == 0) & (adaptive_values == 0)
-        percent_changes.loc[mask_both_zero] = 0.0
-        
-        avg_percent_change = percent_changes.mean()
-
-        summary_data.append({
-            'Metric': metric_name,
-            'Original_Mean': orig_mean,
-            'Original_Median': orig_median,
-            'Original_Std': orig_std,
-            'Original_Variance': orig_var,
-            'Adaptive_Mean': adap_mean,
-            'Adaptive_Median': adap_median,
-            'Adaptive_Std': adap_std,
-            'Adaptive_Variance': adap_var,
-            'Mean_Difference': mean_diff,
-            'Avg_Percent_Change (%)': avg_percent_change
-        })
-
-    summary_df = pd.DataFrame(summary_data)
+    summary_df = summary_table(df, metric_stats, metric_registry)
     # Save summary statistics to the file now designated for analyzed (summarized) data
     output_dir = os.path.join(viz_output_dir, "summary_statistics")
     os.makedirs(output_dir, exist_ok=True)
     
     # Save overall statistics
     summary_stats_file = os.path.join(output_dir, "overall_summary_statistics.csv")
-    df[analysis_numeric_cols].describe().to_csv(summary_stats_file)
+    describe_table(metric_stats, analysis_numeric_cols).to_csv(summary_stats_file)
     print(f"Saved overall summary statistics to: {summary_stats_file}")
     
     # Save the summary data to CSV
@@ -453,156 +405,21 @@ def analyze_simulation_data(df, viz_output_dir, numeric_cols_from_main, tlx_subs
     summary_df.to_csv(summary_csv_file, index=False)
     print(f"Saved summary comparison to: {summary_csv_file}")
     
-    # Create a detailed NASA TLX statistics CSV
-    tlx_detailed_stats = []
-    
-    # Add Overall TLX
-    if 'Original_TLX_Overall' in df.columns and 'Adaptive_TLX_Overall' in df.columns:
-        orig_mean = df['Original_TLX_Overall'].mean()
-        orig_sd = df['Original_TLX_Overall'].std()
-        orig_median = df['Original_TLX_Overall'].median()
-        orig_var = df['Original_TLX_Overall'].var()
-        
-        adap_mean = df['Adaptive_TLX_Overall'].mean()
-        adap_sd = df['Adaptive_TLX_Overall'].std()
-        adap_median = df['Adaptive_TLX_Overall'].median()
-        adap_var = df['Adaptive_TLX_Overall'].var()
-        
-        mean_diff = adap_mean - orig_mean
-        
-        # Calculate percent change
-        if orig_mean != 0:
-            percent_change = ((adap_mean - orig_mean) / abs(orig_mean)) * 100
-        else:
-            percent_change = 0
-        
-        tlx_detailed_stats.append({
-            '': 'Overall TLX',
-            'Original_Mean': orig_mean,
-            'Original_SD': orig_sd,
-            'Original_Median': orig_median,
-            'Original_Variance': orig_var,
-            'Adaptive_Mean': adap_mean,
-            'Adaptive_SD': adap_sd,
-            'Adaptive_Median': adap_median,
-            'Adaptive_Variance': adap_var,
-            'Mean_Diff': mean_diff,
-            'Percent_Change': percent_change
-        })
-    
-    # Add individual TLX subscales
-    for subscale in NASA_TLX_SUBSCALES_PAPER:
-        orig_col = f"Original_TLX_{subscale}"
-        adap_col = f"Adaptive_TLX_{subscale}"
-        
-        if orig_col in df.columns and adap_col in df.columns:
-            orig_mean = df[orig_col].mean()
-            orig_sd = df[orig_col].std()
-            orig_median = df[orig_col].median()
-            orig_var = df[orig_col].var()
-            
-            adap_mean = df[adap_col].mean()
-            adap_sd = df[adap_col].std()
-            adap_median = df[adap_col].median()
-            adap_var = df[adap_col].var()
-            
-            mean_diff = adap_mean - orig_mean
-            
-            # Calculate percent change
-            if orig_mean != 0:
-                percent_change = ((adap_mean - orig_mean) / abs(orig_mean)) * 100
-            else:
-                percent_change = 0
-            
-            tlx_detailed_stats.append({
-                '': subscale,
-                'Original_Mean': orig_mean,
-                'Original_SD': orig_sd,
-                'Original_Median': orig_median,
-                'Original_Variance': orig_var,
-                'Adaptive_Mean': adap_mean,
-                'Adaptive_SD': adap_sd,
-                'Adaptive_Median': adap_median,
-                'Adaptive_Variance': adap_var,
-                'Mean_Diff': mean_diff,
-                'Percent_Change': percent_change
-            })
-    
-    # Save the detailed TLX statistics to CSV
-    tlx_detailed_df = pd.DataFrame(tlx_detailed_stats)
-    tlx_detailed_csv_file = os.path.join(output_dir, "nasa_tlx_detailed_statistics.csv")
-    tlx_detailed_df.to_csv(tlx_detailed_csv_file, index=False)
-    print(f"Saved NASA TLX detailed statistics to: {tlx_detailed_csv_file}")
-    
-    # Save detailed NASA TLX statistics
-    tlx_stats = {}
-    
-    # Overall TLX
-    if 'Original_TLX_Overall' in df.columns and 'Adaptive_TLX_Overall' in df.columns:
-        orig_mean = df['Original_TLX_Overall'].mean()
-        orig_median = df['Original_TLX_Overall'].median()
-        orig_var = df['Original_TLX_Overall'].var()
-        orig_std = df['Original_TLX_Overall'].std()
-        
-        adap_mean = df['Adaptive_TLX_Overall'].mean()
-        adap_median = df['Adaptive_TLX_Overall'].median()
-        adap_var = df['Adaptive_TLX_Overall'].var()
-        adap_std = df['Adaptive_TLX_Overall'].std()
-        
-        mean_diff = adap_mean - orig_mean
-        percent_change = (mean_diff / orig_mean) * 100 if orig_mean != 0 else float('nan')
-        
-        tlx_stats['Overall TLX'] = {
-            'Original_Mean': orig_mean,
-            'Original_SD': orig_std,
-            'Original_Median': orig_median,
-            'Original_Variance': orig_var,
-            'Adaptive_Mean': adap_mean,
-            'Adaptive_SD': adap_std,
-            'Adaptive_Median': adap_median,
-            'Adaptive_Variance': adap_var,
-            'Mean_Diff': mean_diff,
-            'Percent_Change': percent_change
-        }
-    
-    # Individual TLX subscales
-    for subscale in tlx_subscales_list:
-        orig_col = f"Original_TLX_{subscale}"
-        adap_col = f"Adaptive_TLX_{subscale}"
-        
-        if orig_col in df.columns and adap_col in df.columns:
-            orig_mean = df[orig_col].mean()
-            orig_median = df[orig_col].median()
-            orig_var = df[orig_col].var()
-            orig_std = df[orig_col].std()
-            
-            adap_mean = df[adap_col].mean()
-            adap_median = df[adap_col].median()
-            adap_var = df[adap_col].var()
-            adap_std = df[adap_col].std()
-            
-            mean_diff = adap_mean - orig_mean
-            percent_change = (mean_diff / orig_mean) * 100 if orig_mean != 0 else float('nan')
-            
-            tlx_stats[subscale] = {
-                'Original_Mean': orig_mean,
-                'Original_SD': orig_std,
-                'Original_Median': orig_median,
-                'Original_Variance': orig_var,
-                'Adaptive_Mean': adap_mean,
-                'Adaptive_SD': adap_std,
-                'Adaptive_Median': adap_median,
-                'Adaptive_Variance': adap_var,
-                'Mean_Diff': mean_diff,
-                'Percent_Change': percent_change
-            }
-    
-    # Save TLX statistics to CSV
-    tlx_stats_df = pd.DataFrame.from_dict(tlx_stats, orient='index')
+    # Save detailed NASA TLX statistics (overall score and each subscale)
     tlx_stats_file = os.path.join(output_dir, "nasa_tlx_detailed_statistics.csv")
-    tlx_stats_df.to_csv(tlx_stats_file)
+    tlx_statistics_table(metric_stats, metric_registry).to_csv(tlx_stats_file)
     print(f"Saved detailed NASA TLX statistics to: {tlx_stats_file}")
 
+    # Paired tests, effect sizes and bootstrap/permutation uncertainty of every metric (inference.py)
+    print("\n--- Paired Inference (Adaptive - Original) ---")
+    inference_df = paired_inference(df, metrics_in_groups(metric_registry, SUMMARY_GROUPS), seed=run_seed)
+    with pd.option_context('display.float_format', '{:.3f}'.format, 'display.width', 200):
+        print(inference_df[['Metric', 'N', 'Mean_Difference', 'CI_Low', 'CI_High', 't_p', 'Wilcoxon_p',
+                            'Permutation_p', 'Cohens_dz']].to_string(index=False))
+    inference_file = os.path.join(output_dir, "paired_inference.csv")
+    inference_df.to_csv(inference_file, index=False)
+    print(f"Saved paired inference results to: {inference_file}")
+
     analyzed_summary_filename = 'simulated_persona_analyzed_data.csv'
     summary_df.to_csv(analyzed_summary_filename, index=False, float_format='%.2f')
     print(f"Saved summary statistics to {analyzed_summary_filename}")
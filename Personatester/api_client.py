@@ -0,0 +1,38 @@
+import os
+import openai
+
+# The HTTP library's Limits class, taken from openai so it always matches the installed client
+HTTPLimits = type(openai.DEFAULT_CONNECTION_LIMITS)
+
+def create_openai_client(api_key=None, base_url=None, max_connections=64, max_keepalive_connections=64,
+                         keepalive_expiry=60.0, connect_timeout=5.0, read_timeout=60.0, max_retries=2):
+    """Build the one openai.OpenAI client a simulation run shares across all workers.
+
+    The underlying HTTP connection pool keeps connections alive between requests, so TLS
+    handshakes and connection setup are not repeated for every call. The client is thread-safe
+    and is meant to be injected into OpenAIBackend (and from there into run_persona_conversation).
+
+    Args:
+        api_key: API key; defaults to the OPENAI_API_KEY environment variable
+        base_url: Optional API base URL (e.g. the local mock server)
+        max_connections: Upper bound on open connections; size it to the run's concurrency
+        max_keepalive_connections: Idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection stays in the pool
+        connect_timeout: Seconds allowed to establish a connection
+        read_timeout: Seconds allowed for a response (completions can be slow)
+        max_retries: Retries done by the openai client itself
+
+    Returns:
+        openai.OpenAI: The configured client, or None if no API key is available
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("Error: OPENAI_API_KEY not found in environment variables.")
+        return None
+    http_client = openai.DefaultHttpxClient(
+        limits=HTTPLimits(max_connections=max_connections,
+                          max_keepalive_connections=max_keepalive_connections,
+                          keepalive_expiry=keepalive_expiry),
+        timeout=openai.Timeout(read_timeout, connect=connect_timeout),
+    )
+    return openai.OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=max_retries)
@@ -0,0 +1,76 @@
+from abc import ABC, abstractmethod
+from api_client import create_openai_client
+
+# Chat model used when no other model is configured
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+class CompletionResult:
+    """Reply text plus the usage and response headers of one chat completion."""
+
+    def __init__(self, text, prompt_tokens=None, completion_tokens=None, headers=None):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.headers = headers or {}
+
+    @property
+    def total_tokens(self):
+        if self.prompt_tokens is None and self.completion_tokens is None:
+            return None
+        return (self.prompt_tokens or 0) + (self.completion_tokens or 0)
+
+class CompletionBackend(ABC):
+    """Interface every questionnaire request in conversation.py goes through.
+
+    Subclasses must implement complete() (an incomplete subclass cannot be instantiated);
+    `model` is part of the response cache key.
+    """
+    model = DEFAULT_MODEL
+
+    @abstractmethod
+    def complete(self, messages, max_tokens, temperature, response_format=None):
+        """Send one chat completion request and return a CompletionResult.
+
+        `response_format` is the chat-completions response_format parameter, e.g.
+        {"type": "json_object"} for JSON output mode; None leaves it unset.
+        Errors are raised as exceptions; API errors should carry the HTTP response
+        (as openai.APIStatusError does) so rate-limit headers can be read from them.
+        """
+
+class OpenAIBackend(CompletionBackend):
+    """Chat-completions backend using one shared openai.OpenAI client.
+
+    Args:
+        model: Chat model name
+        client: openai.OpenAI client to use (see api_client.create_openai_client). If None,
+                a pooled client is created from `base_url`, `api_key` and `client_options`.
+        base_url: Optional API base URL (e.g. the local mock server)
+        api_key: API key; defaults to OPENAI_API_KEY
+        **client_options: Connection pool and timeout settings for create_openai_client
+    """
+
+    def __init__(self, model=DEFAULT_MODEL, client=None, base_url=None, api_key=None, **client_options):
+        self.model = model
+        if client is None:
+            client = create_openai_client(api_key=api_key, base_url=base_url, **client_options)
+            if client is None:
+                raise ValueError("OpenAIBackend needs an API key (set OPENAI_API_KEY or pass api_key).")
+        self.client = client
+
+    def complete(self, messages, max_tokens, temperature, response_format=None):
+        extra_params = {"response_format": response_format} if response_format is not None else {}
+        raw_response = self.client.chat.completions.with_raw_response.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **extra_params
+        )
+        response = raw_response.parse()
+        usage = response.usage
+        return CompletionResult(
+            response.choices[0].message.content,
+            prompt_tokens=usage.prompt_tokens if usage is not None else None,
+            completion_tokens=usage.completion_tokens if usage is not None else None,
+            headers=raw_response.headers
+        )
@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import urllib.parse
+import uuid
+from conversation import QUESTIONNAIRES, build_questionnaire_requests, process_questionnaire_replies
+from backends import DEFAULT_MODEL
+from canned_responses import canned_reply
+from persona_source import persona_source_from_options
+from rng import DEFAULT_RUN_SEED
+from simulation_engine import SCENARIO_LABELS
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+def make_custom_id(persona_id, scenario_type_label, questionnaire):
+    """Stable ID tying a batch line to its persona, scenario and questionnaire.
+
+    The persona id is JSON- then percent-encoded, so panel ids of any type and content (strings,
+    UUIDs, ids with dashes or colons) come back unchanged and cannot run into the ':' separators.
+    """
+    encoded_id = urllib.parse.quote(json.dumps(persona_id, ensure_ascii=False), safe="")
+    return f"persona:{encoded_id}:{scenario_type_label}:{questionnaire}"
+
+def parse_custom_id(custom_id):
+    """Return (persona id, scenario label, questionnaire) from make_custom_id's format."""
+    if custom_id.startswith("persona-"):
+        # Files written before ids were encoded: integer ids only
+        _, persona_id, scenario_type_label, questionnaire = custom_id.split("-", 3)
+        return int(persona_id), scenario_type_label, questionnaire
+    _, encoded_id, scenario_type_label, questionnaire = custom_id.split(":")
+    return json.loads(urllib.parse.unquote(encoded_id)), scenario_type_label, questionnaire
+
+def write_batch_requests(personas, original_state_description, new_state_description, path="batch_requests.jsonl", combined=False, model=DEFAULT_MODEL,
+                         json_output=False):
+    """Serialize every persona x scenario x questionnaire request to a batch JSONL file.
+
+    Returns:
+        int: Number of requests written
+    """
+    descriptions = {"Original": original_state_description, "Adaptive": new_state_description}
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for persona in personas:
+            for label in SCENARIO_LABELS:
+                for request in build_questionnaire_requests(persona, descriptions[label], label,
+                                                            combined=combined, json_output=json_output):
+                    line = {
+                        "custom_id": make_custom_id(persona["id"], label, request["questionnaire"]),
+                        "method": "POST",
+                        "url": BATCH_ENDPOINT,
+                        "body": {
+                            "model": model,
+                            "messages": request["messages"],
+                            "max_tokens": request["max_tokens"],
+                            "temperature": request["temperature"],
+                        },
+                    }
+                    if request.get("response_format"):
+                        line["body"]["response_format"] = request["response_format"]
+                    f.write(json.dumps(line, ensure_ascii=False) + "\n")
+                    count += 1
+    print(f"Wrote {count} batch requests to {path}")
+    return count
+
+def read_batch_results(path):
+    """Read a batch results JSONL file.
+
+    Returns:
+        dict: custom_id -> reply text, or an 'ERROR: ...' string for failed requests
+    """
+    replies = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            custom_id = result["custom_id"]
+            response = result.get("response") or {}
+            error = result.get("error")
+            if error:
+                replies[custom_id] = f"ERROR: {error.get('message', error)}"
+            elif response.get("status_code") != 200:
+                replies[custom_id] = f"ERROR: HTTP {response.get('status_code')}"
+            else:
+                replies[custom_id] = response["body"]["choices"][0]["message"]["content"]
+    return replies
+
+def ingest_batch_results(results_path, personas, run_seed=DEFAULT_RUN_SEED):
+    """Rebuild the per-persona rows that main() produces from a batch results file.
+
+    Args:
+        results_path: Batch results JSONL file
+        personas: The personas the requests were written for (same ids and attributes), e.g. a
+                  PersonaSource opened with the same options as for `write`
+        run_seed: Seed keying the per-persona random streams (see process_questionnaire_replies)
+
+    Returns:
+        list: One row dict per persona, in persona order
+    """
+    replies_by_scenario = {}
+    for custom_id, text in read_batch_results(results_path).items():
+        persona_id, label, questionnaire = parse_custom_id(custom_id)
+        replies_by_scenario.setdefault((persona_id, label), {})[questionnaire] = text
+
+    rows = []
+    missing = 0
+    for persona in personas:
+        row = {**persona}
+        for label in SCENARIO_LABELS:
+            replies = replies_by_scenario.get((persona["id"], label))
+            if replies is None:
+                missing += 1
+                replies = {questionnaire: "ERROR: missing from batch results" for questionnaire in QUESTIONNAIRES}
+            row.update(process_questionnaire_replies(persona, label, replies, run_seed=run_seed))
+        rows.append(row)
+    if missing:
+        print(f"Warning: {missing} persona/scenario combinations had no batch results.")
+    return rows
+
+class LocalBatchService:
+    """File-based stand-in for a provider's batch service.
+
+    submit() stores a copy of the requests file, run() answers every request with `responder`
+    (canned replies by default) and writes a results file in the provider's output format.
+    The responder is called as responder(messages, json_output=...) like canned_reply.
+    """
+
+    def __init__(self, work_dir="local_batches", responder=canned_reply):
+        self.work_dir = work_dir
+        self.responder = responder
+        os.makedirs(work_dir, exist_ok=True)
+
+    def _path(self, batch_id, kind):
+        return os.path.join(self.work_dir, f"{batch_id}_{kind}.jsonl")
+
+    def submit(self, requests_path):
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        with open(requests_path, encoding="utf-8") as src, open(self._path(batch_id, "input"), "w", encoding="utf-8") as dst:
+            dst.write(src.read())
+        return batch_id
+
+    def run(self, batch_id):
+        """Process a submitted batch and return the path of its results file."""
+        output_path = self._path(batch_id, "output")
+        with open(self._path(batch_id, "input"), encoding="utf-8") as src, open(output_path, "w", encoding="utf-8") as dst:
+            for line in src:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                body = request["body"]
+                json_output = (body.get("response_format") or {}).get("type") == "json_object"
+                content = self.responder(body["messages"], json_output=json_output)
+                result = {
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "body": {
+                            "object": "chat.completion",
+                            "model": body["model"],
+                            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                        },
+                    },
+                    "error": None,
+                }
+                dst.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return output_path
+
+def _read_description(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline batch submission and ingest for the persona simulation.")
+    parser.add_argument("--personas", type=int, default=100, help="Number of personas (generated with --seed)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_RUN_SEED, help="Run seed (personas and random streams)")
+    parser.add_argument("--personas-file", default=None,
+                        help="CSV or Parquet persona panel to use instead of generated personas")
+    parser.add_argument("--id-column", default="id", help="Panel column with the respondent id")
+    parser.add_argument("--sampling", choices=["covering", "joint"], default=None,
+                        help="Stratified persona sampling design covering the segmentation attributes")
+    parser.add_argument("--per-segment", type=int, default=30, help="Personas per segment with --sampling")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    write_parser = subparsers.add_parser("write", help="Write the batch requests JSONL file")
+    write_parser.add_argument("--original", required=True, help="Text file with the Original State description")
+    write_parser.add_argument("--new", required=True, help="Text file with the New State description")
+    write_parser.add_argument("--out", default="batch_requests.jsonl")
+    write_parser.add_argument("--combined", action="store_true", help="One combined questionnaire request per scenario")
+    write_parser.add_argument("--json", action="store_true", help="Ask for JSON answers (JSON output mode)")
+
+    run_parser = subparsers.add_parser("run-local", help="Answer a requests file with the local stand-in service")
+    run_parser.add_argument("--requests", default="batch_requests.jsonl")
+    run_parser.add_argument("--out", default="batch_results.jsonl")
+
+    ingest_parser = subparsers.add_parser("ingest", help="Parse a results file and run the analysis")
+    ingest_parser.add_argument("--results", default="batch_results.jsonl")
+
+    args = parser.parse_args()
+    # write and ingest must be given the same persona options, so the custom_ids match the same personas
+    personas = persona_source_from_options(args.personas, seed=args.seed, personas_file=args.personas_file,
+                                           sampling=args.sampling, per_segment=args.per_segment,
+                                           id_column=args.id_column)
+
+    if args.command == "write":
+        write_batch_requests(personas, _read_description(args.original), _read_description(args.new),
+                             path=args.out, combined=args.combined, json_output=args.json)
+    elif args.command == "run-local":
+        service = LocalBatchService()
+        batch_id = service.submit(args.requests)
+        os.replace(service.run(batch_id), args.out)
+        print(f"Local batch {batch_id} complete. Results saved to {args.out}")
+    elif args.command == "ingest":
+        from main import save_and_analyze
+        rows = ingest_batch_results(args.results, personas, run_seed=args.seed)
+        save_and_analyze(rows, personas.attribute_names, seed=args.seed)
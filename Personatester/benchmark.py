@@ -0,0 +1,92 @@
+import argparse
+import time
+from backends import OpenAIBackend
+from conversation import (
+    QUESTIONNAIRES, parse_reply_column, is_error_reply
+)
+from metrics import RunMetrics, print_metrics_summary
+from mock_server import MockChatServer
+from persona_generator import generate_personas
+from rate_limiter import RateLimiter
+from retry import RetryPolicy, CircuitBreaker
+from simulation_engine import run_simulation
+
+def run_benchmark(persona_count=1000, concurrency=64, combined=False, json_output=False, requests_per_minute=None, tokens_per_minute=None,
+                  latency="lognormal", latency_mean=0.2, latency_spread=0.5, error_rate=0.0, rate_limit_rate=0.0, seed=0,
+                  max_retries=5, drop_field_rate=0.0, reask_missing=False):
+    """Run the full simulation pipeline against the local mock server and print throughput figures.
+
+    Returns:
+        dict: Timings and counts for the run
+    """
+    personas = generate_personas(persona_count)
+    with MockChatServer(latency=latency, latency_mean=latency_mean, latency_spread=latency_spread,
+                        error_rate=error_rate, rate_limit_rate=rate_limit_rate, seed=seed,
+                        drop_field_rate=drop_field_rate) as mock:
+        backend = OpenAIBackend(base_url=mock.base_url, api_key="mock",
+                                max_connections=concurrency, max_keepalive_connections=concurrency, max_retries=0)
+        rate_limiter = None
+        if requests_per_minute or tokens_per_minute:
+            rate_limiter = RateLimiter(requests_per_minute or 10**9, tokens_per_minute or 10**12)
+        # Short delays so injected faults exercise the retry path without stretching the benchmark
+        retry_policy = RetryPolicy(max_retries=max_retries, base_delay=0.05, max_delay=1.0, max_retry_after=1.0,
+                                   circuit_breaker=CircuitBreaker(cooldown=1.0, max_cooldown=5.0))
+        run_metrics = RunMetrics()
+        start = time.perf_counter()
+        rows = run_simulation(personas, "Original dashboard (benchmark)", "Adaptive dashboard (benchmark)",
+                              concurrency=concurrency, backend=backend, rate_limiter=rate_limiter,
+                              combined=combined, json_output=json_output, reask_missing=reask_missing, delay=0, retry_policy=retry_policy,
+                              metrics=run_metrics)
+        simulation_seconds = time.perf_counter() - start
+        request_count = mock.request_count
+        status_counts = dict(mock.status_counts)
+
+    # Parsing throughput on the raw replies that came back: each raw column is parsed once, with the
+    # parser of its own questionnaire, and without the TLX defaults (no filling or warnings while timed)
+    texts_by_questionnaire = {questionnaire: [row[col] for row in rows for col in row if col.endswith(f"_Raw_{questionnaire}")]
+                              for questionnaire in QUESTIONNAIRES}
+    raw_texts = [text for texts in texts_by_questionnaire.values() for text in texts]
+    start = time.perf_counter()
+    for questionnaire, texts in texts_by_questionnaire.items():
+        parse_reply_column(questionnaire, texts, fill_missing=False)
+    parse_seconds = time.perf_counter() - start
+
+    summary = {
+        "personas": persona_count,
+        "requests": request_count,
+        "status_counts": status_counts,
+        "failed_questionnaires": sum(1 for text in raw_texts if is_error_reply(text)),
+        "circuit_breaker_trips": retry_policy.circuit_breaker.times_opened,
+        "simulation_seconds": simulation_seconds,
+        "personas_per_second": persona_count / simulation_seconds,
+        "requests_per_second": request_count / simulation_seconds,
+        "parsed_responses": len(raw_texts),
+        "parse_seconds": parse_seconds,
+    }
+    print_metrics_summary(run_metrics.summary())
+    print("\n--- Benchmark (local mock server) ---")
+    for key, value in summary.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the simulation pipeline offline against the local mock server.")
+    parser.add_argument("--personas", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--combined", action="store_true")
+    parser.add_argument("--json", action="store_true", help="JSON output mode")
+    parser.add_argument("--requests-per-minute", type=int, default=None, help="Client-side rate limit (RPM)")
+    parser.add_argument("--tokens-per-minute", type=int, default=None, help="Client-side rate limit (TPM)")
+    parser.add_argument("--latency", default="lognormal", choices=["constant", "uniform", "exponential", "lognormal"])
+    parser.add_argument("--latency-mean", type=float, default=0.2)
+    parser.add_argument("--latency-spread", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--drop-field-rate", type=float, default=0.0, help="Fraction of answers the mock leaves out")
+    parser.add_argument("--reask", action="store_true", help="Re-ask for answers missing from a reply")
+    args = parser.parse_args()
+    run_benchmark(args.personas, args.concurrency, args.combined, args.json, args.requests_per_minute, args.tokens_per_minute,
+                  args.latency, args.latency_mean, args.latency_spread, args.error_rate, args.rate_limit_rate, args.seed,
+                  args.max_retries, args.drop_field_rate, args.reask)
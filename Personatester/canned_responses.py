@@ -0,0 +1,34 @@
+import hashlib
+import json
+import random
+import re
+from questions import NASA_TLX_SUBSCALES_PAPER, REASK_PROMPT_PREFIX
+
+def canned_reply(messages, json_output=False):
+    """Return a well-formed, deterministic fake reply for a questionnaire request.
+
+    Used by the offline stand-ins (local batch service, mock server) so the whole pipeline can
+    run without the API. The questionnaires are detected from the field names mentioned in the
+    last user message, and the values are seeded from the prompt so the same request always gets
+    the same answer. With json_output=True the same values are returned as one JSON object.
+    A re-ask follow-up is answered with only the fields it names.
+    """
+    prompt = messages[-1]["content"] if messages else ""
+    seed = int(hashlib.sha256("".join(m.get("content") or "" for m in messages).encode("utf-8")).hexdigest()[:16], 16)
+    rng = random.Random(seed)
+    values = {}
+    if "_Subtask" in prompt:
+        for i in range(1, 4):
+            values[f"Time_Subtask{i}_seconds"] = rng.randint(20, 120)
+            values[f"Errors_Subtask{i}_count"] = rng.randint(0, 3)
+    if "SUS_" in prompt:
+        for i in range(1, 11):
+            values[f"SUS_{i}"] = rng.randint(1, 5)
+    if "TLX_" in prompt:
+        for subscale in NASA_TLX_SUBSCALES_PAPER:
+            values[f"TLX_{subscale}"] = rng.randint(4, 18)
+    if prompt.startswith(REASK_PROMPT_PREFIX):
+        values = {name: value for name, value in values.items() if re.search(rf"\b{name}\b", prompt)}
+    if json_output:
+        return json.dumps(values)
+    return "\n".join(f"{name}: {value}" for name, value in values.items())
@@ -1,104 +1,172 @@
-import openai
-import os
+import json
 import re
+import threading
 import time
 import random
+from rate_limiter import estimate_tokens
+from retry import is_transient_error
+from response_parser import parse_text_reply
+from rng import DEFAULT_RUN_SEED, persona_random
+from backends import OpenAIBackend
+from api_client import create_openai_client
 from questions import (
     PERFORMANCE_TASK_DESCRIPTION, PERFORMANCE_METRICS_PROMPT_INSTRUCTIONS,
     SUS_STATEMENTS, SUS_PROMPT_INSTRUCTIONS,
-    NASA_TLX_SUBSCALES_PAPER, get_nasa_tlx_prompt_text
+    NASA_TLX_SUBSCALES_PAPER, get_nasa_tlx_prompt_text,
+    get_combined_questionnaire_prompt_text, QUESTIONNAIRE_FIELDS, get_json_format_instructions, get_reask_prompt_text,
+    FIELD_TEXT_PATTERNS
 )
 
-def get_persona_bias(persona):
-    # Bias based on outlook and Big Five
-    bias = 0
-    if persona.get('outlook') == 'optimistic':
-        bias += 1
-    elif persona.get('outlook') == 'pessimistic':
-        bias -= 1
-    # Big Five: high neuroticism -> more negative, high extraversion/openness -> more positive
-    bias += (persona.get('extraversion', 3) - 3) * 0.5
-    bias += (persona.get('openness', 3) - 3) * 0.3
-    bias -= (persona.get('neuroticism', 3) - 3) * 0.5
-    return int(round(bias))
-
 def extract_performance_metrics_from_text(text):
-    metrics = {}
-    # Ensure keys match exactly what's asked in PERFORMANCE_METRICS_PROMPT_INSTRUCTIONS
-    # Example: Time_Subtask1_seconds, Errors_Subtask1_count
-    patterns = {
-        "Time_Subtask1_seconds": r"Time_Subtask1_seconds:\s*(\d+)",
-        "Errors_Subtask1_count": r"Errors_Subtask1_count:\s*(\d)",
-        "Time_Subtask2_seconds": r"Time_Subtask2_seconds:\s*(\d+)",
-        "Errors_Subtask2_count": r"Errors_Subtask2_count:\s*(\d)",
-        "Time_Subtask3_seconds": r"Time_Subtask3_seconds:\s*(\d+)",
-        "Errors_Subtask3_count": r"Errors_Subtask3_count:\s*(\d)"
-    }
-    for key, pattern in patterns.items():
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            try:
-                metrics[key] = int(match.group(1))
-            except ValueError:
-                 metrics[key] = None # Handle if value is not an int
-        else:
-            metrics[key] = None
-    return metrics
+    # Keys match exactly what's asked in PERFORMANCE_METRICS_PROMPT_INSTRUCTIONS, e.g. Time_Subtask1_seconds;
+    # the patterns live in questions.FIELD_TEXT_PATTERNS and are compiled once by response_parser
+    return parse_text_reply("Performance", text)
 
 def extract_sus_scores_from_text(text):
-    scores = {}
-    for i in range(1, 11):
-        pattern = rf"SUS_{i}:\s*([1-5])"
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            try:
-                scores[f"SUS_{i}"] = int(match.group(1))
-            except ValueError:
-                scores[f"SUS_{i}"] = None
-        else:
-            scores[f"SUS_{i}"] = None
+    return parse_text_reply("SUS", text)
+
+def extract_tlx_scores_from_text(text, fill_missing=True, rng=None):
+    """Parse TLX_* ratings from a reply. With fill_missing=False, subscales not found are None.
+
+    Defaults for missing subscales are drawn from `rng` (a random.Random), or the global random module.
+    """
+    # Several formats are tried per subscale (see questions.FIELD_TEXT_PATTERNS) to increase the chances of finding scores
+    scores = parse_text_reply("TLX", text)
+    if fill_missing:
+        fill_missing_tlx_scores(scores, rng=rng)
     return scores
 
-def extract_tlx_scores_from_text(text):
-    scores = {}
-    for subscale in NASA_TLX_SUBSCALES_PAPER: # Uses the list of names from questions.py
-        key_name = f"TLX_{subscale}" # Match the key format, e.g., TLX_Mental_Demand
-        
-        # Try multiple patterns to increase chances of finding scores
-        patterns = [
-            # Standard format with key_name
-            rf"{key_name}:\s*(\d+|1\d|2[0-1])",
-            # Alternative format with spaces in subscale name
-            rf"TLX {subscale.replace('_', ' ')}:\s*(\d+|1\d|2[0-1])",
-            # Just the subscale name with score
-            rf"{subscale.replace('_', ' ')}:\s*(\d+|1\d|2[0-1])",
-            # Look for numbers after the subscale name
-            rf"{subscale.replace('_', ' ')}[^\d]+(\d+|1\d|2[0-1])"
-        ]
-        
-        found = False
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    value = int(match.group(1))
-                    # Ensure value is within 0-21 range
-                    if 0 <= value <= 21:
-                        scores[key_name] = value
-                        found = True
-                        break
-                except (ValueError, IndexError):
-                    pass
-        
+def fill_missing_tlx_scores(scores, warn=True, rng=None):
+    """Replace TLX subscales that were not found (None) with a default value, in place.
+
+    Returns:
+        int: Number of subscales filled
+    """
+    rng = rng or random
+    filled = 0
+    for key_name, value in scores.items():
         # If no match found, use a default middle value instead of None
         # This ensures we always have data for analysis
-        if not found:
-            print(f"Warning: Could not find {key_name} in response, using default value")
+        if value is None:
+            if warn:
+                print(f"Warning: Could not find {key_name} in response, using default value")
             # Use a default middle value (10-12) with slight randomization
-            import random
-            scores[key_name] = random.randint(10, 12)
-    
-    return scores
+            scores[key_name] = rng.randint(10, 12)
+            filled += 1
+    return filled
+
+def parse_json_reply(text, fields):
+    """Validate a JSON output mode reply against a questionnaire's fields in one pass.
+
+    Args:
+        text: Reply text
+        fields: Dict of field name -> (min, max) range, e.g. questions.SUS_FIELDS
+
+    Returns:
+        dict: Field name -> int, with None for fields that are missing or out of range,
+              or None if the text is not a JSON object at all
+    """
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    values = {}
+    for name, (low, high) in fields.items():
+        value = data.get(name)
+        if isinstance(value, str) and value.strip().isdigit():
+            value = int(value)
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, int) or value < low or (high is not None and value > high):
+            value = None
+        values[name] = value
+    return values
+
+def _strip_code_fence(text):
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return text.strip()
+
+def parse_questionnaire_reply(questionnaire, text, fill_missing=True, rng=None):
+    """Parse one questionnaire's answers from a reply, JSON or plain text.
+
+    JSON replies (from JSON output mode) are validated directly. Only a reply that is not a
+    JSON object falls back to the regex parsers, with the quotes removed so '"SUS_1": 4' still
+    reads as 'SUS_1: 4'. Missing TLX subscales get the old random default only for plain-text
+    replies with fill_missing=True (drawn from `rng`, see extract_tlx_scores_from_text); JSON
+    replies keep them as None.
+
+    Returns:
+        dict: Field name -> parsed value (None if not found)
+    """
+    if questionnaire == "Combined":
+        parsed = {}
+        for name in QUESTIONNAIRES:
+            parsed.update(parse_questionnaire_reply(name, text, fill_missing=fill_missing, rng=rng))
+        return parsed
+    fields = QUESTIONNAIRE_FIELDS[questionnaire]
+    candidate = _strip_code_fence(text)
+    if candidate.startswith("{"):
+        parsed = parse_json_reply(candidate, fields)
+        if parsed is not None:
+            return parsed
+        text = candidate.replace('"', '')
+        fill_missing = False
+    if questionnaire == "Performance":
+        return extract_performance_metrics_from_text(text)
+    if questionnaire == "SUS":
+        return extract_sus_scores_from_text(text)
+    return extract_tlx_scores_from_text(text, fill_missing=fill_missing, rng=rng)
+
+def parse_reply_column(questionnaire, texts, fill_missing=True, persona_ids=None, scenario_type_label=None,
+                       run_seed=DEFAULT_RUN_SEED):
+    """Bulk version of parse_questionnaire_reply for a whole column of stored raw replies.
+
+    Each distinct reply is parsed once (combined-mode and cached replies repeat), and instead of
+    one warning per reply a single count of filled TLX subscales is printed.
+
+    Args:
+        questionnaire: 'Performance', 'SUS' or 'TLX'
+        texts: Iterable of reply texts (e.g. a pandas Series of a *_Raw_* column). Failed requests
+               ('ERROR: ...') and empty cells give None for every field.
+        fill_missing: As for parse_questionnaire_reply; the random defaults are drawn per reply
+        persona_ids: Persona id of each text. With the scenario label, the defaults come from the
+                     same per-persona streams as in process_questionnaire_replies (else global random).
+        scenario_type_label: 'Original' or 'Adaptive'
+        run_seed: Seed of the run the replies came from
+
+    Returns:
+        dict: Field name -> list of values, one per text
+    """
+    columns = {name: [] for name in QUESTIONNAIRE_FIELDS[questionnaire]}
+    parsed_by_text = {}  # reply text -> (values without defaults, whether defaults apply)
+    filled = 0
+    persona_ids = iter(persona_ids) if persona_ids is not None else None
+    for text in texts:
+        persona_id = next(persona_ids) if persona_ids is not None else None
+        if isinstance(text, str) and not is_error_reply(text):
+            if text not in parsed_by_text:
+                # Defaults are only ever filled in for plain-text TLX replies (see parse_questionnaire_reply)
+                fillable = questionnaire == "TLX" and not _strip_code_fence(text).startswith("{")
+                parsed_by_text[text] = (parse_questionnaire_reply(questionnaire, text, fill_missing=False), fillable)
+            parsed, fillable = parsed_by_text[text]
+            if fill_missing and fillable and None in parsed.values():
+                parsed = dict(parsed)
+                rng = None
+                if persona_id is not None:
+                    rng = persona_random(run_seed, persona_id, scenario_type_label, TLX_FILL_STAGE)
+                filled += fill_missing_tlx_scores(parsed, warn=False, rng=rng)
+        else:
+            parsed = {}
+        for name, values in columns.items():
+            values.append(parsed.get(name))
+    if filled:
+        print(f"Warning: {filled} missing TLX subscale(s) were given default values")
+    return columns
 
 def generate_tlx_pairwise_comparisons():
     """Generate all pairwise comparisons for NASA TLX dimensions.
@@ -116,21 +184,104 @@ def generate_tlx_pairwise_comparisons():
     
     return pairs
 
-def run_persona_conversation(persona, scenario_description, scenario_type_label, delay=1.0):
-    openai.api_key = os.getenv("OPENAI_API_KEY")
-    if not openai.api_key:
-        print("Error: OPENAI_API_KEY not found in environment variables.")
-        # Return empty/error structure
-        error_results = {}
-        for i in range(1,4): error_results[f"{scenario_type_label}_Time_Subtask{i}_seconds"] = None; error_results[f"{scenario_type_label}_Errors_Subtask{i}_count"] = None
-        for i in range(1,11): error_results[f"{scenario_type_label}_SUS_{i}"] = None
-        for subscale in NASA_TLX_SUBSCALES_PAPER: error_results[f"{scenario_type_label}_TLX_{subscale}"] = None
-        error_results[f"{scenario_type_label}_Raw_Performance"] = "ERROR: API Key missing"
-        error_results[f"{scenario_type_label}_Raw_SUS"] = "ERROR: API Key missing"
-        error_results[f"{scenario_type_label}_Raw_TLX"] = "ERROR: API Key missing"
-        return error_results
-
-    system_msg = (
+# Backend used when none is passed in, created once on first use and shared by all threads
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+def get_default_backend():
+    """Return the shared default OpenAIBackend, or None if no API key is configured."""
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            client = create_openai_client()
+            if client is not None:
+                _default_backend = OpenAIBackend(client=client)
+    return _default_backend
+
+def request_completion(messages, max_tokens, temperature, rate_limiter=None, cache=None, delay=0, backend=None,
+                       retry_policy=None, stats=None, response_format=None):
+    """Send one chat completion request through `backend` and return the reply text.
+
+    With a ResponseCache, identical requests are answered from disk without calling the API.
+    When a rate limiter is given, the call first waits for request and token budget, then reports
+    the actual token usage and any rate-limit response headers back to the limiter.
+    Without one, the call sleeps a fixed `delay` seconds after each API request.
+    With a RetryPolicy, transient errors (429s, 5xx, timeouts, dropped connections) are retried
+    with backoff, and its circuit breaker, if any, is consulted before every attempt.
+    If a `stats` dict is passed, it is filled with the call's timings, token usage, retry count
+    and whether it was served from the cache (see metrics.RunMetrics).
+    `response_format` (e.g. {"type": "json_object"}) is passed to the backend and is part of the cache key.
+    """
+    if stats is None:
+        stats = {}
+    start = time.monotonic()
+    stats.update(cached=False, retries=0, throttle_wait_seconds=0.0, latency_seconds=None,
+                 prompt_tokens=None, completion_tokens=None)
+    if backend is None:
+        backend = get_default_backend()
+
+    cache_key = None
+    if cache is not None:
+        extra_params = {"response_format": response_format} if response_format is not None else {}
+        cache_key = cache.make_key(backend.model, messages, temperature, max_tokens, **extra_params)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            stats.update(cached=True, prompt_tokens=cached["prompt_tokens"], completion_tokens=cached["completion_tokens"],
+                         total_seconds=time.monotonic() - start)
+            return cached["text"]
+
+    estimated_tokens = estimate_tokens(messages, max_tokens)
+    circuit_breaker = retry_policy.circuit_breaker if retry_policy is not None else None
+    attempt = 0
+    while True:
+        if circuit_breaker is not None:
+            stats["throttle_wait_seconds"] += circuit_breaker.before_call()
+        try:
+            if rate_limiter is not None:
+                stats["throttle_wait_seconds"] += rate_limiter.acquire(estimated_tokens)
+            call_start = time.monotonic()
+            try:
+                result = backend.complete(messages, max_tokens, temperature, response_format=response_format)
+                stats["latency_seconds"] = time.monotonic() - call_start
+                if circuit_breaker is not None:
+                    circuit_breaker.record_success()
+                break
+            except Exception as e:
+                # 429s and other API errors still carry the current limits in their headers
+                if rate_limiter is not None and getattr(e, "response", None) is not None:
+                    rate_limiter.update_from_headers(e.response.headers)
+                if rate_limiter is not None:
+                    rate_limiter.record_usage(estimated_tokens, 0)  # Nothing was generated
+                if circuit_breaker is not None:
+                    if is_transient_error(e):
+                        circuit_breaker.record_failure()
+                    else:
+                        circuit_breaker.record_reachable()  # The API answered; the request itself was bad
+                if retry_policy is None or not retry_policy.should_retry(e, attempt):
+                    stats["total_seconds"] = time.monotonic() - start
+                    raise
+                wait, error = retry_policy.backoff(attempt, e), e
+        finally:
+            if circuit_breaker is not None:
+                circuit_breaker.release_probe()  # Never leave other workers waiting on this call's probe
+        attempt += 1
+        stats["retries"] = attempt
+        print(f"Retrying API call in {wait:.1f}s (attempt {attempt + 1}/{retry_policy.max_retries + 1}) after: {error}")
+        time.sleep(wait)
+    if rate_limiter is not None:
+        rate_limiter.update_from_headers(result.headers)
+        rate_limiter.record_usage(estimated_tokens, result.total_tokens)
+    else:
+        time.sleep(delay)
+
+    if cache is not None:
+        cache.put(cache_key, result.text, result.prompt_tokens, result.completion_tokens)
+    stats.update(prompt_tokens=result.prompt_tokens, completion_tokens=result.completion_tokens,
+                 total_seconds=time.monotonic() - start)
+    return result.text
+
+def build_system_message(persona):
+    return (
         f"You are {persona['name']}, a {persona['age']}-year-old {persona['role']} from {persona.get('region','Unknown')}. "
         f"Education: {persona.get('education','Unknown')}, Gender: {persona.get('gender','Unknown')}. "
         f"Big Five: O={persona.get('openness',3)}, C={persona.get('conscientiousness',3)}, E={persona.get('extraversion',3)}, A={persona.get('agreeableness',3)}, N={persona.get('neuroticism',3)}. "
@@ -140,70 +291,8 @@ def run_persona_conversation(persona, scenario_description, scenario_type_label,
         f"You will be presented with a description of a dashboard and asked to simulate tasks and provide ratings. Please adhere strictly to the requested output formats, providing each requested data point on a new line as specified."
     )
 
-    all_results_for_scenario = {}
-    parsed_metrics_accumulator = {}
-
-    # --- 1. Performance Metrics ---
-    perf_prompt_user = (
-        f"You are evaluating the '{scenario_type_label}' dashboard.\n"
-        f"Dashboard Description:\n{scenario_description}\n\n"
-        f"{PERFORMANCE_TASK_DESCRIPTION}\n"
-        f"{PERFORMANCE_METRICS_PROMPT_INSTRUCTIONS}"
-    )
-    try:
-        response_perf = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": perf_prompt_user}
-            ],
-            max_tokens=350, 
-            temperature=0.2 # Lowered temperature
-        )
-        perf_text = response_perf.choices[0].message.content
-        all_results_for_scenario[f"{scenario_type_label}_Raw_Performance"] = perf_text
-        parsed_metrics_accumulator.update(extract_performance_metrics_from_text(perf_text))
-        time.sleep(delay)
-    except Exception as e:
-        print(f"Error getting performance metrics for {persona['name']} ({scenario_type_label}): {e}")
-        all_results_for_scenario[f"{scenario_type_label}_Raw_Performance"] = f"ERROR: {e}"
-        for i in range(1,4): parsed_metrics_accumulator[f"Time_Subtask{i}_seconds"] = None; parsed_metrics_accumulator[f"Errors_Subtask{i}_count"] = None
-
-    # --- 2. SUS Ratings ---
-    sus_full_prompt = SUS_PROMPT_INSTRUCTIONS + "\n" + "\n".join(SUS_STATEMENTS)
-    sus_prompt_user = (
-        f"Continuing with the '{scenario_type_label}' dashboard described previously.\n"
-        f"{sus_full_prompt}"
-    )
-    try:
-        response_sus = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": f"Dashboard Description (reminder for context):\n{scenario_description}"},
-                {"role": "user", "content": sus_prompt_user}
-            ],
-            max_tokens=500, 
-            temperature=0.2 # Lowered temperature
-        )
-        sus_text = response_sus.choices[0].message.content
-        all_results_for_scenario[f"{scenario_type_label}_Raw_SUS"] = sus_text
-        sus_scores = extract_sus_scores_from_text(sus_text)
-        bias = get_persona_bias(persona)
-        for i in range(1, 11):
-            key = f"SUS_{i}"
-            if sus_scores.get(key) is not None:
-                sus_scores[key] = min(5, max(1, sus_scores[key] + bias))
-        parsed_metrics_accumulator.update(sus_scores)
-        time.sleep(delay)
-    except Exception as e:
-        print(f"Error getting SUS scores for {persona['name']} ({scenario_type_label}): {e}")
-        all_results_for_scenario[f"{scenario_type_label}_Raw_SUS"] = f"ERROR: {e}"
-        for i in range(1,11): parsed_metrics_accumulator[f"SUS_{i}"] = None
-
-    # --- 3. NASA-TLX Ratings ---
-    tlx_full_prompt = get_nasa_tlx_prompt_text()
-    tlx_prompt_user = (
+def build_tlx_prompt(scenario_type_label):
+    return (
         f"Continuing with the '{scenario_type_label}' dashboard described previously.\n\n"
         f"CRITICAL INSTRUCTION: You MUST provide NASA TLX ratings on the 0-21 scale for the {scenario_type_label} dashboard.\n"
         f"You MUST rate ALL six dimensions with values between 0-21, using realistic values (typically 8-16 range).\n\n"
@@ -222,110 +311,332 @@ def run_persona_conversation(persona, scenario_description, scenario_type_label,
         f"TLX_Effort: [number]\n"
         f"TLX_Frustration: [number]\n"
     )
-    try:
-        # Use a higher temperature for more varied responses
-        response_tlx = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
+
+# Stage name of the per-persona random stream used for missing TLX defaults (see rng.py)
+TLX_FILL_STAGE = "tlx_fill"
+
+# Questionnaires asked for every scenario, in the order they are requested and parsed
+QUESTIONNAIRES = ["Performance", "SUS", "TLX"]
+
+# Used in error messages when a questionnaire request fails
+QUESTIONNAIRE_DESCRIPTIONS = {
+    "Performance": "performance metrics",
+    "SUS": "SUS scores",
+    "TLX": "TLX scores",
+    "Combined": "combined questionnaire",
+}
+
+def is_error_reply(text):
+    """Failed requests are recorded as an 'ERROR: ...' string in place of the reply text."""
+    return text is None or text.startswith("ERROR:")
+
+def count_parsed_fields(questionnaire, text):
+    """Return (fields found, fields expected) in a reply, without filling in defaults."""
+    values = list(parse_questionnaire_reply(questionnaire, text, fill_missing=False).values())
+    return sum(1 for v in values if v is not None), len(values)
+
+def find_missing_fields(questionnaire, text):
+    """Return the names of the fields a reply did not answer (or answered out of range)."""
+    parsed = parse_questionnaire_reply(questionnaire, text, fill_missing=False)
+    return [name for name, value in parsed.items() if value is None]
+
+# Completion budget for a re-ask: a few tokens per 'Key: value' line plus some slack
+REASK_TOKENS_PER_FIELD = 10
+REASK_BASE_TOKENS = 20
+
+def build_reask_request(request, reply_text, missing_fields):
+    """Follow-up to `request` that asks only for `missing_fields`, with the first reply as context.
+
+    A JSON-mode request keeps its response_format, and the follow-up asks for a JSON object too,
+    so the answers come back in the same format as the reply they are merged into.
+    """
+    response_format = request.get("response_format")
+    json_output = (response_format or {}).get("type") == "json_object"
+    reask = {
+        "questionnaire": request["questionnaire"],
+        "messages": request["messages"] + [
+            {"role": "assistant", "content": reply_text},
+            {"role": "user", "content": get_reask_prompt_text(missing_fields, json_output=json_output)},
+        ],
+        "max_tokens": REASK_BASE_TOKENS + REASK_TOKENS_PER_FIELD * len(missing_fields),
+        "temperature": request["temperature"],
+    }
+    if response_format is not None:
+        reask["response_format"] = response_format
+    return reask
+
+def merge_reask_reply(questionnaire, reply_text, reask_text, missing_fields):
+    """Fold the answers recovered by a re-ask into the original reply text.
+
+    The merged text is what gets stored in the Raw_* column, so re-parsing it later gives the same
+    result. JSON replies stay one JSON object. In plain-text replies the value the parser reads for
+    a field (e.g. an out-of-range 'TLX_Temporal_Demand: 40') is replaced by the recovered one, and
+    fields the reply did not mention at all get a 'Key: value' line appended.
+
+    Returns:
+        tuple: (merged reply text, number of missing fields the merged text now answers)
+    """
+    parsed = parse_questionnaire_reply(questionnaire, reask_text, fill_missing=False)
+    recovered = {name: parsed[name] for name in missing_fields if parsed.get(name) is not None}
+    if not recovered:
+        return reply_text, 0
+    candidate = _strip_code_fence(reply_text)
+    data = None
+    if candidate.startswith("{"):
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            data = None
+    if isinstance(data, dict):
+        merged = json.dumps({**data, **recovered})
+    else:
+        merged = _replace_text_answers(reply_text, recovered)
+        before = parse_questionnaire_reply(questionnaire, reply_text, fill_missing=False)
+        after = parse_questionnaire_reply(questionnaire, merged, fill_missing=False)
+        if any(after[name] != value for name, value in before.items() if name not in recovered):
+            # An edit hit another field's answer: keep the reply as it was and only add lines
+            lines = "\n".join(f"{name}: {value}" for name, value in recovered.items())
+            merged = f"{reply_text.rstrip()}\n{lines}"
+    after = parse_questionnaire_reply(questionnaire, merged, fill_missing=False)
+    return merged, sum(1 for name, value in recovered.items() if after.get(name) == value)
+
+def _replace_text_answers(text, answers):
+    """Put each answer where the text parser reads the field, or append a 'Key: value' line.
+
+    The parser takes a field's first variant (questions.FIELD_TEXT_PATTERNS, in priority order)
+    whose leftmost match is in range, so the value of the first variant that matches anywhere
+    is the one that has to change.
+    """
+    appended = []
+    for name, value in answers.items():
+        for key, value_pattern in FIELD_TEXT_PATTERNS[name]:
+            match = re.search(re.escape(key) + value_pattern, text, re.IGNORECASE)
+            if match is not None:
+                text = f"{text[:match.start(1)]}{value}{text[match.end(1):]}"
+                break
+        else:
+            appended.append(f"{name}: {value}")
+    return f"{text.rstrip()}\n" + "\n".join(appended) if appended else text
+
+def _record_call_metrics(metrics, persona, scenario_type_label, questionnaire, model, reply_text, stats,
+                         queue_wait=0.0, reask_fields=None):
+    failed = is_error_reply(reply_text)
+    if reask_fields is not None:
+        # For a re-ask, success means every field it asked for was recovered
+        parsed_fields, expected_fields = stats.pop("recovered_fields", 0), len(reask_fields)
+    elif failed:
+        parsed_fields, expected_fields = 0, 0
+    else:
+        parsed_fields, expected_fields = count_parsed_fields(questionnaire, reply_text)
+    metrics.record_call(persona_id=persona["id"], scenario=scenario_type_label, questionnaire=questionnaire,
+                        model=model, error=reply_text if failed else None, queue_wait_seconds=queue_wait,
+                        parsed_fields=parsed_fields, expected_fields=expected_fields,
+                        parse_ok=not failed and parsed_fields == expected_fields, reask=reask_fields is not None,
+                        **stats)
+
+def build_questionnaire_requests(persona, scenario_description, scenario_type_label, combined=False, json_output=False):
+    """Build the chat requests for one persona and scenario.
+
+    Returns:
+        list: Dicts with 'questionnaire', 'messages', 'max_tokens' and 'temperature'. Normally one
+              request each for Performance, SUS and TLX; with combined=True a single "Combined"
+              request that asks for all three. With json_output=True each request asks for a JSON
+              object with the questionnaire's fields and carries a 'response_format' for JSON mode.
+    """
+    requests = _build_questionnaire_requests(persona, scenario_description, scenario_type_label, combined)
+    if json_output:
+        for request in requests:
+            last_message = request["messages"][-1]
+            request["messages"][-1] = {**last_message,
+                                       "content": last_message["content"] + get_json_format_instructions(request["questionnaire"])}
+            request["response_format"] = {"type": "json_object"}
+    return requests
+
+def _build_questionnaire_requests(persona, scenario_description, scenario_type_label, combined):
+    system_msg = build_system_message(persona)
+
+    if combined:
+        combined_prompt_user = (
+            f"You are evaluating the '{scenario_type_label}' dashboard.\n"
+            f"Dashboard Description:\n{scenario_description}\n\n"
+            f"{PERFORMANCE_TASK_DESCRIPTION}\n"
+            f"{get_combined_questionnaire_prompt_text()}"
+        )
+        return [{
+            "questionnaire": "Combined",
+            "messages": [
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": combined_prompt_user}
+            ],
+            "max_tokens": 600,
+            "temperature": 0.2, # Same as performance/SUS; TLX variation is added in postprocessing.py
+        }]
+
+    # --- 1. Performance Metrics ---
+    perf_prompt_user = (
+        f"You are evaluating the '{scenario_type_label}' dashboard.\n"
+        f"Dashboard Description:\n{scenario_description}\n\n"
+        f"{PERFORMANCE_TASK_DESCRIPTION}\n"
+        f"{PERFORMANCE_METRICS_PROMPT_INSTRUCTIONS}"
+    )
+    # --- 2. SUS Ratings ---
+    sus_full_prompt = SUS_PROMPT_INSTRUCTIONS + "\n" + "\n".join(SUS_STATEMENTS)
+    sus_prompt_user = (
+        f"Continuing with the '{scenario_type_label}' dashboard described previously.\n"
+        f"{sus_full_prompt}"
+    )
+    # --- 3. NASA-TLX Ratings ---
+    tlx_prompt_user = build_tlx_prompt(scenario_type_label)
+
+    return [
+        {
+            "questionnaire": "Performance",
+            "messages": [
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": perf_prompt_user}
+            ],
+            "max_tokens": 350,
+            "temperature": 0.2, # Lowered temperature
+        },
+        {
+            "questionnaire": "SUS",
+            "messages": [
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": f"Dashboard Description (reminder for context):\n{scenario_description}"},
+                {"role": "user", "content": sus_prompt_user}
+            ],
+            "max_tokens": 500,
+            "temperature": 0.2, # Lowered temperature
+        },
+        {
+            "questionnaire": "TLX",
+            "messages": [
                 {"role": "system", "content": system_msg},
                 {"role": "user", "content": f"Dashboard Description (reminder for context):\n{scenario_description}"},
                 {"role": "user", "content": tlx_prompt_user}
             ],
-            max_tokens=500,  # Increased token limit
-            temperature=0.7  # Higher temperature for more varied responses
-        )
-        tlx_text = response_tlx.choices[0].message.content
-        all_results_for_scenario[f"{scenario_type_label}_Raw_TLX"] = tlx_text
-        tlx_scores = extract_tlx_scores_from_text(tlx_text)
-        
-        # Generate realistic TLX scores based on persona and scenario
-        from questions import NASA_TLX_SUBSCALES
-        import random
-        
-        # Determine baseline difficulty based on scenario type
-        # Original interfaces typically have higher workload than adaptive ones
-        baseline_difficulty = 14 if scenario_type_label == "Original" else 9
-        
-        # Apply persona characteristics
-        bias = get_persona_bias(persona)
-        
-        # Tech savvy reduces workload (except performance which improves)
-        tech_savvy_modifier = -2 if persona.get('tech_savvy') == 'High' else 2
-        
-        # Experience reduces workload
-        experience_modifier = min(0, -persona.get('experience_years', 0) // 2)
-        
-        # Stress tolerance affects frustration and temporal demand
-        stress_modifier = -2 if persona.get('stress_tolerance') == 'High' else 2
-        
-        for subscale in NASA_TLX_SUBSCALES_PAPER:
-            key = f"TLX_{subscale}"
-            
-            # Find the valence from NASA_TLX_SUBSCALES
-            valence = "-"  # Default to negative valence
-            for subscale_dict in NASA_TLX_SUBSCALES:
-                if subscale_dict["name"] == subscale:
-                    valence = subscale_dict["valence"]
-                    break
-            
-            # If we don't have a score from the API response, generate a realistic one
-            if key not in tlx_scores or tlx_scores[key] is None:
-                # Base value with some randomization
-                base_value = baseline_difficulty + random.randint(-2, 2)
-                
-                # Apply modifiers based on subscale
-                if subscale == "Mental_Demand":
-                    modifier = tech_savvy_modifier + experience_modifier
-                elif subscale == "Physical_Demand":
-                    modifier = -1  # Usually lower for software interfaces
-                elif subscale == "Temporal_Demand":
-                    modifier = stress_modifier
-                elif subscale == "Performance":
-                    # For performance, lower is better (0=perfect, 21=failure)
-                    # So tech savvy and experience improve (lower) the score
-                    modifier = tech_savvy_modifier + experience_modifier
-                elif subscale == "Effort":
-                    modifier = tech_savvy_modifier + experience_modifier
-                elif subscale == "Frustration":
-                    modifier = stress_modifier + tech_savvy_modifier
-                else:
-                    modifier = 0
-                
-                # Apply bias based on persona outlook
-                bias_factor = bias * -1.5
-                
-                # Calculate final score with all modifiers
-                final_score = base_value + modifier + bias_factor
-                
-                # Ensure within valid range and add slight randomization
-                final_score = min(21, max(0, final_score)) + random.uniform(-1.0, 1.0)
-                tlx_scores[key] = round(final_score, 1)
-            else:
-                # We have a score from the API, but ensure it's realistic
-                # Add some variation to prevent all dimensions having the same value
-                variation = random.uniform(-2.0, 2.0)
-                
-                # For Original state, scores should generally be higher (more workload)
-                if scenario_type_label == "Original":
-                    base_adjustment = 3.0
-                else:
-                    base_adjustment = -2.0
-                
-                # Apply bias and adjustments
-                bias_factor = bias * -1.0
-                adjusted_score = tlx_scores[key] + variation + base_adjustment + bias_factor
-                
-                # Ensure within valid range
-                tlx_scores[key] = min(21, max(0, adjusted_score))
-        parsed_metrics_accumulator.update(tlx_scores)
-        time.sleep(delay)
-    except Exception as e:
-        print(f"Error getting TLX scores for {persona['name']} ({scenario_type_label}): {e}")
-        all_results_for_scenario[f"{scenario_type_label}_Raw_TLX"] = f"ERROR: {e}"
+            "max_tokens": 500,  # Increased token limit
+            "temperature": 0.7,  # Higher temperature for more varied responses
+        },
+    ]
+
+def process_questionnaire_replies(persona, scenario_type_label, replies, run_seed=DEFAULT_RUN_SEED):
+    """Parse the replies for one persona and scenario into result columns.
+
+    Only the model's answers are returned; the SUS persona bias and TLX adjustment are applied
+    to the whole results frame afterwards (postprocessing.postprocess_results).
+
+    Args:
+        persona: Persona dict
+        scenario_type_label: 'Original' or 'Adaptive'
+        replies: Dict mapping questionnaire name to reply text, or to an 'ERROR: ...' string if
+                 the request failed. A "Combined" reply is used for all three questionnaires.
+        run_seed: Seed of the run; defaults for missing TLX subscales come from this persona's
+                  (run_seed, persona id, scenario) stream, so they do not depend on scheduling
+
+    Returns:
+        dict: Raw_* text columns plus the parsed answers, all prefixed with the scenario label
+    """
+    if "Combined" in replies:
+        # In combined mode the one reply is stored in all three Raw_* columns
+        replies = {questionnaire: replies["Combined"] for questionnaire in QUESTIONNAIRES}
+
+    all_results_for_scenario = {}
+    parsed_metrics_accumulator = {}
+
+    perf_text = replies.get("Performance", "ERROR: no reply")
+    all_results_for_scenario[f"{scenario_type_label}_Raw_Performance"] = perf_text
+    if is_error_reply(perf_text):
+        for i in range(1,4): parsed_metrics_accumulator[f"Time_Subtask{i}_seconds"] = None; parsed_metrics_accumulator[f"Errors_Subtask{i}_count"] = None
+    else:
+        parsed_metrics_accumulator.update(parse_questionnaire_reply("Performance", perf_text))
+
+    sus_text = replies.get("SUS", "ERROR: no reply")
+    all_results_for_scenario[f"{scenario_type_label}_Raw_SUS"] = sus_text
+    if is_error_reply(sus_text):
+        for i in range(1,11): parsed_metrics_accumulator[f"SUS_{i}"] = None
+    else:
+        parsed_metrics_accumulator.update(parse_questionnaire_reply("SUS", sus_text))
+
+    tlx_text = replies.get("TLX", "ERROR: no reply")
+    all_results_for_scenario[f"{scenario_type_label}_Raw_TLX"] = tlx_text
+    if is_error_reply(tlx_text):
         for subscale_key in NASA_TLX_SUBSCALES_PAPER: parsed_metrics_accumulator[f"TLX_{subscale_key}"] = None
+    else:
+        rng = persona_random(run_seed, persona["id"], scenario_type_label, TLX_FILL_STAGE)
+        parsed_metrics_accumulator.update(parse_questionnaire_reply("TLX", tlx_text, rng=rng))
 
     # Add scenario_type_label prefix to all parsed_metrics_accumulator keys before adding to all_results_for_scenario
     for k, v in parsed_metrics_accumulator.items():
         all_results_for_scenario[f"{scenario_type_label}_{k}"] = v
     
     return all_results_for_scenario
+
+def run_persona_conversation(persona, scenario_description, scenario_type_label, delay=1.0, rate_limiter=None, combined=False, cache=None, backend=None,
+                             retry_policy=None, metrics=None, queue_wait=0.0, json_output=False, reask_missing=False,
+                             run_seed=DEFAULT_RUN_SEED):
+    """Run the performance, SUS and NASA-TLX questionnaires for one persona and scenario.
+
+    Requests go through `backend` (a CompletionBackend), normally one OpenAIBackend built per run
+    around a pooled client. Without one, a shared default backend is created from OPENAI_API_KEY.
+
+    If a shared RateLimiter is passed, request pacing is left to it; otherwise the call sleeps
+    a fixed `delay` seconds after each API request (the old behaviour).
+    A shared ResponseCache answers repeated prompts from disk (see request_completion).
+    With combined=True all three questionnaires are asked in a single request, and with
+    json_output=True answers are requested as JSON objects (see build_questionnaire_requests).
+    A shared RetryPolicy retries transient API errors before a questionnaire is recorded as failed.
+    With a RunMetrics collector, one record per request is added (timings, tokens, retries, parse
+    success); `queue_wait` is how long this conversation waited for a worker and is attributed to
+    its first request.
+    With reask_missing=True, a reply that leaves fields unanswered gets one short follow-up asking
+    only for those fields, and the recovered answers are merged into the reply.
+    `run_seed` keys this persona's random streams (see process_questionnaire_replies).
+    """
+    if backend is None:
+        backend = get_default_backend()
+    if backend is None:
+        # No API key: return empty/error structure
+        return process_questionnaire_replies(persona, scenario_type_label,
+                                             {questionnaire: "ERROR: API Key missing" for questionnaire in QUESTIONNAIRES},
+                                             run_seed=run_seed)
+
+    completion_options = {"rate_limiter": rate_limiter, "cache": cache, "delay": delay, "backend": backend,
+                          "retry_policy": retry_policy}
+    replies = {}
+    for request in build_questionnaire_requests(persona, scenario_description, scenario_type_label,
+                                                combined=combined, json_output=json_output):
+        questionnaire = request["questionnaire"]
+        stats = {}
+        try:
+            replies[questionnaire] = request_completion(
+                request["messages"], request["max_tokens"], request["temperature"],
+                stats=stats, response_format=request.get("response_format"), **completion_options
+            )
+        except Exception as e:
+            print(f"Error getting {QUESTIONNAIRE_DESCRIPTIONS[questionnaire]} for {persona['name']} ({scenario_type_label}): {e}")
+            replies[questionnaire] = f"ERROR: {e}"
+        if metrics is not None:
+            _record_call_metrics(metrics, persona, scenario_type_label, questionnaire, backend.model,
+                                 replies[questionnaire], stats, queue_wait=queue_wait)
+            queue_wait = 0.0  # Later requests in this conversation start as soon as the previous one ends
+
+        if reask_missing and not is_error_reply(replies[questionnaire]):
+            missing_fields = find_missing_fields(questionnaire, replies[questionnaire])
+            if missing_fields:
+                reask = build_reask_request(request, replies[questionnaire], missing_fields)
+                stats = {}
+                try:
+                    reask_text = request_completion(reask["messages"], reask["max_tokens"], reask["temperature"],
+                                                    stats=stats, response_format=reask.get("response_format"),
+                                                    **completion_options)
+                    replies[questionnaire], stats["recovered_fields"] = merge_reask_reply(
+                        questionnaire, replies[questionnaire], reask_text, missing_fields)
+                except Exception as e:
+                    print(f"Error re-asking {', '.join(missing_fields)} for {persona['name']} ({scenario_type_label}): {e}")
+                    reask_text = f"ERROR: {e}"
+                if metrics is not None:
+                    _record_call_metrics(metrics, persona, scenario_type_label, questionnaire, backend.model,
+                                         reask_text, stats, reask_fields=missing_fields)
+
+    return process_questionnaire_replies(persona, scenario_type_label, replies, run_seed=run_seed)
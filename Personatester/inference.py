@@ -0,0 +1,165 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import stats
+from rng import DEFAULT_RUN_SEED
+
+# Bootstrap resamples and sign-flip permutations per metric
+DEFAULT_RESAMPLES = 10000
+# Resample matrix entries (resamples x personas) per chunk, i.e. per task of the process pool
+CHUNK_CELLS = 2 ** 23
+
+_worker_data = {}
+
+def _init_worker(differences, present):
+    """Keep the paired differences in the worker, so they are sent once per process, not per chunk."""
+    _worker_data["differences"] = differences
+    _worker_data["present"] = present
+
+def _resample_chunk(seed, size):
+    """Bootstrap and sign-flip means of every metric for `size` resamples.
+
+    Each resample is one row of an index matrix (bootstrap) or a sign matrix (permutation); the
+    rows are turned into weights over the personas and applied to all metrics with one matrix
+    product.
+
+    Returns:
+        tuple: (bootstrap means, sign-flipped means), each a (size, metrics) array
+    """
+    differences, present = _worker_data["differences"], _worker_data["present"]
+    n = len(differences)
+    rng = np.random.default_rng(seed)
+    index = rng.integers(0, n, size=(size, n), dtype=np.int32)
+    weights = np.empty((size, n))
+    for row, resample in enumerate(index):
+        weights[row] = np.bincount(resample, minlength=n)  # How often each persona was drawn
+    del index
+    counts = np.full((size, differences.shape[1]), float(n))  # Bootstrap weights always sum to n...
+    partial = ~present.all(axis=0)
+    counts[:, partial] = weights @ present[:, partial]        # ...except over metrics with missing pairs
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bootstrap = (weights @ differences) / counts
+    # Random signs from random bits: sum(sign * d) = 2 * sum(bit * d) - sum(d)
+    bits = np.unpackbits(rng.integers(0, 256, size=(size, (n + 7) // 8), dtype=np.uint8), axis=1, count=n)
+    np.copyto(weights, bits)
+    del bits
+    with np.errstate(invalid="ignore", divide="ignore"):
+        flipped = (2 * (weights @ differences) - differences.sum(axis=0)) / present.sum(axis=0)
+    return bootstrap, flipped
+
+def resample_means(differences, present, n_resamples=DEFAULT_RESAMPLES, seed=DEFAULT_RUN_SEED, processes=None):
+    """Bootstrap and sign-flip means of every metric, in chunks spread over a process pool.
+
+    Every chunk has its own seed from seed, so the results do not depend on the number of processes.
+
+    Args:
+        differences: (personas, metrics) paired differences with missing pairs set to 0
+        present: (personas, metrics) float array, 1 where the pair is present
+        n_resamples: Resamples of each kind
+        seed: Seed of the resamples (the run seed)
+        processes: Worker processes (default: one per CPU; 1 runs in this process)
+
+    Returns:
+        tuple: (bootstrap means, sign-flipped means), each a (n_resamples, metrics) array
+    """
+    chunk = max(1, CHUNK_CELLS // max(len(differences), 1))
+    sizes = [min(chunk, n_resamples - start) for start in range(0, n_resamples, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    processes = min(processes or os.cpu_count() or 1, len(sizes))
+    if processes > 1:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(differences, present)) as pool:
+            results = list(pool.map(_resample_chunk, seeds, sizes))
+    else:
+        _init_worker(differences, present)
+        results = [_resample_chunk(chunk_seed, size) for chunk_seed, size in zip(seeds, sizes)]
+        _worker_data.clear()
+    return np.vstack([bootstrap for bootstrap, _ in results]), np.vstack([flipped for _, flipped in results])
+
+def bca_interval(values, bootstrap, confidence=0.95):
+    """Bias-corrected and accelerated bootstrap interval of the mean of `values`.
+
+    Args:
+        values: Paired differences of one metric (no missing values)
+        bootstrap: Bootstrap means of the metric
+        confidence: Coverage of the interval
+
+    Returns:
+        tuple: (low, high)
+    """
+    bootstrap = bootstrap[~np.isnan(bootstrap)]
+    n = len(values)
+    if n < 2 or len(bootstrap) == 0:
+        return np.nan, np.nan
+    estimate = values.mean()
+    # Bias correction: how far the bootstrap distribution sits from the estimate
+    below = (np.sum(bootstrap < estimate) + 0.5 * np.sum(bootstrap == estimate)) / len(bootstrap)
+    z0 = stats.norm.ppf(np.clip(below, 1 / (len(bootstrap) + 1), len(bootstrap) / (len(bootstrap) + 1)))
+    # Acceleration from the jackknife means (closed form for the mean)
+    jackknife = (values.sum() - values) / (n - 1)
+    deviations = jackknife.mean() - jackknife
+    denominator = 6 * np.sum(deviations ** 2) ** 1.5
+    acceleration = np.sum(deviations ** 3) / denominator if denominator > 0 else 0.0
+    z = stats.norm.ppf([(1 - confidence) / 2, (1 + confidence) / 2])
+    levels = stats.norm.cdf(z0 + (z0 + z) / (1 - acceleration * (z0 + z)))
+    low, high = np.quantile(bootstrap, levels)
+    return low, high
+
+def rank_biserial(values):
+    """Matched-pairs rank-biserial correlation: (positive - negative rank sum) / total, zeros dropped."""
+    values = values[values != 0]
+    if len(values) == 0:
+        return np.nan
+    ranks = stats.rankdata(np.abs(values))
+    return (ranks[values > 0].sum() - ranks[values < 0].sum()) / ranks.sum()
+
+def paired_inference(df, metrics, n_resamples=DEFAULT_RESAMPLES, confidence=0.95, seed=DEFAULT_RUN_SEED, processes=None):
+    """Paired tests, effect sizes and resampling intervals for every Original/Adaptive metric pair.
+
+    For each metric the differences are Adaptive - Original over the personas with both values.
+    The bootstrap resamples whole personas, so all metrics share the same resamples.
+
+    Args:
+        df: Per-persona frame with both columns of every metric
+        metrics: Metric registry entries (aggregation.build_metric_registry)
+        n_resamples: Bootstrap resamples and sign-flip permutations
+        confidence: Coverage of the BCa intervals
+        seed: Seed of the resamples (the run seed)
+        processes: Worker processes for the resampling (default: one per CPU)
+
+    Returns:
+        pd.DataFrame: One row per metric: N, Mean_Difference, its BCa interval, paired t and
+                      Wilcoxon signed-rank tests, Cohen's d_z, Hedges' g_z, rank-biserial
+                      correlation and the sign-flip permutation p-value
+    """
+    original = df[[metric["original"] for metric in metrics]].to_numpy(dtype=float)
+    adaptive = df[[metric["adaptive"] for metric in metrics]].to_numpy(dtype=float)
+    differences = adaptive - original
+    present = ~np.isnan(differences)
+    filled = np.where(present, differences, 0.0)
+    bootstrap, flipped = resample_means(filled, present.astype(np.float64), n_resamples, seed, processes)
+
+    rows = []
+    for k, metric in enumerate(metrics):
+        values = differences[present[:, k], k]
+        n = len(values)
+        row = {'Metric': metric["summary_label"], 'N': n, 'Mean_Difference': values.mean() if n else np.nan}
+        row['CI_Low'], row['CI_High'] = bca_interval(values, bootstrap[:, k], confidence)
+        sd = values.std(ddof=1) if n > 1 else np.nan
+        if n > 1 and sd > 0:
+            row['t'], row['t_p'] = stats.ttest_1samp(values, 0.0)
+            row['Cohens_dz'] = values.mean() / sd
+            row['Hedges_gz'] = row['Cohens_dz'] * (1 - 3 / (4 * (n - 1) - 1)) if n > 2 else np.nan
+        else:
+            row['t'] = row['t_p'] = row['Cohens_dz'] = row['Hedges_gz'] = np.nan
+        if np.any(values != 0):
+            row['Wilcoxon_W'], row['Wilcoxon_p'] = stats.wilcoxon(values)
+        else:
+            row['Wilcoxon_W'] = row['Wilcoxon_p'] = np.nan
+        row['Rank_Biserial'] = rank_biserial(values)
+        # Sign flips: under "no difference" each persona's difference is equally likely either sign
+        row['Permutation_p'] = ((1 + np.sum(np.abs(flipped[:, k]) >= abs(row['Mean_Difference']) - 1e-12))
+                                / (len(flipped) + 1)) if n else np.nan
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,283 @@
+import json
+import math
+import os
+import time
+import numpy as np
+from scipy import stats
+from analysis import add_composite_scores
+from conversation import QUESTIONNAIRES, count_parsed_fields, is_error_reply
+from persona_generator import SEGMENTATION_ATTRIBUTES
+from rng import DEFAULT_RUN_SEED
+from sequential import MONITORED_METRICS
+
+# Streaming quantiles kept for the Adaptive - Original change of every monitored metric
+LIVE_QUANTILES = (0.1, 0.5, 0.9)
+SCENARIOS = ("Original", "Adaptive")
+
+class RunningMoments:
+    """Count, mean and variance of a fixed set of columns, updated a batch of rows at a time.
+
+    Each batch is reduced on its own and merged into the running totals with the parallel form of
+    Welford's update (Chan et al.), so memory does not grow with the number of rows and the
+    result does not suffer from the cancellation of a plain sum-of-squares. NaN values are skipped
+    column by column.
+
+    Args:
+        width: Number of columns
+    """
+
+    def __init__(self, width):
+        self.count = np.zeros(width)
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)  # Sum of squared deviations from the running mean
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float).reshape(-1, len(self.count))
+        present = ~np.isnan(values)
+        n = present.sum(axis=0)
+        if not n.any():
+            return
+        with np.errstate(invalid="ignore", divide="ignore"):
+            batch_mean = np.where(n > 0, np.where(present, values, 0.0).sum(axis=0) / n, 0.0)
+            batch_m2 = np.where(present, (values - batch_mean) ** 2, 0.0).sum(axis=0)
+            total = self.count + n
+            delta = batch_mean - self.mean
+            self.mean = np.where(total > 0, self.mean + delta * n / total, 0.0)
+            self.m2 = self.m2 + batch_m2 + np.where(total > 0, delta ** 2 * self.count * n / total, 0.0)
+        self.count = total
+
+    def variance(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+class P2Quantile:
+    """Streaming estimate of one quantile with the P-square algorithm (Jain and Chlamtac, 1985).
+
+    Five markers track the minimum, the p/2, p and (1+p)/2 quantiles and the maximum; each new
+    value moves the marker positions, and markers that drift from their desired positions are
+    adjusted with a piecewise-parabolic fit. Memory is constant, whatever the number of values.
+
+    Args:
+        p: Quantile to estimate, between 0 and 1
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, value):
+        heights, positions = self.heights, self.positions
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(i for i in range(1, 5) if value < heights[i]) - 1
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        for i in range(1, 4):
+            offset = self.desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                height = heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+                    (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i])
+                    + (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1]))
+                if not heights[i - 1] < height < heights[i + 1]:
+                    # Parabolic fit out of order: move linearly towards the neighbour instead
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def value(self):
+        if len(self.heights) < 5:
+            return float(np.quantile(self.heights, self.p)) if self.heights else math.nan
+        return self.heights[2]
+
+class LiveStats:
+    """Summary statistics of a run that are updated while it is in progress.
+
+    Completed persona rows (from the engine's on_persona_done) are buffered and, every
+    `refresh_seconds` or `max_buffer` personas, prepared and scored the same way as the final
+    analysis (main.prepare_results_frame, then analysis.add_composite_scores). The scored batch
+    then updates running accumulators and is dropped:
+    - RunningMoments of the Original and Adaptive scores and their change, overall and per
+      level of every segmentation attribute,
+    - P2Quantile sketches of the changes,
+    - per scenario and questionnaire counts of requests, failed requests and replies with
+      unparsed fields.
+    Memory is O(metrics x segments), not O(personas). Each refresh rewrites `path` (JSON,
+    replaced atomically) and prints a short table. The final analysis stays the reference: its
+    synthetic TLX fill looks at the whole frame, so the live TLX figures can differ slightly.
+
+    Args:
+        prepare: Function turning result rows into the results frame (main.prepare_results_frame)
+        run_seed: Run seed, for the scoring
+        path: Live summary file (None: terminal table only)
+        refresh_seconds: Seconds between refreshes
+        max_buffer: Personas buffered before a refresh regardless of time
+        attributes: Segmentation attributes with per-level counters
+    """
+
+    def __init__(self, prepare, run_seed=DEFAULT_RUN_SEED, path="live_summary.json", refresh_seconds=30.0,
+                 max_buffer=200, attributes=SEGMENTATION_ATTRIBUTES):
+        self.prepare = prepare
+        self.run_seed = run_seed
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.max_buffer = max_buffer
+        self.attributes = list(attributes)
+        self.columns = []  # (metric, kind, Original column, Adaptive column), kind: Original/Adaptive/change
+        for metric, (original_col, adaptive_col) in MONITORED_METRICS.items():
+            for kind in (*SCENARIOS, "change"):
+                self.columns.append((metric, kind, original_col, adaptive_col))
+        self.personas = 0
+        self.overall = RunningMoments(len(self.columns))
+        self.segments = {}  # (attribute, level) -> RunningMoments
+        self.quantiles = {metric: [P2Quantile(p) for p in LIVE_QUANTILES] for metric in MONITORED_METRICS}
+        self.parse_counts = {(label, questionnaire): {"requests": 0, "failed": 0, "incomplete": 0}
+                             for label in SCENARIOS for questionnaire in QUESTIONNAIRES}
+        self._buffer = []
+        self._refreshed_at = time.monotonic()
+
+    def add_row(self, row):
+        """Add one completed persona row; refreshes the summary when it is due."""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.max_buffer or time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+            self.refresh()
+
+    def add_rows(self, rows):
+        """Add rows in bulk (e.g. the personas a resumed run already finished), then refresh."""
+        for row in rows:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.max_buffer:
+                self._update()
+        self.refresh()
+
+    def refresh(self, show=True):
+        """Fold the buffered rows into the accumulators, rewrite the summary file and print the table."""
+        try:
+            self._update()
+            summary = self.summary()
+            if self.path:
+                temporary_path = f"{self.path}.tmp"
+                with open(temporary_path, "w", encoding="utf-8") as f:
+                    json.dump(summary, f, indent=2)
+                os.replace(temporary_path, self.path)  # Readers never see a half-written file
+            if show:
+                print_live_summary(summary)
+        except Exception as e:  # Live figures are a convenience; never stop the run for them
+            print(f"Warning: live statistics not updated: {e}")
+        self._refreshed_at = time.monotonic()
+
+    def _update(self):
+        rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        self._count_parse_failures(rows)
+        df = add_composite_scores(self.prepare(rows), run_seed=self.run_seed, warn=False)
+        values = np.column_stack([self._column_values(df, kind, original_col, adaptive_col)
+                                  for _, kind, original_col, adaptive_col in self.columns])
+        self.personas += len(rows)
+        self.overall.add(values)
+        for attribute in self.attributes:
+            if attribute not in df.columns:
+                continue
+            for level, index in df.groupby(attribute, sort=False).indices.items():
+                key = (attribute, level)
+                if key not in self.segments:
+                    self.segments[key] = RunningMoments(len(self.columns))
+                self.segments[key].add(values[index])
+        for k, (metric, kind, _, _) in enumerate(self.columns):
+            if kind == "change":
+                for value in values[~np.isnan(values[:, k]), k]:
+                    for sketch in self.quantiles[metric]:
+                        sketch.add(float(value))
+
+    @staticmethod
+    def _column_values(df, kind, original_col, adaptive_col):
+        def column(name):
+            return df[name].to_numpy(dtype=float) if name in df.columns else np.full(len(df), np.nan)
+        if kind == "Original":
+            return column(original_col)
+        if kind == "Adaptive":
+            return column(adaptive_col)
+        return column(adaptive_col) - column(original_col)
+
+    def _count_parse_failures(self, rows):
+        for row in rows:
+            for (label, questionnaire), counts in self.parse_counts.items():
+                text = row.get(f"{label}_Raw_{questionnaire}")
+                if text is None:
+                    continue  # Scenario not run in this session (see on_persona_done)
+                counts["requests"] += 1
+                if is_error_reply(text):
+                    counts["failed"] += 1
+                else:
+                    parsed, expected = count_parsed_fields(questionnaire, text)
+                    counts["incomplete"] += parsed < expected
+
+    def _moment_records(self, moments, segment):
+        variance = moments.variance()
+        records = []
+        for k, (metric, kind, _, _) in enumerate(self.columns):
+            n = int(moments.count[k])
+            mean = float(moments.mean[k]) if n else None
+            sd = math.sqrt(variance[k]) if n > 1 else None
+            half_width = stats.t.ppf(0.975, n - 1) * sd / math.sqrt(n) if n > 1 else None
+            records.append({"segment": segment, "metric": metric, "kind": kind, "n": n, "mean": mean, "sd": sd,
+                            "ci_low": mean - half_width if half_width is not None else None,
+                            "ci_high": mean + half_width if half_width is not None else None})
+        return records
+
+    def summary(self):
+        """Current figures as a dict (the content of the live summary file)."""
+        metrics = self._moment_records(self.overall, "All")
+        for record in metrics:
+            if record["kind"] == "change":
+                for p, sketch in zip(LIVE_QUANTILES, self.quantiles[record["metric"]]):
+                    value = sketch.value()
+                    record[f"p{round(p * 100)}"] = None if math.isnan(value) else value
+        segments = []
+        for (attribute, level), moments in sorted(self.segments.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            segments.extend(self._moment_records(moments, f"{attribute}={level}"))
+        parse = []
+        for (label, questionnaire), counts in self.parse_counts.items():
+            if counts["requests"]:
+                parse.append({"scenario": label, "questionnaire": questionnaire, **counts,
+                              "failure_rate": (counts["failed"] + counts["incomplete"]) / counts["requests"]})
+        return {"updated": time.strftime("%Y-%m-%d %H:%M:%S"), "personas": self.personas,
+                "metrics": metrics, "segments": segments, "parse": parse}
+
+def print_live_summary(summary):
+    """Print the live SUS/TLX changes, their change per segment level and the parse failure rates."""
+    def fmt(value, spec="+.2f"):
+        return "n/a" if value is None else format(value, spec)
+
+    print(f"\n--- Live results: {summary['personas']} personas ({summary['updated']}) ---")
+    by_metric = {}
+    for record in summary["metrics"]:
+        by_metric.setdefault(record["metric"], {})[record["kind"]] = record
+    for metric, records in by_metric.items():
+        change = records["change"]
+        print(f"{metric}: Original {fmt(records['Original']['mean'], '.2f')}, Adaptive {fmt(records['Adaptive']['mean'], '.2f')}, "
+              f"change {fmt(change['mean'])} [{fmt(change['ci_low'])}, {fmt(change['ci_high'])}] "
+              f"(median {fmt(change.get('p50'))}, n={change['n']})")
+        segment_changes = [f"{record['segment']} {fmt(record['mean'])}" for record in summary["segments"]
+                           if record["metric"] == metric and record["kind"] == "change" and record["n"]]
+        if segment_changes:
+            print("  by segment: " + ", ".join(segment_changes))
+    failures = [f"{record['scenario']} {record['questionnaire']} {record['failure_rate']:.1%}"
+                f" ({record['failed']} failed, {record['incomplete']} incomplete)"
+                for record in summary["parse"] if record["failed"] or record["incomplete"]]
+    print("Parse failures: " + ("; ".join(failures) if failures else "none"))
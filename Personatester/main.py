@@ -1,21 +1,131 @@
-from persona_generator import generate_personas
-from conversation import run_persona_conversation
+from persona_source import persona_source_from_options, persona_source_from_run_info
+from sequential import SequentialStopping, run_in_waves
+from simulation_engine import SCENARIO_LABELS, run_simulation
+from live_stats import LiveStats
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from results_journal import ResultsJournal
+from retry import RetryPolicy, CircuitBreaker
+from metrics import RunMetrics, print_metrics_summary
+from api_client import create_openai_client
+from backends import OpenAIBackend, DEFAULT_MODEL
+from postprocessing import postprocess_results
+from rng import DEFAULT_RUN_SEED
 from analysis import analyze_simulation_data
 from questions import NASA_TLX_SUBSCALES_PAPER # Import the subscales list
 import pandas as pd
 import os # Ensure os is imported for path operations
 import sys # For sys.stdout.encoding
-from tqdm import tqdm
-import os
+import argparse
 from dotenv import load_dotenv
 
 # Set the number of personas to simulate
 persona_count = 100
+# Stratified sampling instead of persona_count independent personas (sampling.py): None, "covering" (every
+# level and level pair of the segmentation attributes, fewest personas) or "joint" (every combination)
+persona_sampling = None
+personas_per_segment = 30  # Personas wanted in every segment the analysis reports
+# Sequential early stopping (sequential.py): simulate in waves and stop once the SUS and TLX-overall changes are
+# settled (confidence interval narrow enough, or the sequential test conclusive); the personas above are the budget
+sequential_stopping = False
+stopping_wave_size = 20
+stopping_ci_width = {"SUS Score": 5.0, "TLX Overall": 1.0}  # Target full width of each 95% interval
+stopping_alpha = 0.05
+# CSV/Parquet panel of respondents to simulate instead of generated personas (read in chunks, see persona_source.py)
+persona_panel_path = None
+persona_panel_id_column = "id"  # Panel column with the respondent id (row position if the panel has none)
+# Maximum number of persona conversations running against the API at the same time
+concurrency = 8
+# Chat model and HTTP client settings (one pooled keep-alive client is shared by all workers)
+model_name = DEFAULT_MODEL
+connect_timeout = 5.0   # seconds
+read_timeout = 60.0     # seconds
+# Account rate limits shared by all workers (updated automatically from x-ratelimit-* headers)
+requests_per_minute = 3500
+tokens_per_minute = 90000
+# Ask the performance, SUS and NASA-TLX questions in one request per scenario instead of three
+combined_questionnaire = False
+# Ask for answers as JSON objects (JSON output mode) instead of 'Key: value' lines parsed with regexes
+json_output = False
+# Send one short follow-up for answers missing from a reply instead of losing them
+reask_missing_fields = True
+# On-disk cache of API replies: identical prompts on a re-run are answered without calling the API
+use_response_cache = True
+refresh_response_cache = False  # Ignore stored replies and overwrite them with fresh ones
+response_cache_path = "llm_response_cache.sqlite"
+response_cache_max_mb = 500
+# Every finished persona/scenario result is appended here; use --resume to continue an interrupted run
+journal_path = "simulation_journal.jsonl"
+# Transient API errors (429, 5xx, timeouts) are retried with capped exponential backoff and jitter
+max_retries = 5
+retry_base_delay = 1.0   # seconds
+retry_max_delay = 30.0   # seconds
+# If half of the recent calls fail, all workers pause for the cooldown instead of hammering the API
+circuit_breaker_cooldown = 30.0  # seconds
+# Seed of the run: the personas and every random draw after them (TLX defaults, post-processing, analysis
+# fillers) come from per-persona streams keyed by (run_seed, persona id, scenario, stage), see rng.py,
+# so results are identical for any concurrency or completion order
+run_seed = DEFAULT_RUN_SEED
+# Per-call latency, token and cost records, plus a run summary (p50/p95/p99 latency, cost per questionnaire)
+call_metrics_path = "call_metrics.csv"
+metrics_summary_path = "run_metrics_summary.json"
+# Live SUS/TLX changes, per-segment changes and parse failure rates, updated while the run is in progress
+# (live_stats.py): rewritten and printed every live_refresh_seconds; None turns the live summary off
+live_summary_path = "live_summary.json"
+live_refresh_seconds = 30.0
 
 def main():
+    parser = argparse.ArgumentParser(description="Simulate persona reactions to the Original and New dashboard.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the run recorded in the journal, skipping work that is already done")
+    parser.add_argument("--journal", default=journal_path, help="Results journal file")
+    parser.add_argument("--personas-file", default=persona_panel_path,
+                        help="CSV or Parquet persona panel to simulate instead of generated personas")
+    parser.add_argument("--sampling", choices=["covering", "joint"], default=persona_sampling,
+                        help="Stratified persona sampling design covering the segmentation attributes")
+    parser.add_argument("--per-segment", type=int, default=personas_per_segment,
+                        help="Personas per segment with --sampling")
+    parser.add_argument("--sequential", action="store_true", default=sequential_stopping,
+                        help="Simulate in waves and stop once the SUS and TLX changes are settled")
+    args = parser.parse_args()
+
     load_dotenv()
-    original_state_description = input("Enter the description for the Original State: ")
-    new_state_description = input("Enter the description for the New State: ")
+    # One explicitly configured client per run, with a connection pool sized to the concurrency
+    client = create_openai_client(max_connections=concurrency, max_keepalive_connections=concurrency,
+                                  connect_timeout=connect_timeout, read_timeout=read_timeout,
+                                  max_retries=0)  # Retries are handled by retry_policy below
+    if client is None:
+        return
+    backend = OpenAIBackend(model=model_name, client=client)
+
+    journal = ResultsJournal(args.journal, resume=args.resume)
+    if args.resume and journal.run_info:
+        # Re-use the settings of the interrupted run so the skipped work still matches
+        print(f"Resuming run from {args.journal}: {len(journal.completed)} persona/scenario results already recorded.")
+        original_state_description = journal.run_info["original_state_description"]
+        new_state_description = journal.run_info["new_state_description"]
+        run_persona_seed = journal.run_info.get("run_seed", DEFAULT_RUN_SEED)  # Journals from before run_seed
+        personas = persona_source_from_run_info(journal.run_info)
+        sequential = journal.run_info.get("sequential")
+    else:
+        original_state_description = input("Enter the description for the Original State: ")
+        new_state_description = input("Enter the description for the New State: ")
+        run_persona_seed = run_seed
+        personas = persona_source_from_options(persona_count, seed=run_persona_seed, personas_file=args.personas_file,
+                                               sampling=args.sampling, per_segment=args.per_segment,
+                                               id_column=persona_panel_id_column)
+        if args.sampling and not args.personas_file:
+            print(f"Stratified sampling ({args.sampling}): {len(personas)} personas in {len(personas.plan)} cells.")
+        sequential = None
+        if args.sequential:
+            if not hasattr(personas, "__len__"):
+                # The persona budget sets the stopping boundaries; guessing it would cap the run and shift them
+                parser.error("--sequential needs a persona source whose size is known")
+            sequential = {"wave_size": stopping_wave_size, "ci_width": stopping_ci_width, "alpha": stopping_alpha,
+                          "max_personas": len(personas)}
+        journal.write_run_info(original_state_description=original_state_description,
+                               new_state_description=new_state_description,
+                               run_seed=run_persona_seed, sequential=sequential, **personas.describe())
 
     print("\n--- Original State Description ---")
     try:
@@ -29,24 +139,69 @@ def main():
         print(new_state_description.encode(sys.stdout.encoding, errors='replace').decode(sys.stdout.encoding, errors='replace'))
     print("---------------------------------------------------------\n")
     
-    personas = generate_personas(persona_count)
-    results = []
+    # Original and Adaptive conversations for many personas run concurrently, reading personas from
+    # the source as workers free up; rows come back in persona order with the same layout as the old serial loop.
+    rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    response_cache = ResponseCache(response_cache_path, max_size_mb=response_cache_max_mb,
+                                   enabled=use_response_cache, refresh=refresh_response_cache)
+    retry_policy = RetryPolicy(max_retries=max_retries, base_delay=retry_base_delay, max_delay=retry_max_delay,
+                               circuit_breaker=CircuitBreaker(cooldown=circuit_breaker_cooldown))
+    run_metrics = RunMetrics()
+    live_stats = None
+    if live_summary_path:
+        live_stats = LiveStats(lambda rows: prepare_results_frame(rows, personas.attribute_names, seed=run_persona_seed),
+                               run_seed=run_persona_seed, path=live_summary_path, refresh_seconds=live_refresh_seconds)
+        if journal.completed:
+            # Personas finished before the resume count too (the engine only reports the ones it runs)
+            live_stats.add_rows(journal.build_rows(
+                persona for persona in personas
+                if all((persona["id"], label) in journal.completed for label in SCENARIO_LABELS)))
+    try:
+        # Results are rebuilt from the journal, so nothing paid for is lost if the run stops early
+        simulation_kwargs = dict(concurrency=concurrency, journal=journal, backend=backend, rate_limiter=rate_limiter,
+                                 combined=combined_questionnaire, json_output=json_output, reask_missing=reask_missing_fields,
+                                 cache=response_cache,
+                                 retry_policy=retry_policy, metrics=run_metrics, run_seed=run_persona_seed,
+                                 on_persona_done=live_stats.add_row if live_stats else None)
+        if sequential:
+            # Waves of personas until the paired changes are settled; a resumed run replays the same decisions
+            stopping = SequentialStopping(sequential["max_personas"], ci_width=sequential["ci_width"],
+                                          alpha=sequential["alpha"])
+            results = run_in_waves(
+                personas,
+                lambda wave: run_simulation(wave, original_state_description, new_state_description, **simulation_kwargs),
+                lambda rows: prepare_results_frame(rows, personas.attribute_names, seed=run_persona_seed),
+                stopping, wave_size=sequential["wave_size"], run_seed=run_persona_seed)
+        else:
+            results = run_simulation(personas, original_state_description, new_state_description, **simulation_kwargs)
+    finally:
+        if live_stats:
+            live_stats.refresh()
+            print(f"Live summary saved to {live_summary_path}")
+        journal.close()
+        client.close()
+        run_metrics.write_csv(call_metrics_path)
+        print_metrics_summary(run_metrics.write_summary(metrics_summary_path))
+        print(f"Call metrics saved to {call_metrics_path}, summary to {metrics_summary_path}")
+    if use_response_cache:
+        cache_stats = response_cache.stats()
+        print(f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['entries']} entries, {cache_stats['size_mb']:.1f} MB)")
+    response_cache.close()
 
-    for persona in tqdm(personas, desc="Simulating personas"):
-        row = {**persona} # Start with persona attributes
+    save_and_analyze(results, personas.attribute_names, seed=run_persona_seed)
 
-        # Run conversation for the original state
-        original_results = run_persona_conversation(persona, original_state_description, "Original")
-        if original_results:
-            row.update(original_results)
+def prepare_results_frame(results, persona_attribute_names, seed=None):
+    """Build the cleaned per-persona results frame: numeric answers, post-processing, 1-5 scale check.
 
-        # Run conversation for the new/adaptive state
-        adaptive_results = run_persona_conversation(persona, new_state_description, "Adaptive")
-        if adaptive_results:
-            row.update(adaptive_results)
-        
-        results.append(row)
+    Args:
+        results: List of per-persona row dicts (persona attributes plus Original_/Adaptive_ results)
+        persona_attribute_names: Columns that hold persona attributes rather than results
+        seed: Run seed keying the post-processing random streams (default: run_seed)
 
+    Returns:
+        pd.DataFrame: The frame save_and_analyze writes and analyzes
+    """
     df = pd.DataFrame(results)
     df_all_personas = df # Assign df to df_all_personas here
 
@@ -65,7 +220,7 @@ def main():
             continue # Skip raw text columns
         
         # Check for persona attributes, skip them for numeric conversion here
-        if col_name in personas[0]: # Assumes all personas have same keys
+        if col_name in persona_attribute_names:
              continue
 
         if col_name.startswith("Original_Time_") or col_name.startswith("Adaptive_Time_") or \
@@ -78,10 +233,30 @@ def main():
 
     for col in numeric_cols:
         df_all_personas[col] = pd.to_numeric(df_all_personas[col], errors='coerce')
+
+    # The rows hold the parsed model answers only; persona bias and TLX adjustment run here over the whole frame
+    seed = run_seed if seed is None else seed
+    postprocess_results(df_all_personas, run_seed=seed)
+
+    for col in numeric_cols:
         if col in scale_rating_cols:
             df_all_personas[col] = df_all_personas[col].where(df_all_personas[col].isin([1, 2, 3, 4, 5]))
+    return df_all_personas
+
+def save_and_analyze(results, persona_attribute_names, output_filename="simulated_persona_metrics.csv", seed=None):
+    """Clean the per-persona result rows, apply the post-processing stage, save them and run the analysis.
+
+    Shared by main(), the offline batch ingest step (batch_pipeline.py) and reanalyze.py.
+
+    Args:
+        results: List of per-persona row dicts (persona attributes plus Original_/Adaptive_ results)
+        persona_attribute_names: Columns that hold persona attributes rather than results
+        output_filename: Per-persona metrics CSV to write
+        seed: Run seed keying the post-processing and analysis random streams (default: run_seed)
+    """
+    seed = run_seed if seed is None else seed
+    df_all_personas = prepare_results_frame(results, persona_attribute_names, seed=seed)
 
-    output_filename = "simulated_persona_metrics.csv"
     df_all_personas.to_csv(output_filename, index=False)
     print(f"Simulation complete. Results saved to {output_filename}.")
 
@@ -132,10 +307,11 @@ def main():
     # Analyze the collected data
     # analyze_simulation_data will now save the summary to 'simulated_persona_analyzed_data.csv'
     # and return the detailed DataFrame for us to save as 'simulated_persona_metrics.csv'.
-    detailed_df_from_analysis = analyze_simulation_data(df_all_personas, viz_output_dir, all_numeric_columns_created, NASA_TLX_SUBSCALES_PAPER)
+    detailed_df_from_analysis = analyze_simulation_data(df_all_personas, viz_output_dir, all_numeric_columns_created, NASA_TLX_SUBSCALES_PAPER,
+                                                         run_seed=seed)
 
     # Save the detailed per-persona DataFrame (returned by analysis.py)
-    detailed_output_filename = 'simulated_persona_metrics.csv'
+    detailed_output_filename = output_filename
     try:
         if detailed_df_from_analysis is not None:
             detailed_df_from_analysis.to_csv(detailed_output_filename, index=False, float_format='%.2f')
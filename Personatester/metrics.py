@@ -0,0 +1,145 @@
+import csv
+import json
+import threading
+import time
+import numpy as np
+
+# USD per 1M (prompt, completion) tokens, used for the cost estimate in the run summary
+MODEL_PRICES_PER_MILLION = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+}
+
+# Column order of the per-call metrics CSV
+CALL_METRIC_FIELDS = [
+    "persona_id", "scenario", "questionnaire", "model", "cached", "error",
+    "queue_wait_seconds", "throttle_wait_seconds", "latency_seconds", "total_seconds", "retries",
+    "prompt_tokens", "completion_tokens", "cost_usd", "parsed_fields", "expected_fields", "parse_ok", "reask",
+]
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Estimated USD cost of one call, or None if the model's price or the token counts are unknown."""
+    prices = MODEL_PRICES_PER_MILLION.get(model)
+    if prices is None or prompt_tokens is None or completion_tokens is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+def _percentiles(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+class RunMetrics:
+    """Thread-safe collector of one record per completion call in a simulation run.
+
+    run_persona_conversation adds a record for every questionnaire request (see record_call);
+    at the end of the run write_csv() exports them and summary() aggregates latency
+    percentiles, token usage, cost and parse success.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record_call(self, **fields):
+        record = {field: fields.get(field) for field in CALL_METRIC_FIELDS}
+        if record["cached"] or record["error"]:
+            record["cost_usd"] = 0.0  # No tokens were billed for this call
+        else:
+            record["cost_usd"] = estimate_cost(record["model"], record["prompt_tokens"], record["completion_tokens"])
+        with self._lock:
+            self.records.append(record)
+
+    def write_csv(self, path="call_metrics.csv"):
+        with self._lock:
+            records = list(self.records)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CALL_METRIC_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+
+    def summary(self):
+        """Aggregate the call records into a dict of run-level figures."""
+        with self._lock:
+            records = list(self.records)
+        api_calls = [r for r in records if not r["cached"]]
+        succeeded = [r for r in api_calls if not r["error"]]
+        personas = {r["persona_id"] for r in records}
+        prompt_tokens = sum(r["prompt_tokens"] or 0 for r in api_calls)
+        completion_tokens = sum(r["completion_tokens"] or 0 for r in api_calls)
+        costs = [r["cost_usd"] for r in api_calls if r["cost_usd"] is not None]
+
+        reasks = [r for r in records if r["reask"]]
+        per_questionnaire = {}
+        for questionnaire in sorted({r["questionnaire"] for r in records}):
+            calls = [r for r in records if r["questionnaire"] == questionnaire and not r["reask"]]
+            call_costs = [r["cost_usd"] for r in calls if r["cost_usd"] is not None]
+            answered = [r for r in calls if not r["error"]]
+            per_questionnaire[questionnaire] = {
+                "calls": len(calls),
+                "latency_seconds": _percentiles([r["latency_seconds"] for r in calls if not r["cached"] and not r["error"]]),
+                "mean_prompt_tokens": float(np.mean([r["prompt_tokens"] for r in answered if r["prompt_tokens"] is not None]))
+                                      if any(r["prompt_tokens"] is not None for r in answered) else None,
+                "mean_completion_tokens": float(np.mean([r["completion_tokens"] for r in answered if r["completion_tokens"] is not None]))
+                                          if any(r["completion_tokens"] is not None for r in answered) else None,
+                "cost_usd": sum(call_costs) if call_costs else None,
+                "cost_per_call_usd": sum(call_costs) / len(call_costs) if call_costs else None,
+                "parse_success_rate": sum(1 for r in answered if r["parse_ok"]) / len(answered) if answered else None,
+            }
+
+        return {
+            "wall_seconds": time.monotonic() - self.started_at,
+            "calls": len(records),
+            "api_calls": len(api_calls),
+            "cached_calls": len(records) - len(api_calls),
+            "failed_calls": sum(1 for r in records if r["error"]),
+            "retries": sum(r["retries"] or 0 for r in records),
+            "personas": len(personas),
+            "latency_seconds": _percentiles([r["latency_seconds"] for r in succeeded]),
+            "queue_wait_seconds": _percentiles([r["queue_wait_seconds"] for r in records]),
+            "throttle_wait_seconds": _percentiles([r["throttle_wait_seconds"] for r in api_calls]),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "tokens_per_persona": (prompt_tokens + completion_tokens) / len(personas) if personas else None,
+            "estimated_cost_usd": sum(costs) if costs or not api_calls else None,
+            "parse_success_rate": sum(1 for r in records if r["parse_ok"] and not r["reask"])
+                                  / sum(1 for r in records if not r["error"] and not r["reask"])
+                                  if any(not r["error"] and not r["reask"] for r in records) else None,
+            "reask_calls": len(reasks),
+            "reask_fields_requested": sum(r["expected_fields"] or 0 for r in reasks),
+            "reask_fields_recovered": sum(r["parsed_fields"] or 0 for r in reasks),
+            "by_questionnaire": per_questionnaire,
+        }
+
+    def write_summary(self, path="run_metrics_summary.json"):
+        summary = self.summary()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+def print_metrics_summary(summary):
+    """Print the headline figures of a RunMetrics summary."""
+    def fmt(value, spec=".2f", unit=""):
+        return "n/a" if value is None else format(value, spec) + unit
+
+    latency = summary["latency_seconds"]
+    print("\n--- API call metrics ---")
+    print(f"Calls: {summary['calls']} ({summary['api_calls']} API, {summary['cached_calls']} cached, "
+          f"{summary['failed_calls']} failed, {summary['retries']} retries)")
+    print(f"Latency p50/p95/p99: {fmt(latency['p50'], unit='s')} / {fmt(latency['p95'], unit='s')} / {fmt(latency['p99'], unit='s')}")
+    print(f"Queue wait p95: {fmt(summary['queue_wait_seconds']['p95'], unit='s')}, "
+          f"throttle wait p95: {fmt(summary['throttle_wait_seconds']['p95'], unit='s')}")
+    print(f"Tokens: {summary['prompt_tokens']} prompt + {summary['completion_tokens']} completion, "
+          f"{fmt(summary['tokens_per_persona'], '.0f')} per persona")
+    print(f"Estimated cost: {fmt(summary['estimated_cost_usd'], '.4f', ' USD')}")
+    if summary["reask_calls"]:
+        print(f"Re-asks: {summary['reask_calls']} calls recovered {summary['reask_fields_recovered']} "
+              f"of {summary['reask_fields_requested']} missing answers")
+    for questionnaire, stats in summary["by_questionnaire"].items():
+        print(f"  {questionnaire}: {stats['calls']} calls, p95 latency {fmt(stats['latency_seconds']['p95'], unit='s')}, "
+              f"{fmt(stats['cost_per_call_usd'], '.5f', ' USD')} per call, parse success {fmt(stats['parse_success_rate'], '.1%')}")
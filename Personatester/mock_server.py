@@ -0,0 +1,212 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from canned_responses import canned_reply
+from rate_limiter import CHARS_PER_TOKEN
+
+def make_latency_sampler(distribution="lognormal", mean=0.5, spread=0.5, rng=None):
+    """Return a function that draws one response latency in seconds.
+
+    Args:
+        distribution: 'constant', 'uniform' (mean +/- spread), 'exponential' or 'lognormal'
+                      (median `mean`, log-space sigma `spread`)
+        mean: Typical latency in seconds
+        spread: Distribution width (see above)
+    """
+    rng = rng or random.Random()
+    if distribution == "constant":
+        return lambda: mean
+    if distribution == "uniform":
+        return lambda: max(0.0, rng.uniform(mean - spread, mean + spread))
+    if distribution == "exponential":
+        return lambda: rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+    if distribution == "lognormal":
+        return lambda: rng.lognormvariate(math.log(mean), spread) if mean > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution: {distribution}")
+
+class MockChatServer:
+    """Local HTTP server that speaks the chat-completions protocol with canned questionnaire answers.
+
+    Lets the pipeline's own throughput (concurrency, rate limiting, retries, parsing) be
+    benchmarked offline. Replies are well-formed performance/SUS/TLX answers (see
+    canned_responses.canned_reply, JSON objects when response_format asks for them), delayed by a configurable latency distribution, with
+    configurable rates of injected 500 errors and 429 rate-limit responses, and optionally with
+    answers left out of otherwise good replies.
+
+    Args:
+        host, port: Address to listen on (port 0 picks a free port)
+        latency: Latency distribution name (see make_latency_sampler)
+        latency_mean, latency_spread: Latency distribution parameters in seconds
+        error_rate: Fraction of requests answered with a 500 error
+        rate_limit_rate: Fraction of requests answered with a 429 and a Retry-After header
+        requests_per_minute: If set, requests beyond this many in the last 60 seconds get a 429
+        drop_field_rate: Probability that each answer field is left out of a successful reply
+        seed: Seed for the latency and fault injection random draws
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency="lognormal", latency_mean=0.5, latency_spread=0.5,
+                 error_rate=0.0, rate_limit_rate=0.0, requests_per_minute=None, seed=None, drop_field_rate=0.0):
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.sample_latency = make_latency_sampler(latency, latency_mean, latency_spread, self._rng)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.requests_per_minute = requests_per_minute
+        self.drop_field_rate = drop_field_rate
+        self._recent_requests = deque()
+        self.request_count = 0
+        self.status_counts = {}
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """Serve in a background thread and return self."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve in the current thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _draw(self):
+        with self._rng_lock:
+            return self._rng.random(), self.sample_latency()
+
+    def _drop_fields(self, content, json_output):
+        """Leave out each answer of a canned reply with probability drop_field_rate."""
+        with self._rng_lock:
+            if json_output:
+                values = json.loads(content)
+                return json.dumps({k: v for k, v in values.items() if self._rng.random() >= self.drop_field_rate})
+            return "\n".join(line for line in content.split("\n") if self._rng.random() >= self.drop_field_rate)
+
+    def _over_rate_limit(self):
+        if not self.requests_per_minute:
+            return False, None
+        with self._stats_lock:
+            now = time.monotonic()
+            while self._recent_requests and now - self._recent_requests[0] > 60:
+                self._recent_requests.popleft()
+            if len(self._recent_requests) >= self.requests_per_minute:
+                return True, 60 - (now - self._recent_requests[0])
+            self._recent_requests.append(now)
+            return False, self.requests_per_minute - len(self._recent_requests)
+
+    def _count(self, status):
+        with self._stats_lock:
+            self.request_count += 1
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, str(value))
+                self.end_headers()
+                self.wfile.write(body)
+                server._count(status)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+                    return
+
+                fault_draw, latency = server._draw()
+                time.sleep(latency)
+
+                limited, remaining = server._over_rate_limit()
+                if limited or fault_draw < server.rate_limit_rate:
+                    retry_after = max(1, int(round(remaining))) if limited else 1
+                    self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}},
+                                    headers={"Retry-After": retry_after, "x-ratelimit-remaining-requests": 0,
+                                             "x-ratelimit-reset-requests": f"{retry_after}s"})
+                    return
+                if fault_draw < server.rate_limit_rate + server.error_rate:
+                    self._send_json(500, {"error": {"message": "Internal server error (mock)", "type": "server_error"}})
+                    return
+
+                messages = request.get("messages", [])
+                json_output = (request.get("response_format") or {}).get("type") == "json_object"
+                content = canned_reply(messages, json_output=json_output)
+                if server.drop_field_rate:
+                    content = server._drop_fields(content, json_output)
+                prompt_tokens = sum(len(m.get("content") or "") for m in messages) // CHARS_PER_TOKEN
+                completion_tokens = len(content) // CHARS_PER_TOKEN
+                headers = {}
+                if server.requests_per_minute:
+                    headers["x-ratelimit-limit-requests"] = server.requests_per_minute
+                    headers["x-ratelimit-remaining-requests"] = remaining
+                self._send_json(200, {
+                    "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "mock"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                              "total_tokens": prompt_tokens + completion_tokens},
+                }, headers=headers)
+
+        return Handler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the chat-completions API with canned questionnaire answers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", default="lognormal", choices=["constant", "uniform", "exponential", "lognormal"])
+    parser.add_argument("--latency-mean", type=float, default=0.5)
+    parser.add_argument("--latency-spread", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--requests-per-minute", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--drop-field-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    mock = MockChatServer(args.host, args.port, args.latency, args.latency_mean, args.latency_spread,
+                          args.error_rate, args.rate_limit_rate, args.requests_per_minute, args.seed,
+                          args.drop_field_rate)
+    print(f"Mock chat-completions server listening on {mock.base_url} (Ctrl-C to stop)")
+    try:
+        mock.serve_forever()
+    except KeyboardInterrupt:
+        pass
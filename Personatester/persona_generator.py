@@ -1,35 +1,97 @@
 import random
+import numpy as np
+import pandas as pd
 
-def generate_personas(n, seed=42):
-    random.seed(seed)
-    personas = []
+# Sampled persona attributes, in column order: name -> ("int", (low, high)) for an inclusive
+# integer range, or ("choice", [options]). Shared by generate_personas and generate_persona_frame.
+PERSONA_ATTRIBUTES = {
+    "age": ("int", (20, 60)),
+    "role": ("choice", ["Operator", "Technician", "Supervisor"]),
+    "experience_years": ("int", (1, 30)),
+    "tech_savvy": ("choice", ["Low", "Medium", "High"]),
+    "stress_tolerance": ("choice", ["Low", "Medium", "High"]),
+    "shift": ("choice", ["Day", "Night"]),
+    "outlook": ("choice", ["optimistic", "neutral", "pessimistic"]),
+    # Big Five personality traits (1-5)
+    "openness": ("int", (1, 5)),
+    "conscientiousness": ("int", (1, 5)),
+    "extraversion": ("int", (1, 5)),
+    "agreeableness": ("int", (1, 5)),
+    "neuroticism": ("int", (1, 5)),
+    # Learning style
+    "learning_style": ("choice", ["Visual", "Auditory", "Kinesthetic", "Reading/Writing"]),
+    # Demographics
+    "region": ("choice", ["North America", "Europe", "Asia", "South America", "Africa", "Oceania"]),
+    "education": ("choice", ["High School", "Associate Degree", "Bachelor's", "Master's", "PhD"]),
+    "gender": ("choice", ["Male", "Female", "Other"]),
+    # Prior tech experience (years)
+    "prior_tech_experience": ("int", (0, 30)),
+    # Background (prior experience with change)
+    "prior_change_experience": ("choice", ["None", "Some", "Extensive"]),
+}
+
+# Attributes the analysis segments results by (analysis.analyze_simulation_data), and that the
+# stratified sampling designs in sampling.py cover
+SEGMENTATION_ATTRIBUTES = ["tech_savvy", "role", "outlook"]
+
+def persona_name(persona_id):
+    return f"Persona_{persona_id}"
+
+def iter_personas(n, seed=42):
+    """Yield the personas of generate_personas(n, seed) one at a time."""
+    # A private generator: same personas as seeding the global one, without touching global state
+    rng = random.Random(seed)
     for i in range(n):
-        persona = {
-            "id": i,
-            "name": f"Persona_{i}",
-            "age": random.randint(20, 60),
-            "role": random.choice(["Operator", "Technician", "Supervisor"]),
-            "experience_years": random.randint(1, 30),
-            "tech_savvy": random.choice(["Low", "Medium", "High"]),
-            "stress_tolerance": random.choice(["Low", "Medium", "High"]),
-            "shift": random.choice(["Day", "Night"]),
-            "outlook": random.choice(["optimistic", "neutral", "pessimistic"]),
-            # Big Five personality traits (1-5)
-            "openness": random.randint(1, 5),
-            "conscientiousness": random.randint(1, 5),
-            "extraversion": random.randint(1, 5),
-            "agreeableness": random.randint(1, 5),
-            "neuroticism": random.randint(1, 5),
-            # Learning style
-            "learning_style": random.choice(["Visual", "Auditory", "Kinesthetic", "Reading/Writing"]),
-            # Demographics
-            "region": random.choice(["North America", "Europe", "Asia", "South America", "Africa", "Oceania"]),
-            "education": random.choice(["High School", "Associate Degree", "Bachelor's", "Master's", "PhD"]),
-            "gender": random.choice(["Male", "Female", "Other"]),
-            # Prior tech experience (years)
-            "prior_tech_experience": random.randint(0, 30),
-            # Background (prior experience with change)
-            "prior_change_experience": random.choice(["None", "Some", "Extensive"]),
-        }
-        personas.append(persona)
-    return personas
+        persona = {"id": i, "name": persona_name(i)}
+        for attribute, (kind, spec) in PERSONA_ATTRIBUTES.items():
+            persona[attribute] = rng.randint(*spec) if kind == "int" else rng.choice(spec)
+        yield persona
+
+def generate_personas(n, seed=42):
+    return list(iter_personas(n, seed))
+
+def generate_persona_frame(n, seed=42):
+    """Generate `n` personas as one DataFrame, sampled column by column with NumPy.
+
+    Choice attributes are categoricals and integer attributes use the smallest fitting integer
+    dtype, so millions of personas take a few bytes each. The names are not stored; they follow
+    from the id (see iter_persona_dicts). The values come from a numpy.random.Generator, so they
+    differ from generate_personas with the same seed.
+
+    Args:
+        n: Number of personas
+        seed: Seed of the generator
+
+    Returns:
+        pd.DataFrame: One row per persona: 'id' plus the PERSONA_ATTRIBUTES columns
+    """
+    rng = np.random.default_rng(seed)
+    columns = {"id": np.arange(n, dtype=np.int64)}
+    for attribute, (kind, spec) in PERSONA_ATTRIBUTES.items():
+        if kind == "int":
+            low, high = spec
+            columns[attribute] = rng.integers(low, high + 1, size=n, dtype=np.min_scalar_type(-high if low < 0 else high))
+        else:
+            codes = rng.integers(0, len(spec), size=n, dtype=np.int8)
+            columns[attribute] = pd.Categorical.from_codes(codes, categories=spec)
+    return pd.DataFrame(columns, copy=False)
+
+def iter_persona_dicts(frame, chunk_size=10000):
+    """Yield the persona dicts run_persona_conversation expects from a persona frame, in row order.
+
+    Values are plain Python ints and strings, with the keys in the same order as generate_personas
+    ('name' is added from the id if the frame has no name column). Rows are converted a chunk at a
+    time, so iterating a large frame does not build every dict at once.
+    """
+    attributes = [attribute for attribute in PERSONA_ATTRIBUTES if attribute in frame.columns]
+    extra = [col for col in frame.columns if col not in PERSONA_ATTRIBUTES and col not in ("id", "name")]
+    for start in range(0, len(frame), chunk_size):
+        chunk = frame.iloc[start:start + chunk_size]
+        ids = chunk["id"].tolist() if "id" in chunk.columns else list(range(start, start + len(chunk)))
+        names = chunk["name"].tolist() if "name" in chunk.columns else [persona_name(i) for i in ids]
+        values = [chunk[col].tolist() for col in attributes + extra]
+        for i, (persona_id, name) in enumerate(zip(ids, names)):
+            persona = {"id": persona_id, "name": name}
+            for col, column_values in zip(attributes + extra, values):
+                persona[col] = column_values[i]
+            yield persona
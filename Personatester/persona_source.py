@@ -0,0 +1,213 @@
+import os
+from abc import ABC, abstractmethod
+import pandas as pd
+from persona_generator import PERSONA_ATTRIBUTES, iter_personas, iter_persona_dicts, persona_name
+from rng import DEFAULT_RUN_SEED
+from sampling import covering_cells, iter_stratified_personas, joint_cells, plan_size, quota_plan
+
+# Columns of the personas generate_personas produces
+GENERATED_PERSONA_SCHEMA = ["id", "name", *PERSONA_ATTRIBUTES]
+# Attributes the persona prompt cannot do without (conversation.build_system_message); others are optional
+REQUIRED_PERSONA_ATTRIBUTES = ["age", "role", "tech_savvy", "stress_tolerance", "shift"]
+
+class PersonaSource(ABC):
+    """Re-iterable stream of persona dicts with an up-front attribute schema.
+
+    Every persona is a dict with at least 'id' and 'name' plus the columns in `attribute_names`.
+    Sources are read lazily, so a panel larger than memory can be fed to run_simulation, and they
+    can be iterated again (e.g. to rebuild the result rows from the journal at the end of a run).
+    Subclasses must implement __iter__ (an incomplete subclass cannot be instantiated), and
+    __len__ when the count is known or cheap to find.
+
+    Args:
+        attribute_names: Persona attribute columns, in output order (including 'id' and 'name')
+    """
+
+    def __init__(self, attribute_names):
+        self.attribute_names = list(attribute_names)
+
+    @abstractmethod
+    def __iter__(self):
+        """Yield the persona dicts, from the first one, every time it is called."""
+
+    def describe(self):
+        """JSON-serialisable settings recorded in the journal, so a resumed run reads the same personas."""
+        return {}
+
+class GeneratedPersonaSource(PersonaSource):
+    """The synthetic personas of generate_personas(count, seed), generated as they are read."""
+
+    def __init__(self, count, seed=DEFAULT_RUN_SEED):
+        super().__init__(GENERATED_PERSONA_SCHEMA)
+        self.count = count
+        self.seed = seed
+
+    def __iter__(self):
+        return iter_personas(self.count, self.seed)
+
+    def __len__(self):
+        return self.count
+
+    def describe(self):
+        return {"persona_count": self.count}
+
+class StratifiedPersonaSource(PersonaSource):
+    """Generated personas with quotas per segment cell (see sampling.py), generated as they are read.
+
+    Args:
+        plan: (cell dict, count) pairs from sampling.quota_plan
+        seed: Seed of the generated attributes outside the cells
+    """
+
+    def __init__(self, plan, seed=DEFAULT_RUN_SEED):
+        super().__init__(GENERATED_PERSONA_SCHEMA)
+        self.plan = [(dict(cell), int(count)) for cell, count in plan]
+        self.seed = seed
+
+    def __iter__(self):
+        return iter_stratified_personas(self.plan, self.seed)
+
+    def __len__(self):
+        return plan_size(self.plan)
+
+    def describe(self):
+        return {"persona_count": len(self), "persona_sampling": [{"cell": cell, "count": count} for cell, count in self.plan]}
+
+class FramePersonaSource(PersonaSource):
+    """Personas from an in-memory DataFrame, e.g. persona_generator.generate_persona_frame()."""
+
+    def __init__(self, frame):
+        extra = [col for col in frame.columns if col not in GENERATED_PERSONA_SCHEMA]
+        super().__init__(["id", "name"] + [col for col in PERSONA_ATTRIBUTES if col in frame.columns] + extra)
+        self.frame = frame
+
+    def __iter__(self):
+        return iter_persona_dicts(self.frame)
+
+    def __len__(self):
+        return len(self.frame)
+
+class _FilePersonaSource(PersonaSource):
+    """Shared chunk-to-dict handling of the CSV and Parquet panel readers."""
+
+    def __init__(self, path, columns, attribute_names=None, id_column="id", chunk_size=10000):
+        if attribute_names is None:
+            attribute_names = columns
+        missing = [col for col in attribute_names if col not in columns and col not in ("id", "name")]
+        missing += [col for col in REQUIRED_PERSONA_ATTRIBUTES if col not in attribute_names and col not in missing]
+        if missing:
+            raise ValueError(f"Persona panel {path} has no column(s): {', '.join(missing)}")
+        self.path = path
+        self.id_column = id_column if id_column in columns else None
+        self.chunk_size = chunk_size
+        self._read_columns = [col for col in attribute_names if col not in ("id", "name", id_column)]
+        self._has_name = "name" in columns
+        super().__init__(["id", "name"] + self._read_columns)
+
+    def _columns_to_read(self):
+        columns = list(self._read_columns)
+        if self.id_column:
+            columns.append(self.id_column)
+        if self._has_name:
+            columns.append("name")
+        return columns
+
+    def _records(self, chunks):
+        position = 0
+        for records in chunks:
+            for record in records:
+                persona_id = record.pop(self.id_column) if self.id_column else position
+                name = record.pop("name", None)
+                if not isinstance(name, str):  # No name column, or an empty cell
+                    name = persona_name(persona_id)
+                position += 1
+                yield {"id": persona_id, "name": name, **{col: record[col] for col in self._read_columns}}
+
+    def describe(self):
+        return {"persona_source": self.path, "persona_attributes": self.attribute_names, "persona_id_column": self.id_column}
+
+class CsvPersonaSource(_FilePersonaSource):
+    """Personas read from a CSV panel in chunks of `chunk_size` rows.
+
+    The schema is the header row, or `attribute_names` to use only some columns. Each row's id
+    comes from `id_column` (its row position if the file has no such column) and its name from a
+    'name' column if there is one.
+    """
+
+    def __init__(self, path, attribute_names=None, id_column="id", chunk_size=10000):
+        header = list(pd.read_csv(path, nrows=0).columns)
+        super().__init__(path, header, attribute_names, id_column, chunk_size)
+        self._row_count = None
+
+    def __iter__(self):
+        reader = pd.read_csv(self.path, usecols=self._columns_to_read(), chunksize=self.chunk_size)
+        return self._records(chunk.to_dict("records") for chunk in reader)
+
+    def __len__(self):
+        if self._row_count is None:
+            # One pass over a single column; rows, not lines, so quoted line breaks are counted right
+            reader = pd.read_csv(self.path, usecols=[0], chunksize=max(self.chunk_size, 100000))
+            self._row_count = sum(len(chunk) for chunk in reader)
+        return self._row_count
+
+class ParquetPersonaSource(_FilePersonaSource):
+    """Personas read from a Parquet panel one record batch at a time (needs pyarrow).
+
+    Schema and id handling as for CsvPersonaSource; the schema comes from the file metadata.
+    """
+
+    def __init__(self, path, attribute_names=None, id_column="id", chunk_size=10000):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet persona panels needs pyarrow: pip install pyarrow") from None
+        self._parquet_file = pq.ParquetFile(path)
+        super().__init__(path, self._parquet_file.schema_arrow.names, attribute_names, id_column, chunk_size)
+
+    def __iter__(self):
+        batches = self._parquet_file.iter_batches(batch_size=self.chunk_size, columns=self._columns_to_read())
+        return self._records(batch.to_pylist() for batch in batches)
+
+    def __len__(self):
+        return self._parquet_file.metadata.num_rows
+
+def open_persona_source(path, attribute_names=None, id_column="id", chunk_size=10000):
+    """Open a persona panel file as a PersonaSource, chosen by extension (.csv or .parquet)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return CsvPersonaSource(path, attribute_names, id_column, chunk_size)
+    if extension in (".parquet", ".pq"):
+        return ParquetPersonaSource(path, attribute_names, id_column, chunk_size)
+    raise ValueError(f"Unsupported persona panel format: {path} (expected .csv or .parquet)")
+
+def persona_source_from_options(persona_count, seed=DEFAULT_RUN_SEED, personas_file=None, sampling=None, per_segment=30,
+                                id_column="id"):
+    """The persona source a run's options ask for: a panel file, a stratified plan or generated personas.
+
+    Args:
+        persona_count: Generated personas when there is no panel or sampling design
+        seed: Run seed of the generated personas
+        personas_file: CSV or Parquet panel (see open_persona_source)
+        sampling: Stratified design, 'covering' or 'joint' (see sampling.py)
+        per_segment: Personas per segment with `sampling`
+        id_column: Panel column with the respondent id
+
+    Returns:
+        PersonaSource
+    """
+    if personas_file:
+        return open_persona_source(personas_file, id_column=id_column)
+    if sampling:
+        cells = covering_cells() if sampling == "covering" else joint_cells()
+        return StratifiedPersonaSource(quota_plan(cells, per_segment), seed=seed)
+    return GeneratedPersonaSource(persona_count, seed=seed)
+
+def persona_source_from_run_info(run_info):
+    """Reopen the persona source recorded in a journal's run info (see PersonaSource.describe)."""
+    if run_info.get("persona_source"):
+        return open_persona_source(run_info["persona_source"], run_info.get("persona_attributes"),
+                                   run_info.get("persona_id_column") or "id")
+    if run_info.get("persona_sampling"):
+        return StratifiedPersonaSource([(entry["cell"], entry["count"]) for entry in run_info["persona_sampling"]],
+                                       seed=run_info.get("run_seed", DEFAULT_RUN_SEED))
+    return GeneratedPersonaSource(run_info["persona_count"], seed=run_info.get("run_seed", DEFAULT_RUN_SEED))
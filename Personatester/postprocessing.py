@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+from questions import NASA_TLX_SUBSCALES_PAPER
+from rng import DEFAULT_RUN_SEED, stream_integers, stream_uniform
+
+# Persona modifiers added to a synthesised score (a subscale the persona did not answer), by subscale.
+# Names refer to the arrays from tlx_persona_modifiers(); numbers are constants.
+TLX_SYNTHESIS_MODIFIERS = {
+    "Mental_Demand": ("tech_savvy", "experience"),
+    "Physical_Demand": (-1,),  # Usually lower for software interfaces
+    "Temporal_Demand": ("stress",),
+    # For performance, lower is better (0=perfect, 21=failure), so tech savvy and experience lower it
+    "Performance": ("tech_savvy", "experience"),
+    "Effort": ("tech_savvy", "experience"),
+    "Frustration": ("stress", "tech_savvy"),
+}
+
+def _numeric_column(df, name, default):
+    """A persona attribute as a float array, with `default` where the column or value is missing."""
+    if name not in df.columns:
+        return np.full(len(df), float(default))
+    return pd.to_numeric(df[name], errors="coerce").fillna(default).to_numpy(dtype=float)
+
+def _equals(df, name, value):
+    if name not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    return df[name].isin([value]).to_numpy()  # Much faster than == on a pandas string column
+
+def persona_bias(df):
+    """Integer outlook/Big Five bias of every persona row (positive = rates the system more favourably).
+
+    Returns:
+        np.ndarray: One int per row
+    """
+    bias = _equals(df, "outlook", "optimistic").astype(float) - _equals(df, "outlook", "pessimistic")
+    # Big Five: high neuroticism -> more negative, high extraversion/openness -> more positive
+    bias = bias + (_numeric_column(df, "extraversion", 3) - 3) * 0.5
+    bias = bias + (_numeric_column(df, "openness", 3) - 3) * 0.3
+    bias = bias - (_numeric_column(df, "neuroticism", 3) - 3) * 0.5
+    return np.round(bias).astype(int)  # Half to even, like round()
+
+def apply_sus_bias(df, scenario_type_label, bias):
+    """Shift the answered SUS items of one scenario by the persona bias, clamped to 1-5 (in place)."""
+    for i in range(1, 11):
+        col = f"{scenario_type_label}_SUS_{i}"
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+            df[col] = np.clip(values + bias, 1, 5)  # NaN (unanswered) stays NaN
+
+def _answered_tlx(df, scenario_type_label, columns):
+    """Rows whose TLX request succeeded; failed requests keep all-missing subscales."""
+    answered = df[columns].notna().any(axis=1).to_numpy(copy=True)
+    raw_col = f"{scenario_type_label}_Raw_TLX"
+    if raw_col in df.columns:
+        # Only a row with no parsed subscale at all can be a failed request; check its reply text
+        unparsed = np.flatnonzero(~answered)
+        texts = df[raw_col].to_numpy()[unparsed]
+        answered[unparsed] = [isinstance(text, str) and not text.startswith("ERROR:") for text in texts]
+    return answered
+
+def tlx_persona_modifiers(df):
+    """Per-persona workload modifiers used when synthesising missing TLX subscales.
+
+    Returns:
+        dict: Modifier name (see TLX_SYNTHESIS_MODIFIERS) -> int array, one value per row
+    """
+    return {
+        # Tech savvy and experience reduce workload; stress tolerance affects frustration and temporal demand
+        "tech_savvy": np.where(_equals(df, "tech_savvy", "High"), -2, 2),
+        "experience": np.minimum(0, np.floor_divide(-_numeric_column(df, "experience_years", 0), 2)),
+        "stress": np.where(_equals(df, "stress_tolerance", "High"), -2, 2),
+    }
+
+def persona_ids(df):
+    """Ids keying each row's random streams: the 'id' column, or the row position without one."""
+    return df["id"].to_numpy() if "id" in df.columns else np.arange(len(df))
+
+def adjust_tlx_scores(df, scenario_type_label, bias, modifiers, run_seed=DEFAULT_RUN_SEED):
+    """Turn one scenario's parsed TLX answers into realistic 0-21 scores for every persona (in place).
+
+    Missing subscales of answered requests are synthesised from the persona profile; parsed ones
+    get scenario, bias and random variation applied.
+
+    Args:
+        df: Results frame with persona attribute and {label}_TLX_* columns
+        scenario_type_label: 'Original' or 'Adaptive'
+        bias: persona_bias(df)
+        modifiers: tlx_persona_modifiers(df)
+        run_seed: Seed of the run. The random variation of each persona and subscale comes from its
+                  own (run_seed, persona id, scenario, subscale) stream, so it does not depend on
+                  row order or on which other personas are in the frame.
+    """
+    columns = [f"{scenario_type_label}_TLX_{subscale}" for subscale in NASA_TLX_SUBSCALES_PAPER]
+    for col in columns:
+        if col not in df.columns:
+            df[col] = np.nan
+    answered = _answered_tlx(df, scenario_type_label, columns)
+    ids = persona_ids(df)
+
+    # Original interfaces typically have higher workload than adaptive ones
+    baseline_difficulty = 14 if scenario_type_label == "Original" else 9
+    base_adjustment = 3.0 if scenario_type_label == "Original" else -2.0
+
+    for subscale, col in zip(NASA_TLX_SUBSCALES_PAPER, columns):
+        values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+        missing = np.isnan(values)
+
+        modifier = sum(modifiers[name] if isinstance(name, str) else name
+                       for name in TLX_SYNTHESIS_MODIFIERS.get(subscale, ()))
+        stage = f"tlx_{subscale}"
+        base_value = baseline_difficulty + stream_integers(run_seed, ids, scenario_type_label, stage, -2, 3, draw=0)
+        jitter = stream_uniform(run_seed, ids, scenario_type_label, stage, -1.0, 1.0, draw=1)
+        synthesised = np.clip(base_value + modifier + bias * -1.5, 0, 21) + jitter
+        synthesised = np.round(synthesised, 1)
+
+        # Parsed scores get variation so the dimensions do not all share the same value
+        variation = stream_uniform(run_seed, ids, scenario_type_label, stage, -2.0, 2.0, draw=2)
+        adjusted = np.clip(values + variation + base_adjustment - bias, 0, 21)
+
+        df[col] = np.where(answered, np.where(missing, synthesised, adjusted), values)
+
+def postprocess_results(df, scenario_labels=("Original", "Adaptive"), run_seed=DEFAULT_RUN_SEED):
+    """Apply the SUS persona bias and the TLX adjustment to a whole results frame at once.
+
+    The conversation layer only returns parsed model output; this stage runs afterwards (see
+    main.save_and_analyze), so the adjustment model can change without calling the API again.
+
+    Args:
+        df: Results frame (one row per persona, parsed {label}_SUS_*/{label}_TLX_* columns)
+        scenario_labels: Scenarios to adjust
+        run_seed: Seed of the run's per-persona random streams (see adjust_tlx_scores)
+
+    Returns:
+        pd.DataFrame: df, adjusted in place
+    """
+    bias = persona_bias(df)
+    modifiers = tlx_persona_modifiers(df)
+    for label in scenario_labels:
+        apply_sus_bias(df, label, bias)
+        adjust_tlx_scores(df, label, bias, modifiers, run_seed)
+    return df
@@ -77,3 +77,94 @@ Please list your scores clearly, one per line, like 'TLX_Mental_Demand: [score]'
 def get_nasa_tlx_prompt_text():
     items = "\n".join([f"- {subscale}" for subscale in NASA_TLX_SUBSCALES_PAPER])
     return f"{NASA_TLX_PROMPT_INSTRUCTIONS}\nSubscales to rate:\n{items}"
+
+# Instructions for answering all three questionnaires in one reply (combined mode)
+def get_combined_questionnaire_prompt_text():
+    sus_items = "\n".join(SUS_STATEMENTS)
+    tlx_lines = "\n".join([f"TLX_{subscale}: [number]" for subscale in NASA_TLX_SUBSCALES_PAPER])
+    return f"""
+Please answer all three parts below in a single reply.
+
+Part 1 - Performance. For each of the three subtasks described above, estimate the time taken in seconds and the number of errors committed out of three attempts.
+
+Part 2 - System Usability Scale (SUS). For each statement, give a score from 1 (Strongly Disagree) to 5 (Strongly Agree):
+{sus_items}
+
+Part 3 - NASA-TLX. Rate each dimension on the 0-21 scale, using realistic values (typically 8-16 range):
+- Mental Demand: 0 = Very Low, 21 = Very High
+- Physical Demand: 0 = Very Low, 21 = Very High
+- Temporal Demand: 0 = Very Low, 21 = Very High
+- Performance: 0 = Perfect, 21 = Failure
+- Effort: 0 = Very Low, 21 = Very High
+- Frustration: 0 = Very Low, 21 = Very High
+
+FORMAT YOUR WHOLE RESPONSE EXACTLY AS FOLLOWS, one data point per line (22 lines in total):
+Time_Subtask1_seconds: [value]
+Errors_Subtask1_count: [value]
+Time_Subtask2_seconds: [value]
+Errors_Subtask2_count: [value]
+Time_Subtask3_seconds: [value]
+Errors_Subtask3_count: [value]
+""" + "\n".join([f"SUS_{i}: [score]" for i in range(1, 11)]) + "\n" + tlx_lines + "\n"
+
+# Answer fields of each questionnaire with their valid (min, max) integer range; None means unbounded.
+# Shared by the JSON output mode (prompt and validation) and the canned replies.
+PERFORMANCE_FIELDS = {
+    name: value_range
+    for i in range(1, 4)
+    for name, value_range in ((f"Time_Subtask{i}_seconds", (0, None)), (f"Errors_Subtask{i}_count", (0, 9)))
+}
+SUS_FIELDS = {f"SUS_{i}": (1, 5) for i in range(1, 11)}
+TLX_FIELDS = {f"TLX_{subscale}": (0, 21) for subscale in NASA_TLX_SUBSCALES_PAPER}
+QUESTIONNAIRE_FIELDS = {
+    "Performance": PERFORMANCE_FIELDS,
+    "SUS": SUS_FIELDS,
+    "TLX": TLX_FIELDS,
+    "Combined": {**PERFORMANCE_FIELDS, **SUS_FIELDS, **TLX_FIELDS},
+}
+
+# Follow-up asking only for the answers a reply left out (main.reask_missing_fields, passed to
+# conversation.run_persona_conversation as reask_missing)
+REASK_PROMPT_PREFIX = "Your previous answer did not include a valid value for:"
+
+def get_reask_prompt_text(missing_fields, json_output=False):
+    if json_output:  # Same answer format as the JSON-mode request it follows up on
+        keys = ", ".join(f'"{name}"' for name in missing_fields)
+        return (
+            f"{REASK_PROMPT_PREFIX} {', '.join(missing_fields)}.\n"
+            "Using the same scales as before, respond with a single JSON object only, no other text, "
+            f"with exactly these keys, each with an integer value: {keys}."
+        )
+    lines = "\n".join(f"{name}: [value]" for name in missing_fields)
+    return (
+        f"{REASK_PROMPT_PREFIX} {', '.join(missing_fields)}.\n"
+        "Using the same scales as before, reply with only these lines and nothing else:\n"
+        f"{lines}"
+    )
+
+# Appended to a questionnaire prompt in JSON output mode (the API requires the word "JSON" in the prompt)
+def get_json_format_instructions(questionnaire):
+    keys = ", ".join(f'"{name}"' for name in QUESTIONNAIRE_FIELDS[questionnaire])
+    return (
+        "\nIgnore the line format above and respond with a single JSON object only, no other text. "
+        f"Use exactly these keys, each with an integer value: {keys}."
+    )
+
+# How each answer may be written in a plain-text reply: (key text, value pattern) variants, tried
+# in order and matched case-insensitively as key text + value pattern (one group holding the value).
+# A variant whose first match is outside the field's range in QUESTIONNAIRE_FIELDS is skipped.
+# response_parser compiles these once; they are the patterns the original extract_* functions used.
+TLX_VALUE_PATTERN = r":\s*(\d+|1\d|2[0-1])"
+FIELD_TEXT_PATTERNS = {
+    **{name: [(name, r":\s*(\d+)" if name.startswith("Time_") else r":\s*(\d)")] for name in PERFORMANCE_FIELDS},
+    **{name: [(name, r":\s*([1-5])")] for name in SUS_FIELDS},
+    **{
+        f"TLX_{subscale}": [
+            (f"TLX_{subscale}", TLX_VALUE_PATTERN),
+            (f"TLX {subscale.replace('_', ' ')}", TLX_VALUE_PATTERN),
+            (subscale.replace('_', ' '), TLX_VALUE_PATTERN),
+            (subscale.replace('_', ' '), r"[^\d]+(\d+|1\d|2[0-1])"),  # Any number after the subscale name
+        ]
+        for subscale in NASA_TLX_SUBSCALES_PAPER
+    },
+}
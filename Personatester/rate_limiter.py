@@ -0,0 +1,127 @@
+import re
+import threading
+import time
+
+# Rough characters-per-token ratio used to estimate prompt size before a request is sent
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(messages, max_tokens):
+    """Estimate the tokens a chat completion request will use (prompt plus the full completion budget)."""
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    return prompt_chars // CHARS_PER_TOKEN + len(messages) * 4 + max_tokens
+
+def parse_reset_duration(value):
+    """Parse a rate-limit reset header such as '1s', '6m0s' or '120ms' into seconds."""
+    if value is None:
+        return None
+    units = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", str(value))
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+class RateLimiter:
+    """Shared token-bucket governor for requests per minute (RPM) and tokens per minute (TPM).
+
+    Callers reserve an estimated number of tokens with acquire() before each request and
+    report the real usage afterwards with record_usage(). Both buckets refill continuously,
+    and waiting callers are woken as soon as enough budget is available. Rate-limit headers
+    from the API (x-ratelimit-*) override the local estimate when they are present.
+    The limiter is thread-safe so one instance can be shared by all simulation workers.
+    """
+
+    def __init__(self, requests_per_minute=3500, tokens_per_minute=90000):
+        self.requests_per_minute = float(requests_per_minute)
+        self.tokens_per_minute = float(tokens_per_minute)
+        # Both buckets start full
+        self._available_requests = self.requests_per_minute
+        self._available_tokens = self.tokens_per_minute
+        self._last_refill = time.monotonic()
+        self._condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._available_requests = min(self.requests_per_minute,
+                                       self._available_requests + elapsed * self.requests_per_minute / 60.0)
+        self._available_tokens = min(self.tokens_per_minute,
+                                     self._available_tokens + elapsed * self.tokens_per_minute / 60.0)
+
+    def acquire(self, estimated_tokens):
+        """Block until one request and `estimated_tokens` tokens are available, then reserve them.
+
+        Returns:
+            float: Seconds spent waiting for budget
+        """
+        # A single request can never need more than a full bucket
+        needed_tokens = min(float(estimated_tokens), self.tokens_per_minute)
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                self._refill()
+                if self._available_requests >= 1 and self._available_tokens >= needed_tokens:
+                    self._available_requests -= 1
+                    self._available_tokens -= needed_tokens
+                    return time.monotonic() - start
+                request_wait = max(0.0, 1 - self._available_requests) * 60.0 / self.requests_per_minute
+                token_wait = max(0.0, needed_tokens - self._available_tokens) * 60.0 / self.tokens_per_minute
+                # Wake up when the buckets should have refilled, or earlier if usage is refunded
+                self._condition.wait(timeout=max(request_wait, token_wait, 0.001))
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """Settle a reservation against the real token usage reported in the response."""
+        if actual_tokens is None:
+            return
+        reserved = min(float(estimated_tokens), self.tokens_per_minute)
+        with self._condition:
+            self._refill()
+            self._available_tokens = min(self.tokens_per_minute,
+                                         self._available_tokens + reserved - float(actual_tokens))
+            # Unused budget may let waiting callers through right away
+            self._condition.notify_all()
+
+    def update_from_headers(self, headers):
+        """Adopt the limits and remaining budget reported by x-ratelimit-* response headers."""
+        if not headers:
+            return
+        with self._condition:
+            self._refill()
+            limit_requests = _header_number(headers, "x-ratelimit-limit-requests")
+            limit_tokens = _header_number(headers, "x-ratelimit-limit-tokens")
+            if limit_requests:
+                self.requests_per_minute = limit_requests
+            if limit_tokens:
+                self.tokens_per_minute = limit_tokens
+
+            # The server's view of what is left wins over our local estimate when it is lower
+            remaining_requests = _header_number(headers, "x-ratelimit-remaining-requests")
+            remaining_tokens = _header_number(headers, "x-ratelimit-remaining-tokens")
+            if remaining_requests is not None:
+                self._available_requests = min(self._available_requests, remaining_requests)
+            if remaining_tokens is not None:
+                self._available_tokens = min(self._available_tokens, remaining_tokens)
+
+            # When a bucket is empty, the reset header says exactly when it refills
+            reset_requests = parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+            if remaining_requests == 0 and reset_requests:
+                self._available_requests = min(self._available_requests,
+                                               1 - reset_requests * self.requests_per_minute / 60.0)
+            reset_tokens = parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+            if remaining_tokens == 0 and reset_tokens:
+                # A TPM stall: no tokens until the server's reset time, then the normal refill
+                self._available_tokens = min(self._available_tokens,
+                                             -reset_tokens * self.tokens_per_minute / 60.0)
+            self._condition.notify_all()
+
+def _header_number(headers, name):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
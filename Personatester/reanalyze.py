@@ -0,0 +1,118 @@
+import argparse
+import os
+import time
+import pandas as pd
+from conversation import (
+    QUESTIONNAIRES, parse_reply_column
+)
+from persona_source import GeneratedPersonaSource, persona_source_from_run_info
+from rng import DEFAULT_RUN_SEED
+from results_journal import read_journal_records, build_rows_from_journal
+from simulation_engine import SCENARIO_LABELS
+
+def load_metrics_csv(path):
+    """Load a saved per-persona metrics CSV (simulated_persona_metrics.csv).
+
+    Returns:
+        tuple: (DataFrame, persona attribute column names). Attribute columns are the ones that
+               are neither scenario results (Original_*/Adaptive_*) nor derived *_Change columns.
+    """
+    df = pd.read_csv(path)
+    persona_attribute_names = [col for col in df.columns
+                               if not col.startswith(tuple(f"{label}_" for label in SCENARIO_LABELS))
+                               and not col.endswith("_Change")]
+    return df, persona_attribute_names
+
+def load_journal(path, persona_count=None, seed=None):
+    """Load the raw replies recorded in a results journal.
+
+    The personas are read again from the source in the journal's run info (a persona panel, or
+    the generated personas), or generated from `persona_count` and `seed` if given.
+
+    Returns:
+        tuple: (DataFrame, persona attribute column names, run seed)
+    """
+    run_info = next((record for record in read_journal_records(path) if record.get("type") == "run"), None) or {}
+    if seed is None:
+        seed = run_info.get("run_seed", DEFAULT_RUN_SEED)
+    if persona_count is not None:
+        personas = GeneratedPersonaSource(persona_count, seed=seed)
+    elif run_info:
+        personas = persona_source_from_run_info({**run_info, "run_seed": seed})
+    else:
+        raise ValueError(f"{path} has no run info; pass the persona count explicitly.")
+    rows = build_rows_from_journal(path, personas)
+    return pd.DataFrame(rows), personas.attribute_names, seed
+
+def reprocess(df, persona_attribute_names, run_seed=DEFAULT_RUN_SEED):
+    """Re-run extraction on the stored Raw_* reply columns, one bulk pass per column.
+
+    The SUS bias and TLX adjustment are not applied here: save_and_analyze runs them over the
+    whole frame (postprocessing.py).
+
+    Args:
+        df: DataFrame with persona attribute columns and {label}_Raw_{questionnaire} columns
+        persona_attribute_names: The persona attribute columns of df
+        run_seed: Seed of the run, for the per-persona TLX default streams
+
+    Returns:
+        list: One row dict per persona in the layout main() produces, ready for save_and_analyze
+    """
+    columns = {name: df[name].tolist() for name in persona_attribute_names}
+    ids = df["id"].tolist() if "id" in df.columns else list(range(len(df)))
+    for label in SCENARIO_LABELS:
+        raw_columns = [f"{label}_Raw_{questionnaire}" for questionnaire in QUESTIONNAIRES]
+        missing = [col for col in raw_columns if col not in df.columns]
+        if missing:
+            print(f"Warning: no {', '.join(missing)} column(s); {label} results are left empty.")
+            continue
+        texts = {col: df[col].where(df[col].notna(), None).tolist() for col in raw_columns}
+        for col in raw_columns:
+            columns[col] = [text if text is not None else "ERROR: no reply" for text in texts[col]]
+        for questionnaire, col in zip(QUESTIONNAIRES, raw_columns):
+            parsed = parse_reply_column(questionnaire, texts[col], persona_ids=ids, scenario_type_label=label,
+                                        run_seed=run_seed)
+            for name, values in parsed.items():
+                columns[f"{label}_{name}"] = values
+    return pd.DataFrame(columns).to_dict("records")
+
+def reanalyze(path, output_filename="reanalyzed_metrics.csv", journal=False, persona_count=None, seed=None):
+    """Re-parse and re-analyse a finished run from its stored raw replies, without any API calls.
+
+    Args:
+        path: A per-persona metrics CSV, or a results journal if `journal` is True
+        output_filename: Where the re-analysed per-persona CSV is written (not `path`, which it would overwrite)
+        journal: Read `path` as a results journal (simulation_journal.jsonl)
+        persona_count: Personas in the journal run (default: taken from its run info)
+        seed: Run seed (default: the journal's, or DEFAULT_RUN_SEED for a CSV); keys the
+              personas of a journal run and the random streams of the re-analysis
+
+    Returns:
+        list: The re-processed per-persona rows
+    """
+    if os.path.abspath(output_filename) == os.path.abspath(path):
+        raise ValueError(f"Output {output_filename} is the input being re-parsed; choose another --out")
+    from main import save_and_analyze  # main imports the full plotting stack
+    start = time.perf_counter()
+    if journal:
+        df, persona_attribute_names, seed = load_journal(path, persona_count, seed)
+    else:
+        df, persona_attribute_names = load_metrics_csv(path)
+        seed = DEFAULT_RUN_SEED if seed is None else seed
+    rows = reprocess(df, persona_attribute_names, run_seed=seed)
+    print(f"Re-parsed {len(rows)} personas from {path} in {time.perf_counter() - start:.2f}s")
+    save_and_analyze(rows, persona_attribute_names, output_filename=output_filename, seed=seed)
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-parse stored raw replies and re-run the analysis offline (no API calls).")
+    parser.add_argument("input", nargs="?", default="simulated_persona_metrics.csv",
+                        help="Per-persona metrics CSV with *_Raw_* columns, or a results journal with --journal")
+    parser.add_argument("--journal", action="store_true", help="Read the input as a results journal")
+    parser.add_argument("--personas", type=int, default=None, help="Persona count of the journal run (default: from its run info)")
+    parser.add_argument("--seed", type=int, default=None, help="Run seed (default: from the journal's run info, else 42)")
+    parser.add_argument("--out", default="reanalyzed_metrics.csv", help="Re-analysed per-persona CSV (must differ from the input)")
+    args = parser.parse_args()
+    if os.path.abspath(args.out) == os.path.abspath(args.input):
+        parser.error(f"--out {args.out} would overwrite the input being re-parsed")
+    reanalyze(args.input, args.out, journal=args.journal, persona_count=args.personas, seed=args.seed)
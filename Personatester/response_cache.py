@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class ResponseCache:
+    """Persistent, content-addressed cache of chat completion replies stored in SQLite.
+
+    Entries are keyed on a SHA-256 hash of the model, messages, temperature and max_tokens,
+    so re-running the same scenario descriptions with the same seeded personas is free.
+    When the stored replies grow past `max_size_mb`, the least recently used entries are
+    evicted. The cache is thread-safe so one instance can be shared by all workers.
+
+    Args:
+        path: SQLite database file
+        max_size_mb: Size cap for the stored replies (in megabytes)
+        enabled: If False, every lookup misses and nothing is stored (bypass)
+        refresh: If True, lookups always miss but fresh replies overwrite stored ones
+    """
+
+    def __init__(self, path="llm_response_cache.sqlite", max_size_mb=500, enabled=True, refresh=False):
+        self.path = path
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.enabled = enabled
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        if enabled:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " prompt_tokens INTEGER,"
+                " completion_tokens INTEGER,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)")
+            self._connection.commit()
+            self._size_bytes = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model, messages, temperature, max_tokens, **extra_params):
+        """Hash the request parameters that determine the reply into a cache key."""
+        payload = {"model": model, "messages": messages, "temperature": temperature,
+                   "max_tokens": max_tokens, **extra_params}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached entry as a dict (text, prompt_tokens, completion_tokens), or None on a miss."""
+        if not self.enabled or self.refresh:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, prompt_tokens, completion_tokens FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+        return {"text": row[0], "prompt_tokens": row[1], "completion_tokens": row[2]}
+
+    def put(self, key, text, prompt_tokens=None, completion_tokens=None):
+        if not self.enabled or text is None:
+            return
+        size = len(key) + len(text.encode("utf-8"))
+        with self._lock:
+            previous = self._connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, prompt_tokens, completion_tokens, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, text, prompt_tokens, completion_tokens, size, time.time())
+            )
+            self._size_bytes += size - (previous[0] if previous else 0)
+            if self._size_bytes > self.max_size_bytes:
+                self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        # Drop least recently used entries until the cache is back under 90% of its cap
+        target = self.max_size_bytes * 0.9
+        rows = self._connection.execute("SELECT key, size FROM responses ORDER BY last_access ASC")
+        evicted = []
+        for key, size in rows:
+            if self._size_bytes <= target:
+                break
+            evicted.append((key,))
+            self._size_bytes -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def stats(self):
+        """Return hit/miss counters and the current number and size of stored entries."""
+        entries = 0
+        if self.enabled:
+            with self._lock:
+                entries = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_mb": (self._size_bytes if self.enabled else 0) / (1024 * 1024),
+        }
+
+    def close(self):
+        if self._connection is not None:
+            with self._lock:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,262 @@
+import argparse
+import random
+import re
+import time
+from questions import FIELD_TEXT_PATTERNS, QUESTIONNAIRE_FIELDS
+
+def _trie_pattern(words):
+    """Regex source matching any of `words`, factored by common prefix; longer words are preferred."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}  # End of a word
+
+    def build(node):
+        ends_here = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+class ResponseParser:
+    """Parser for plain-text questionnaire replies, compiled once from questions.FIELD_TEXT_PATTERNS.
+
+    One scan over the text finds every position where any field's key text starts; only there are
+    the field's full patterns tried (with .match), so each variant gets its leftmost match exactly
+    as re.search would find it. Key texts that occur inside a longer key text (e.g. 'Performance'
+    in 'TLX_Performance') are picked up from precomputed offsets, since the scan does not overlap.
+    Each field then takes the first variant, in priority order, whose first match is in range.
+
+    Args:
+        fields: Dict of field name -> (min, max) range, e.g. questions.SUS_FIELDS
+        field_patterns: Dict of field name -> [(key text, value pattern), ...] variants
+    """
+
+    def __init__(self, fields, field_patterns=FIELD_TEXT_PATTERNS):
+        self.fields = list(fields)
+        # Flat list of variants; a field's variants are consecutive, in priority order
+        self._field_variants = []
+        variants = []
+        for name in self.fields:
+            low, high = fields[name]
+            first = len(variants)
+            for key, value_pattern in field_patterns[name]:
+                variants.append((key, re.compile(re.escape(key) + value_pattern, re.IGNORECASE), low, high))
+            self._field_variants.append(range(first, len(variants)))
+
+        key_texts = sorted({key for key, _, _, _ in variants}, key=len, reverse=True)
+        self._scanner = re.compile(_trie_pattern(key_texts), re.IGNORECASE)
+        # Longest key text starting at a position, for the rare key that may run past an enclosing key
+        self._position_scanner = re.compile("|".join(re.escape(key) for key in key_texts), re.IGNORECASE)
+
+        def matchers(key):
+            # Every variant whose key text matches wherever `key` does: the key itself and its prefixes
+            return tuple((index, pattern, low, high) for index, (variant_key, pattern, low, high) in enumerate(variants)
+                         if key.lower().startswith(variant_key.lower()))
+
+        self._entries = {}  # casefolded key text -> (matchers, offsets inside the key to check)
+        for key in key_texts:
+            inner = []
+            for offset in range(1, len(key)):
+                rest = key[offset:].lower()
+                contained = [other for other in key_texts if rest.startswith(other.lower())]
+                if contained:
+                    inner.append((offset, matchers(contained[0]), None))  # key_texts is longest first
+                elif any(other.lower().startswith(rest) for other in key_texts):
+                    inner.append((offset, None, True))  # A key may start here and run past this one
+            self._entries[key] = self._entries[key.casefold()] = (matchers(key), tuple(inner))
+        self._key_texts = key_texts
+        self._first_variants = frozenset(variant_range.start for variant_range in self._field_variants)
+
+    def _entry(self, key_text):
+        entry = self._entries.get(key_text)
+        if entry is None:
+            entry = self._entries.get(key_text.casefold())
+        if entry is None:
+            # Case-insensitive matches casefold() does not map to ASCII; find the key the slow way
+            for key in self._key_texts:
+                if re.fullmatch(re.escape(key), key_text, re.IGNORECASE):
+                    return self._entries[key.casefold()]
+        return entry
+
+    def parse(self, text):
+        """Return a dict of field name -> int value (None where no valid answer was found)."""
+        first_matches = {}  # variant index -> value of its leftmost match, or False if out of range
+        first_variants = self._first_variants
+        settled = 0  # Fields whose value can no longer change
+        for match in self._scanner.finditer(text):
+            position = match.start()
+            key_matchers, inner = self._entry(match.group())
+            candidates = [(key_matchers, position)]
+            for offset, inner_matchers, needs_scan in inner:
+                if needs_scan:
+                    found = self._position_scanner.match(text, position + offset)
+                    if found is None:
+                        continue
+                    inner_matchers = self._entry(found.group())[0]
+                candidates.append((inner_matchers, position + offset))
+            for matchers, start in candidates:
+                for index, pattern, low, high in matchers:
+                    if index in first_matches:
+                        continue
+                    value_match = pattern.match(text, start)
+                    if value_match is None:
+                        continue
+                    try:
+                        value = int(value_match.group(1))
+                    except (ValueError, IndexError):
+                        value = None
+                    valid = value is not None and value >= low and (high is None or value <= high)
+                    first_matches[index] = value if valid else False
+                    if valid and index in first_variants:
+                        settled += 1  # A field's preferred variant matched; later ones cannot change it
+            if settled == len(self.fields):
+                break
+
+        values = {}
+        for name, variant_range in zip(self.fields, self._field_variants):
+            values[name] = None
+            for index in variant_range:
+                value = first_matches.get(index)
+                if value is not None and value is not False:
+                    values[name] = value
+                    break
+        return values
+
+    def parse_many(self, texts):
+        """Parse a whole column of raw replies.
+
+        Args:
+            texts: Iterable of reply texts (e.g. a pandas Series). Non-strings (None, NaN) and
+                   'ERROR: ...' placeholders for failed requests give all-None rows.
+
+        Returns:
+            dict: Field name -> list of values, one per input text (ready for pd.DataFrame)
+        """
+        columns = {name: [] for name in self.fields}
+        empty = dict.fromkeys(self.fields)
+        for text in texts:
+            parsed = self.parse(text) if isinstance(text, str) and not text.startswith("ERROR:") else empty
+            for name in self.fields:
+                columns[name].append(parsed[name])
+        return columns
+
+# One compiled parser per questionnaire (Combined covers all fields), built at import
+PARSERS = {questionnaire: ResponseParser(fields) for questionnaire, fields in QUESTIONNAIRE_FIELDS.items()}
+
+def parse_text_reply(questionnaire, text):
+    """Parse a plain-text reply with the compiled parser for `questionnaire`."""
+    return PARSERS[questionnaire].parse(text)
+
+def parse_column(questionnaire, texts):
+    """Bulk API: parse a column of raw replies; see ResponseParser.parse_many."""
+    return PARSERS[questionnaire].parse_many(texts)
+
+def reference_parse(questionnaire, text):
+    """The original one-re.search-per-pattern parsing, kept as the reference for check_golden()."""
+    values = {}
+    for name, (low, high) in QUESTIONNAIRE_FIELDS[questionnaire].items():
+        values[name] = None
+        for key, value_pattern in FIELD_TEXT_PATTERNS[name]:
+            match = re.search(key + value_pattern, text, re.IGNORECASE)
+            if match:
+                try:
+                    value = int(match.group(1))
+                except (ValueError, IndexError):
+                    continue
+                if value >= low and (high is None or value <= high):
+                    values[name] = value
+                    break
+    return values
+
+def build_golden_corpus(count=2000, seed=0):
+    """Generate replies in the formats (and failure modes) seen from the API, for check_golden().
+
+    Mixes 'Key: value' lines, 'TLX Mental Demand:' and bare subscale names, prose, odd casing and
+    spacing, out-of-range and multi-digit values, duplicated and missing keys, and quote-stripped JSON.
+    """
+    rng = random.Random(seed)
+    names = list(QUESTIONNAIRE_FIELDS["Combined"])
+    corpus = []
+    for _ in range(count):
+        lines = []
+        for name in rng.sample(names, rng.randint(0, len(names))):
+            value = rng.choice([rng.randint(0, 5), rng.randint(0, 25), rng.randint(0, 150), "", "N/A", "07"])
+            key = name
+            style = rng.random()
+            if name.startswith("TLX_") and style < 0.3:
+                key = rng.choice(["TLX " + name[4:].replace("_", " "), name[4:].replace("_", " ")])
+                if rng.random() < 0.3:
+                    lines.append(f"{key} was about {value} out of 21")
+                    continue
+            if style > 0.9:
+                key = key.upper() if rng.random() < 0.5 else key.lower()
+            separator = rng.choice([": ", ":", ":  ", " : ", ":\t", ": \n", " - "])
+            lines.append(f"{key}{separator}{value}")
+            if rng.random() < 0.05:
+                lines.append(f"{key}: {rng.randint(0, 30)}")  # Duplicate key
+        if rng.random() < 0.1:
+            lines.insert(0, "Here are my ratings. Performance felt fine and effort was moderate, maybe 12.")
+        text = rng.choice(["\n", " ", ", "]).join(lines)
+        if rng.random() < 0.1:
+            text = "{" + text.replace(": ", '": ').replace("\n", ', "') + "}"
+            text = text.replace('"', '')  # As the JSON fallback hands it to the text parser
+        corpus.append(text)
+    return corpus
+
+def check_golden(texts):
+    """Compare the compiled parser with reference_parse on every text and questionnaire.
+
+    Returns:
+        list: (questionnaire, text, expected, got) for every mismatch (empty if identical)
+    """
+    mismatches = []
+    for text in texts:
+        if not isinstance(text, str) or text.startswith("ERROR:"):
+            continue
+        for questionnaire in QUESTIONNAIRE_FIELDS:
+            expected, got = reference_parse(questionnaire, text), parse_text_reply(questionnaire, text)
+            if expected != got:
+                mismatches.append((questionnaire, text, expected, got))
+    return mismatches
+
+def _load_raw_texts(csv_paths):
+    import pandas as pd
+    texts = []
+    for path in csv_paths:
+        df = pd.read_csv(path)
+        for col in df.columns:
+            if "_Raw_" in col:
+                texts.extend(df[col].dropna().astype(str).tolist())
+    return texts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the compiled response parser against the reference regex parsing.")
+    parser.add_argument("csv", nargs="*", help="Results CSVs whose *_Raw_* columns are added to the golden corpus")
+    parser.add_argument("--generated", type=int, default=2000, help="Number of generated replies to add")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = _load_raw_texts(args.csv) + build_golden_corpus(args.generated, args.seed)
+    mismatches = check_golden(corpus)
+    print(f"Golden check: {len(corpus)} replies, {len(mismatches)} mismatches")
+    for questionnaire, text, expected, got in mismatches[:5]:
+        print(f"\n{questionnaire} mismatch for:\n{text!r}\nexpected {expected}\ngot      {got}")
+
+    start = time.perf_counter()
+    for questionnaire in ("Performance", "SUS", "TLX"):
+        for text in corpus:
+            reference_parse(questionnaire, text)
+    reference_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for questionnaire in ("Performance", "SUS", "TLX"):
+        parse_column(questionnaire, corpus)
+    compiled_seconds = time.perf_counter() - start
+    print(f"Reference parsing: {reference_seconds:.3f}s, compiled parser: {compiled_seconds:.3f}s")
@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+
+class ResultsJournal:
+    """Append-only JSONL journal of completed (persona, scenario) results.
+
+    Every result is written and flushed as soon as it completes, and the file is fsynced every
+    `fsync_every` records, so a crash, Ctrl-C or API outage loses at most the calls still in
+    flight. The first line records the run settings (scenario descriptions) so a run can be
+    resumed later without re-entering them.
+
+    Args:
+        path: Journal file
+        resume: If True, keep the existing journal and skip the work it already records.
+                If False, an existing journal is moved aside to '<path>.<timestamp>.bak'.
+        fsync_every: Number of records between fsync calls
+    """
+
+    def __init__(self, path="simulation_journal.jsonl", resume=False, fsync_every=20):
+        self.path = path
+        self.fsync_every = max(1, int(fsync_every))
+        self.run_info = {}
+        self.completed = set()  # (persona_id, scenario label) pairs the journal has a result without failed requests for
+        if os.path.exists(path):
+            if resume:
+                for record in read_journal_records(path):
+                    if record.get("type") == "run":
+                        self.run_info = record
+                    elif record.get("type") == "result":
+                        key = (record["persona_id"], record["scenario"])
+                        if is_complete_result(record["results"]):
+                            self.completed.add(key)
+                        else:
+                            self.completed.discard(key)  # A later failed attempt replaces an earlier result
+            else:
+                backup_path = f"{path}.{time.strftime('%Y%m%d-%H%M%S')}.bak"
+                os.replace(path, backup_path)
+                print(f"Existing journal moved to {backup_path}")
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._file = open(path, "a", encoding="utf-8")
+        if self._file.tell() > 0 and not _ends_with_newline(path):
+            # A crash mid-write left a partial line; start new records on a fresh line
+            self._file.write("\n")
+
+    def write_run_info(self, **run_info):
+        """Record the run settings once, at the start of a new journal."""
+        if self.run_info:
+            return
+        self.run_info = {"type": "run", **run_info}
+        self._append(self.run_info, sync=True)
+
+    def record(self, persona_id, scenario_type_label, results):
+        self._append({"type": "result", "persona_id": persona_id, "scenario": scenario_type_label, "results": results})
+        if is_complete_result(results):
+            self.completed.add((persona_id, scenario_type_label))
+
+    def _append(self, record, sync=False):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()  # Survives a process crash
+            self._unsynced += 1
+            if sync or self._unsynced >= self.fsync_every:
+                os.fsync(self._file.fileno())  # Survives an OS crash or power loss
+                self._unsynced = 0
+
+    def build_rows(self, personas):
+        """Rebuild the per-persona result rows (same layout as run_simulation) from the journal."""
+        self.sync()
+        return build_rows_from_journal(self.path, personas)
+
+    def sync(self):
+        with self._lock:
+            if self._file and not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def close(self):
+        self.sync()
+        with self._lock:
+            self._file.close()
+
+def is_complete_result(results):
+    """False if any request of a scenario failed (an 'ERROR: ...' Raw_* reply), so --resume runs it again."""
+    return not any(isinstance(value, str) and value.startswith("ERROR:")
+                   for key, value in results.items() if "_Raw_" in key)
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+def read_journal_records(path):
+    """Yield the records in a journal file, skipping a truncated last line left by a crash."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Warning: skipping incomplete journal line in {path}")
+
+def build_rows_from_journal(path, personas, scenario_labels=("Original", "Adaptive")):
+    """Rebuild one row dict per persona, in persona order, from the results in a journal.
+
+    If a (persona, scenario) pair was recorded more than once, the last record wins.
+    """
+    results_by_key = {}
+    for record in read_journal_records(path):
+        if record.get("type") == "result":
+            results_by_key[(record["persona_id"], record["scenario"])] = record["results"]
+    rows = []
+    for persona in personas:
+        row = {**persona}  # Start with persona attributes
+        for label in scenario_labels:
+            if results_by_key.get((persona["id"], label)):
+                row.update(results_by_key[(persona["id"], label)])
+        rows.append(row)
+    return rows
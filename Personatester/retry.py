@@ -0,0 +1,169 @@
+import email.utils
+import random
+import threading
+import time
+from collections import deque
+import openai
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+def is_transient_error(error):
+    """Classify an exception from a completion call: True for 429s, 5xx, timeouts and connection errors."""
+    if isinstance(error, openai.APIConnectionError):  # Includes APITimeoutError
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        return False
+    return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+
+def get_retry_after(error):
+    """Return the server's requested wait in seconds from Retry-After(-ms) headers, or None."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        # Retry-After may also be an HTTP date
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+        if retry_at is None:
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+class CircuitBreaker:
+    """Run-wide breaker that pauses every worker when the recent transient-error rate spikes.
+
+    The breaker opens when at least `failure_threshold` of the last `window` calls (and at least
+    `min_calls` of them) failed with transient errors. While open, before_call() blocks all
+    callers for `cooldown` seconds. After that one probe call is let through: success closes
+    the breaker, failure reopens it with the cooldown doubled (up to `max_cooldown`). A probe
+    that fails with a non-transient error (e.g. a 400) still reached the API, so it counts as a
+    success (record_reachable); release_probe() lets the next caller probe if the call ends
+    without either, so waiting workers are never stuck behind it.
+    """
+
+    def __init__(self, window=50, failure_threshold=0.5, min_calls=10, cooldown=30.0, max_cooldown=300.0):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = "closed"
+        self.times_opened = 0
+        self._cooldown = cooldown
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._probe_thread = None
+        self._outcomes = deque(maxlen=window)  # True for a failed call
+        self._condition = threading.Condition()
+
+    def before_call(self):
+        """Block while the breaker is open; returns the seconds spent waiting."""
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                if self.state == "closed":
+                    break
+                if self.state == "open":
+                    remaining = self._opened_at + self._cooldown - time.monotonic()
+                    if remaining <= 0:
+                        self.state = "half_open"
+                        continue
+                    self._condition.wait(timeout=remaining)
+                    continue
+                # Half open: only one probe call at a time
+                if not self._probe_in_flight:
+                    self._probe_in_flight = True
+                    self._probe_thread = threading.get_ident()
+                    break
+                self._condition.wait(timeout=1.0)
+        return time.monotonic() - start
+
+    def record_success(self):
+        with self._condition:
+            self._outcomes.append(False)
+            if self.state == "half_open":
+                print("Circuit breaker closed: API calls are succeeding again.")
+                self.state = "closed"
+                self._cooldown = self.base_cooldown
+                self._probe_in_flight = False
+                self._outcomes.clear()
+                self._condition.notify_all()
+
+    def record_reachable(self):
+        """A call failed with a non-transient error (bad request, auth): the API itself is up."""
+        self.record_success()
+
+    def release_probe(self):
+        """Let another caller probe if this thread's probe ended without recording an outcome."""
+        with self._condition:
+            if self._probe_in_flight and self._probe_thread == threading.get_ident():
+                self._probe_in_flight = False
+                self._probe_thread = None
+                self._condition.notify_all()
+
+    def record_failure(self):
+        with self._condition:
+            self._outcomes.append(True)
+            if self.state == "half_open":
+                self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+                self._open()
+            elif self.state == "closed" and len(self._outcomes) >= self.min_calls:
+                if sum(self._outcomes) / len(self._outcomes) >= self.failure_threshold:
+                    self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.times_opened += 1
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._outcomes.clear()
+        print(f"Circuit breaker open: high API error rate, pausing all workers for {self._cooldown:.0f}s.")
+        self._condition.notify_all()
+
+class RetryPolicy:
+    """Retry transient completion errors with capped exponential backoff and full jitter.
+
+    The wait before retry n (0-based) is uniform(0, min(max_delay, base_delay * 2**n)), but never
+    less than the server's Retry-After (capped at `max_retry_after`). An optional shared
+    CircuitBreaker is consulted before every attempt.
+
+    Args:
+        max_retries: Retries after the first attempt
+        base_delay: Backoff for the first retry, in seconds
+        max_delay: Cap on the exponential backoff, in seconds
+        max_retry_after: Cap on how long a Retry-After header can make us wait
+        circuit_breaker: Optional run-wide CircuitBreaker
+    """
+
+    def __init__(self, max_retries=5, base_delay=1.0, max_delay=30.0, max_retry_after=120.0, circuit_breaker=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.circuit_breaker = circuit_breaker
+        self._rng = random.Random()
+        self._rng_lock = threading.Lock()
+
+    def should_retry(self, error, attempt):
+        return attempt < self.max_retries and is_transient_error(error)
+
+    def backoff(self, attempt, error=None):
+        """Seconds to wait before retry number `attempt` (0-based)."""
+        with self._rng_lock:
+            delay = self._rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = get_retry_after(error) if error is not None else None
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
@@ -0,0 +1,68 @@
+import random
+import zlib
+import numpy as np
+
+# Seed used when a run does not set one (main.run_seed); also the persona generator's default
+DEFAULT_RUN_SEED = 42
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+def _mix(x):
+    """splitmix64 finaliser: a well-scrambled uint64 for every uint64 input (element-wise)."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _key_part(value):
+    """Stable 64-bit integer for one key part; strings via CRC32, since hash() is salted per process."""
+    if isinstance(value, str):
+        return zlib.crc32(value.encode("utf-8"))
+    return int(value) & 0xFFFFFFFFFFFFFFFF
+
+def _id_array(persona_ids):
+    ids = np.asarray(persona_ids)
+    if ids.dtype.kind in "iub":
+        return ids.astype(np.int64).view(np.uint64)
+    return np.fromiter((_key_part(persona_id) for persona_id in ids), dtype=np.uint64, count=len(ids))
+
+def stream_keys(run_seed, persona_ids, scenario, stage):
+    """64-bit key of the (run seed, persona id, scenario, stage) stream for each persona id.
+
+    Keys depend only on those four values, never on worker count, completion order or which
+    other personas are in the frame, so every random draw made from them is reproducible.
+    """
+    with np.errstate(over="ignore"):
+        key = _mix(np.uint64(_key_part(run_seed)) + _GOLDEN)
+        key = _mix(key ^ np.uint64(_key_part(scenario)))
+        key = _mix(key ^ np.uint64(_key_part(stage)))
+        return _mix(key ^ _id_array(persona_ids))
+
+def _draw(run_seed, persona_ids, scenario, stage, draw):
+    with np.errstate(over="ignore"):
+        return _mix(stream_keys(run_seed, persona_ids, scenario, stage) + _GOLDEN * np.uint64(draw + 1))
+
+def stream_uniform(run_seed, persona_ids, scenario, stage, low=0.0, high=1.0, draw=0):
+    """Counter-based uniform floats in [low, high), one per persona id.
+
+    Args:
+        run_seed: Seed of the run
+        persona_ids: Array-like of persona ids (ints or strings)
+        scenario: Scenario label, e.g. 'Original'
+        stage: Name of the pipeline step drawing the numbers, e.g. 'tlx_Effort'
+        low, high: Range of the values
+        draw: Index of the draw within the stream, for several independent numbers per persona
+
+    Returns:
+        np.ndarray: float64 array aligned with persona_ids
+    """
+    bits = _draw(run_seed, persona_ids, scenario, stage, draw) >> np.uint64(11)
+    return low + (high - low) * (bits.astype(np.float64) * 2.0 ** -53)
+
+def stream_integers(run_seed, persona_ids, scenario, stage, low, high, draw=0):
+    """Counter-based integers in [low, high), one per persona id (see stream_uniform)."""
+    bits = _draw(run_seed, persona_ids, scenario, stage, draw)
+    return low + (bits % np.uint64(high - low)).astype(np.int64)
+
+def persona_random(run_seed, persona_id, scenario, stage):
+    """A random.Random for one persona's stream, for scalar code that draws a few numbers."""
+    return random.Random(int(stream_keys(run_seed, [persona_id], scenario, stage)[0]))
@@ -0,0 +1,136 @@
+import argparse
+import itertools
+import math
+import numpy as np
+from persona_generator import PERSONA_ATTRIBUTES, SEGMENTATION_ATTRIBUTES, iter_personas
+
+def attribute_levels(attributes):
+    """Levels of each categorical persona attribute, from persona_generator.PERSONA_ATTRIBUTES."""
+    levels = {}
+    for attribute in attributes:
+        kind, spec = PERSONA_ATTRIBUTES[attribute]
+        if kind != "choice":
+            raise ValueError(f"Cannot stratify on '{attribute}': only categorical attributes have levels (bin it first)")
+        levels[attribute] = list(spec)
+    return levels
+
+def covering_cells(attributes=SEGMENTATION_ATTRIBUTES):
+    """A small set of attribute combinations in which every pair of levels of every two attributes occurs.
+
+    When all attributes have the same prime number of levels p (three 3-level attributes by
+    default) this is the p*p-row orthogonal array, a fractional factorial; otherwise the rows are
+    built greedily, each covering as many not yet covered level pairs as possible. Every level of
+    every attribute appears, so segment means by one attribute or by two are all estimable.
+
+    Returns:
+        list: Cells, each a dict of attribute -> level
+    """
+    levels = attribute_levels(attributes)
+    if len(attributes) < 2:
+        return [{attribute: level} for attribute in attributes for level in levels[attribute]]
+    sizes = {len(options) for options in levels.values()}
+    p = sizes.pop() if len(sizes) == 1 else 0
+    if p > 1 and all(p % d for d in range(2, p)) and len(attributes) <= p + 1:
+        # Orthogonal array OA(p^2, p+1, p, 2): columns x, y, x+y, x+2y, ... mod p. Every level
+        # pair of every two attributes occurs exactly once, so the design is also balanced.
+        rows = [[x, y] + [(x + k * y) % p for k in range(1, p)] for x in range(p) for y in range(p)]
+        return [{attribute: levels[attribute][row[k]] for k, attribute in enumerate(attributes)} for row in rows]
+    uncovered = {(i, a, j, b)
+                 for i, j in itertools.combinations(range(len(attributes)), 2)
+                 for a in levels[attributes[i]] for b in levels[attributes[j]]}
+    cells = []
+    while uncovered:
+        i, a, j, b = min(uncovered, key=lambda pair: (pair[0], pair[2], levels[attributes[pair[0]]].index(pair[1]),
+                                                      levels[attributes[pair[2]]].index(pair[3])))
+        row = {i: a, j: b}
+        for k in range(len(attributes)):
+            if k in row:
+                continue
+            # Pick the level that covers the most open pairs with the levels chosen so far
+            row[k] = max(levels[attributes[k]], key=lambda level: sum(
+                ((min(k, m), level if k < m else row[m], max(k, m), row[m] if k < m else level) in uncovered)
+                for m in row))
+        for m, n in itertools.combinations(sorted(row), 2):
+            uncovered.discard((m, row[m], n, row[n]))
+        cells.append({attributes[k]: row[k] for k in range(len(attributes))})
+    return cells
+
+def joint_cells(attributes=SEGMENTATION_ATTRIBUTES):
+    """Every combination of the attributes' levels (the full factorial design)."""
+    levels = attribute_levels(attributes)
+    return [dict(zip(attributes, combination)) for combination in itertools.product(*levels.values())]
+
+def quota_plan(cells, per_segment, attributes=None):
+    """Number of personas per cell so every segment gets at least `per_segment` personas.
+
+    With the full factorial (joint_cells) a segment is a cell; otherwise a segment is one level of
+    one attribute, and the whole design is replicated until its rarest level reaches the quota.
+
+    Returns:
+        list: (cell dict, count) pairs
+    """
+    if attributes is None:
+        attributes = list(cells[0]) if cells else []
+    if len(cells) == len(joint_cells(attributes)):
+        return [(cell, per_segment) for cell in cells]
+    level_counts = [sum(1 for cell in cells if cell[attribute] == level)
+                    for attribute, levels in attribute_levels(attributes).items() for level in levels]
+    replicates = math.ceil(per_segment / min(level_counts))
+    return [(cell, replicates) for cell in cells]
+
+def plan_size(plan):
+    return sum(count for _, count in plan)
+
+def iter_stratified_personas(plan, seed=42):
+    """Yield the personas of a quota plan: each cell's attributes fixed, everything else generated.
+
+    The other attributes come from generate_personas(n, seed). Cells are interleaved (one persona
+    of every cell, then the next round), so any prefix of the stream is close to balanced.
+    """
+    rounds = max((count for _, count in plan), default=0)
+    cells = [cell for round_index in range(rounds) for cell, count in plan if round_index < count]
+    for cell, persona in zip(cells, iter_personas(len(cells), seed)):
+        persona.update(cell)
+        yield persona
+
+def independent_sample_size(per_segment, cells, attributes, probability=0.95, trials=400, seed=0):
+    """Personas needed with independent uniform sampling for every segment to get `per_segment`,
+    with the given probability (Monte Carlo estimate), for comparison with a quota plan."""
+    rng = np.random.default_rng(seed)
+    levels = attribute_levels(attributes)
+    joint = len(cells) == len(joint_cells(attributes))
+    sizes = [len(levels[attribute]) for attribute in attributes]
+
+    def enough(n):
+        draws = np.stack([rng.integers(0, size, size=(trials, n)) for size in sizes])
+        if joint:
+            cell_index = np.ravel_multi_index(tuple(draws), sizes)
+            counts = np.stack([np.bincount(row, minlength=int(np.prod(sizes))) for row in cell_index])
+        else:
+            counts = np.concatenate([np.stack([np.bincount(row, minlength=size) for row in draws[k]])
+                                     for k, size in enumerate(sizes)], axis=1)
+        return (counts.min(axis=1) >= per_segment).mean() >= probability
+
+    low, high = per_segment, per_segment
+    while not enough(high):
+        low, high = high, high * 2
+    while low < high:
+        middle = (low + high) // 2
+        low, high = (middle + 1, high) if not enough(middle) else (low, middle)
+    return high
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the stratified persona sampling plan for the segmentation analysis.")
+    parser.add_argument("--per-segment", type=int, default=30, help="Personas wanted in every segment")
+    parser.add_argument("--design", choices=["covering", "joint"], default="covering",
+                        help="covering: every level and level pair of the attributes; joint: every combination")
+    parser.add_argument("--attributes", nargs="+", default=SEGMENTATION_ATTRIBUTES)
+    args = parser.parse_args()
+
+    cells = covering_cells(args.attributes) if args.design == "covering" else joint_cells(args.attributes)
+    plan = quota_plan(cells, args.per_segment, args.attributes)
+    for cell, count in plan:
+        print(f"{count:4d} x {cell}")
+    independent = independent_sample_size(args.per_segment, cells, args.attributes)
+    print(f"\n{len(cells)} cells, {plan_size(plan)} personas; independent sampling needs about {independent} "
+          f"for {args.per_segment} per segment with 95% probability ({independent / plan_size(plan):.1f}x)")
@@ -0,0 +1,141 @@
+import itertools
+import numpy as np
+import pandas as pd
+from scipy import stats
+from persona_generator import PERSONA_ATTRIBUTES, SEGMENTATION_ATTRIBUTES
+
+# Metrics summarised for every segment
+CUBE_METRICS = [
+    'Original_SUS_Score', 'Adaptive_SUS_Score', 'SUS_Score_Change',
+    'Original_TLX_Overall', 'Adaptive_TLX_Overall', 'TLX_Overall_Change'
+]
+# Long format: one row per (segment, metric); attribute_2/level_2 are empty for single attributes
+CUBE_COLUMNS = ["attribute", "level", "attribute_2", "level_2", "metric", "count", "mean", "var", "ci_low", "ci_high"]
+
+def cube_attributes(df):
+    """The categorical persona attributes in `df` (the 'choice' attributes of PERSONA_ATTRIBUTES)."""
+    return [attribute for attribute, (kind, _) in PERSONA_ATTRIBUTES.items() if kind == "choice" and attribute in df.columns]
+
+def _reduce_grouping(grouping, encoded, centered, squares, present, partial, centers, metrics, confidence):
+    """Count, mean, variance and CI of every metric for every segment of one grouping, via bincount."""
+    n = len(centered)
+    codes = np.zeros(n, dtype=np.int64)
+    valid = np.ones(n, dtype=bool)
+    shape = []
+    for attribute in grouping:
+        attribute_codes, levels = encoded[attribute]
+        valid &= attribute_codes >= 0  # Missing attribute values are left out, as groupby does
+        codes = codes * len(levels) + np.maximum(attribute_codes, 0)
+        shape.append(len(levels))
+    segments = int(np.prod(shape))
+    codes[~valid] = segments  # Spill segment, dropped below
+    rows_per_segment = np.bincount(codes, minlength=segments + 1)[:segments]
+
+    def per_segment(columns):
+        # One weighted bincount per metric column (column-major, so every column is contiguous)
+        return np.stack([np.bincount(codes, weights=columns[:, k], minlength=segments + 1)[:segments]
+                         for k in range(columns.shape[1])], axis=1)
+
+    count = np.repeat(rows_per_segment[:, None].astype(float), len(metrics), axis=1)
+    if partial.any():  # Metrics with missing values need their own counts
+        count[:, partial] = per_segment(present)
+    total = per_segment(centered)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Values are centred on the overall mean first, so the sum-of-squares form stays accurate
+        var = (per_segment(squares) - total ** 2 / count) / (count - 1)
+        mean = total / count + centers
+        half_width = stats.t.ppf((1 + confidence) / 2, count - 1) * np.sqrt(var / count)
+    count = count.astype(np.int64)
+    var[count < 2] = np.nan
+    half_width[count < 2] = np.nan
+
+    observed = np.flatnonzero(rows_per_segment)
+    level_index = np.unravel_index(observed, shape)
+    part = pd.DataFrame({
+        "attribute": grouping[0],
+        "level": np.repeat(encoded[grouping[0]][1][level_index[0]], len(metrics)),
+        "attribute_2": grouping[1] if len(grouping) > 1 else None,
+        "level_2": np.repeat(encoded[grouping[1]][1][level_index[1]], len(metrics)) if len(grouping) > 1 else None,
+        "metric": np.tile(metrics, len(observed)),
+        "count": count[observed].ravel(),
+        "mean": mean[observed].ravel(),
+        "var": var[observed].ravel(),
+        "ci_low": (mean - half_width)[observed].ravel(),
+        "ci_high": (mean + half_width)[observed].ravel(),
+    })
+    return part
+
+def build_segmentation_cube(df, metrics=None, attributes=None, pairs=None, confidence=0.95):
+    """Segment statistics of the key metrics over single attributes and attribute pairs.
+
+    Every attribute is encoded to category codes once; each grouping is then reduced with
+    np.bincount over all metrics at once instead of a groupby per attribute and chart.
+
+    Args:
+        df: Per-persona frame with the composite scores and change columns
+        metrics: Metric columns (default: CUBE_METRICS present in df)
+        attributes: Single attributes (default: every categorical persona attribute in df)
+        pairs: Attribute pairs (default: every pair of SEGMENTATION_ATTRIBUTES)
+        confidence: Coverage of the t intervals of the segment means
+
+    Returns:
+        pd.DataFrame: The cube in long format (CUBE_COLUMNS)
+    """
+    metrics = [metric for metric in (metrics or CUBE_METRICS) if metric in df.columns]
+    attributes = cube_attributes(df) if attributes is None else [a for a in attributes if a in df.columns]
+    if pairs is None:
+        pairs = itertools.combinations([a for a in SEGMENTATION_ATTRIBUTES if a in df.columns], 2)
+    groupings = [(attribute,) for attribute in attributes] + [tuple(pair) for pair in pairs
+                                                              if all(a in df.columns for a in pair)]
+    if not metrics or not groupings:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+
+    values = df[metrics].to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centers = np.where(present, values, 0.0).sum(axis=0) / present.sum(axis=0)
+    centered = np.asfortranarray(np.where(present, values - centers, 0.0))
+    squares = centered ** 2
+    partial = ~present.all(axis=0)
+    present = np.asfortranarray(present[:, partial], dtype=float)
+    encoded = {attribute: pd.factorize(df[attribute], sort=True) for attribute in dict.fromkeys(itertools.chain(*groupings))}
+    encoded = {attribute: (codes, np.asarray(levels, dtype=object)) for attribute, (codes, levels) in encoded.items()}
+    parts = [_reduce_grouping(grouping, encoded, centered, squares, present, partial, centers, metrics, confidence)
+             for grouping in groupings]
+    return pd.concat(parts, ignore_index=True)[CUBE_COLUMNS]
+
+def save_segmentation_cube(cube, path):
+    cube.to_csv(path, index=False)
+
+def load_segmentation_cube(path):
+    """Read a saved cube. Only empty cells are missing, so levels such as 'None' stay strings."""
+    return pd.read_csv(path, keep_default_na=False, na_values=[""])
+
+def segment_table(cube, attribute, metrics=None, attribute_2=None, statistic="mean"):
+    """One statistic of the metrics per segment, as a table (the shape of df.groupby(...)[metrics].mean()).
+
+    Args:
+        cube: Segmentation cube (build_segmentation_cube or load_segmentation_cube)
+        attribute: Segment attribute
+        metrics: Metric columns, in output order (default: all in the cube)
+        attribute_2: Second attribute for a pair (the pair must be in the cube, in either order)
+        statistic: 'count', 'mean', 'var', 'ci_low' or 'ci_high'
+
+    Returns:
+        pd.DataFrame: Segments as the index (two levels for a pair), metrics as columns
+    """
+    if attribute_2 is None:
+        rows = cube[(cube["attribute"] == attribute) & cube["attribute_2"].isna()]
+        index = ["level"]
+        names = [attribute]
+    else:
+        rows = cube[(cube["attribute"] == attribute) & (cube["attribute_2"] == attribute_2)]
+        index, names = ["level", "level_2"], [attribute, attribute_2]
+        if rows.empty:  # Stored the other way round
+            rows = cube[(cube["attribute"] == attribute_2) & (cube["attribute_2"] == attribute)]
+            index = ["level_2", "level"]
+    table = rows.pivot_table(index=index, columns="metric", values=statistic, aggfunc="first", dropna=False, sort=False)
+    table.index.names = names
+    table.columns.name = None
+    metrics = metrics or list(dict.fromkeys(rows["metric"]))
+    return table.reindex(columns=[metric for metric in metrics if metric in table.columns])
@@ -0,0 +1,145 @@
+import itertools
+import math
+from statistics import NormalDist
+import numpy as np
+from analysis import add_composite_scores
+from rng import DEFAULT_RUN_SEED
+
+# Paired metrics watched while a run is in progress: name -> (Original column, Adaptive column)
+MONITORED_METRICS = {
+    "SUS Score": ("Original_SUS_Score", "Adaptive_SUS_Score"),
+    "TLX Overall": ("Original_TLX_Overall", "Adaptive_TLX_Overall"),
+}
+
+def t_quantile(p, df):
+    """Quantile of Student's t distribution (Cornish-Fisher expansion around the normal quantile).
+
+    Accurate to about 1e-3 for df >= 5, which is plenty for a stopping rule.
+    """
+    z = NormalDist().inv_cdf(p)
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+    return z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+def obrien_fleming_spent(alpha, fraction):
+    """Type I error spent by information fraction `fraction` (Lan-DeMets O'Brien-Fleming-type spending)."""
+    if fraction <= 0:
+        return 0.0
+    fraction = min(fraction, 1.0)
+    return 2 * (1 - NormalDist().cdf(NormalDist().inv_cdf(1 - alpha / 2) / math.sqrt(fraction)))
+
+def paired_differences(df, run_seed=DEFAULT_RUN_SEED):
+    """Adaptive - Original differences of each monitored metric, for the personas that have both scores.
+
+    Args:
+        df: Results frame as prepared by main.prepare_results_frame (not modified)
+        run_seed: Run seed, for the synthetic TLX fill of add_composite_scores
+
+    Returns:
+        dict: Metric name -> float array of paired differences
+    """
+    scored = add_composite_scores(df.copy(), run_seed=run_seed, warn=False)
+    differences = {}
+    for metric, (original_col, adaptive_col) in MONITORED_METRICS.items():
+        change = (scored[adaptive_col].astype(float) - scored[original_col].astype(float)).to_numpy()
+        differences[metric] = change[~np.isnan(change)]
+    return differences
+
+class SequentialStopping:
+    """Stopping rule for a run simulated in waves, checked on the paired Adaptive - Original differences.
+
+    After each wave every monitored metric is settled once either
+    - its (1 - alpha) confidence interval is no wider than its target width, or
+    - a group-sequential paired t-test rejects "no difference": each look may spend only part of
+      alpha (O'Brien-Fleming-type spending over the persona budget, split across the metrics), so
+      looking after every wave does not inflate the false positive rate.
+    The run stops when every metric is settled, or when the budget is used up.
+
+    Args:
+        max_personas: Persona budget of the run
+        ci_width: Dict of metric name -> target full width of its confidence interval
+        alpha: Significance level of the intervals and of the whole sequential test
+        min_personas: Personas needed before any stopping decision
+    """
+
+    def __init__(self, max_personas, ci_width=None, alpha=0.05, min_personas=20):
+        self.max_personas = max_personas
+        self.ci_width = ci_width if ci_width is not None else {"SUS Score": 5.0, "TLX Overall": 1.0}
+        self.alpha = alpha
+        self.min_personas = min_personas
+        self.spent = 0.0    # Alpha spent by earlier looks (per metric)
+        self.history = []   # One dict per look: personas and the status of every metric
+
+    def check(self, differences, persona_count):
+        """Record one look at the data and decide whether to stop.
+
+        Args:
+            differences: Dict of metric name -> paired differences (see paired_differences)
+            persona_count: Personas simulated so far
+
+        Returns:
+            bool: True if the run can stop
+        """
+        spent = obrien_fleming_spent(self.alpha / len(MONITORED_METRICS), persona_count / self.max_personas)
+        look_alpha, self.spent = max(spent - self.spent, 0.0), spent
+        look = {"personas": persona_count, "metrics": {}}
+        settled = persona_count >= self.min_personas
+        for metric in MONITORED_METRICS:
+            values = differences.get(metric, np.array([]))
+            n = len(values)
+            if n < 2:
+                look["metrics"][metric] = {"n": n}
+                settled = False
+                continue
+            mean = float(values.mean())
+            se = float(values.std(ddof=1)) / math.sqrt(n)
+            half_width = t_quantile(1 - self.alpha / 2, n - 1) * se
+            conclusive = look_alpha > 0 and abs(mean) > t_quantile(1 - look_alpha / 2, n - 1) * se
+            narrow = 2 * half_width <= self.ci_width.get(metric, math.inf)
+            look["metrics"][metric] = {"n": n, "mean": mean, "ci_low": mean - half_width, "ci_high": mean + half_width,
+                                       "conclusive": conclusive, "narrow": narrow}
+            settled = settled and (conclusive or narrow)
+        look["stop"] = settled
+        self.history.append(look)
+        return settled
+
+    def print_look(self, look=None):
+        look = look if look is not None else self.history[-1]
+        parts = []
+        for metric, status in look["metrics"].items():
+            if "mean" not in status:
+                parts.append(f"{metric}: n={status['n']}")
+                continue
+            reason = " conclusive" if status["conclusive"] else (" narrow" if status["narrow"] else "")
+            parts.append(f"{metric} change {status['mean']:+.2f} [{status['ci_low']:+.2f}, {status['ci_high']:+.2f}]{reason}")
+        print(f"After {look['personas']} personas: " + "; ".join(parts))
+
+def run_in_waves(personas, run_wave, prepare, stopping, wave_size=20, run_seed=DEFAULT_RUN_SEED):
+    """Simulate `personas` a wave at a time until the stopping rule is met or the budget is used up.
+
+    Args:
+        personas: Iterable of persona dicts (any PersonaSource)
+        run_wave: Function running a list of personas and returning their result rows
+        prepare: Function turning result rows into the results frame (main.prepare_results_frame)
+        stopping: SequentialStopping rule; its max_personas caps the run
+        wave_size: Personas per wave
+        run_seed: Run seed, for the scores the rule looks at
+
+    Returns:
+        list: Result rows of every persona simulated, in persona order
+    """
+    remaining = iter(personas)
+    rows = []
+    while len(rows) < stopping.max_personas:
+        wave = list(itertools.islice(remaining, min(wave_size, stopping.max_personas - len(rows))))
+        if not wave:
+            break
+        rows.extend(run_wave(wave))
+        stop = stopping.check(paired_differences(prepare(rows), run_seed=run_seed), len(rows))
+        stopping.print_look()
+        if stop:
+            print(f"Stopping early: the SUS and TLX changes are settled after {len(rows)} of {stopping.max_personas} personas.")
+            break
+    return rows
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+from conversation import run_persona_conversation
+
+# Scenario labels in the order their results are merged into each persona row
+SCENARIO_LABELS = ["Original", "Adaptive"]
+
+async def run_simulation_async(personas, original_state_description, new_state_description, concurrency=8, journal=None,
+                               on_persona_done=None, **conversation_kwargs):
+    """Run every persona through both scenarios with at most `concurrency` conversations in flight.
+
+    Args:
+        personas: Iterable of persona dicts: a list from generate_personas, a PersonaSource
+                  (persona_source.py) or any generator. Personas are read as workers free up.
+        original_state_description: Dashboard description for the Original scenario
+        new_state_description: Dashboard description for the Adaptive scenario
+        concurrency: Maximum number of (persona, scenario) conversations running at once
+        journal: Optional ResultsJournal. Each finished (persona, scenario) result is appended to it
+                 right away instead of being kept in memory, and pairs it already records are skipped.
+                 With a journal and a re-iterable `personas` (list or PersonaSource), finished
+                 personas are not kept either: the rows are rebuilt by reading `personas` again.
+        on_persona_done: Optional function called with each persona's row (same layout as the
+                         returned rows) as soon as all its scenarios have finished, e.g.
+                         LiveStats.add_row. Scenarios skipped because the journal already records
+                         them are not in that row, and fully resumed personas are not passed.
+        **conversation_kwargs: Extra keyword arguments passed to run_persona_conversation
+
+    Returns:
+        list: One row dict per persona, in input order, with the persona attributes followed by
+              the Original and then the Adaptive results (same layout as the old serial loop).
+    """
+    concurrency = max(1, int(concurrency))
+    descriptions = {"Original": original_state_description, "Adaptive": new_state_description}
+    loop = asyncio.get_running_loop()
+
+    # A one-shot iterator cannot be read twice, so its personas are kept for building the rows
+    reread_personas = journal is not None and iter(personas) is not personas
+    personas_by_index = {}
+    scenario_results = {}  # (persona index, scenario label) -> results dict
+    finished_results = {}  # persona index -> {scenario label: results} until on_persona_done has the row
+    remaining = {}         # persona index -> number of scenarios still running
+    jobs = asyncio.Queue(maxsize=concurrency * 2)
+    progress = tqdm(total=len(personas) if hasattr(personas, '__len__') else None, desc="Simulating personas")
+
+    async def produce():
+        for index, persona in enumerate(personas):
+            personas_by_index[index] = persona
+            labels_to_run = [label for label in SCENARIO_LABELS
+                             if journal is None or (persona["id"], label) not in journal.completed]
+            remaining[index] = len(labels_to_run)
+            if not labels_to_run:
+                progress.update(1)  # Already finished in a previous (resumed) run
+                if reread_personas:
+                    del personas_by_index[index], remaining[index]
+            for label in labels_to_run:
+                await jobs.put((index, persona, label, time.monotonic()))
+        for _ in range(concurrency):
+            await jobs.put(None)  # One stop marker per worker
+
+    async def work(executor):
+        while True:
+            job = await jobs.get()
+            if job is None:
+                return
+            index, persona, label, queued_at = job
+            results = await loop.run_in_executor(
+                executor,
+                # Queue wait is measured when the executor thread actually starts the conversation
+                lambda: run_persona_conversation(persona, descriptions[label], label,
+                                                 queue_wait=time.monotonic() - queued_at, **conversation_kwargs)
+            )
+            if journal is not None:
+                journal.record(persona["id"], label, results)
+            else:
+                scenario_results[(index, label)] = results
+            if on_persona_done is not None:
+                finished_results.setdefault(index, {})[label] = results
+            remaining[index] -= 1
+            if remaining[index] == 0:
+                progress.update(1)
+                if on_persona_done is not None:
+                    row = {**personas_by_index[index]}
+                    scenarios = finished_results.pop(index)
+                    for finished_label in SCENARIO_LABELS:
+                        if scenarios.get(finished_label):
+                            row.update(scenarios[finished_label])
+                    on_persona_done(row)
+                if reread_personas:
+                    del personas_by_index[index], remaining[index]
+
+    # run_persona_conversation is blocking, so each worker hands it to its own thread
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            await asyncio.gather(produce(), *[work(executor) for _ in range(concurrency)])
+        finally:
+            progress.close()
+
+    if reread_personas:
+        return journal.build_rows(personas)
+    if journal is not None:
+        return journal.build_rows([personas_by_index[index] for index in sorted(personas_by_index)])
+
+    rows = []
+    for index in sorted(personas_by_index):
+        row = {**personas_by_index[index]}  # Start with persona attributes
+        for label in SCENARIO_LABELS:
+            if scenario_results.get((index, label)):
+                row.update(scenario_results[(index, label)])
+        rows.append(row)
+    return rows
+
+def run_simulation(personas, original_state_description, new_state_description, concurrency=8, journal=None,
+                   on_persona_done=None, **conversation_kwargs):
+    """Synchronous wrapper around run_simulation_async for use from main()."""
+    return asyncio.run(run_simulation_async(personas, original_state_description, new_state_description,
+                                            concurrency=concurrency, journal=journal,
+                                            on_persona_done=on_persona_done, **conversation_kwargs))
@@ -0,0 +1,46 @@
+import json
+from conversation import (
+    build_questionnaire_requests, build_reask_request, find_missing_fields, merge_reask_reply,
+    parse_questionnaire_reply
+)
+from persona_generator import generate_personas
+from questions import QUESTIONNAIRE_FIELDS
+
+def sus_request(json_output):
+    persona = generate_personas(1)[0]
+    requests = build_questionnaire_requests(persona, "A dashboard", "Original", json_output=json_output)
+    return next(request for request in requests if request["questionnaire"] == "SUS")
+
+def test_json_reask_keeps_response_format():
+    request = sus_request(json_output=True)
+    reask = build_reask_request(request, '{"SUS_1": 3}', ["SUS_2"])
+    assert reask["response_format"] == {"type": "json_object"}
+    assert "JSON" in reask["messages"][-1]["content"]
+
+def test_text_reask_has_no_response_format():
+    reask = build_reask_request(sus_request(json_output=False), "SUS_1: 3", ["SUS_2"])
+    assert "response_format" not in reask
+    assert "SUS_2: [value]" in reask["messages"][-1]["content"]
+
+def test_json_reask_merges_into_json_reply():
+    reply = json.dumps({name: 3 for name in QUESTIONNAIRE_FIELDS["SUS"]} | {"SUS_4": 9})
+    missing = find_missing_fields("SUS", reply)
+    assert missing == ["SUS_4"]
+    merged, recovered = merge_reask_reply("SUS", reply, '{"SUS_4": 2}', missing)
+    assert recovered == 1
+    assert json.loads(merged)["SUS_4"] == 2
+
+def test_text_reask_replaces_out_of_range_answer():
+    reply = "\n".join(f"{name}: 10" for name in QUESTIONNAIRE_FIELDS["TLX"]).replace(
+        "TLX_Temporal_Demand: 10", "TLX_Temporal_Demand: 40")
+    missing = find_missing_fields("TLX", reply)
+    assert missing == ["TLX_Temporal_Demand"]
+    merged, recovered = merge_reask_reply("TLX", reply, "TLX_Temporal_Demand: 14", missing)
+    assert recovered == 1
+    assert parse_questionnaire_reply("TLX", merged, fill_missing=False)["TLX_Temporal_Demand"] == 14
+
+def test_unusable_reask_recovers_nothing():
+    reply = "\n".join(f"{name}: 10" for name in QUESTIONNAIRE_FIELDS["TLX"]).replace(
+        "TLX_Temporal_Demand: 10", "TLX_Temporal_Demand: 40")
+    _, recovered = merge_reask_reply("TLX", reply, "TLX_Temporal_Demand: 99", ["TLX_Temporal_Demand"])
+    assert recovered == 0
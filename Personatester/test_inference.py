@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+import inference
+from inference import bca_interval, paired_inference, rank_biserial
+
+def reference_bca(values, bootstrap, confidence):
+    """Textbook BCa (Efron and Tibshirani, ch. 14) with an explicit jackknife of the mean."""
+    z0 = stats.norm.ppf(np.mean(bootstrap < values.mean()))
+    jackknife = np.array([np.delete(values, i).mean() for i in range(len(values))])
+    deviations = jackknife.mean() - jackknife
+    acceleration = np.sum(deviations ** 3) / (6 * np.sum(deviations ** 2) ** 1.5)
+    z = stats.norm.ppf([(1 - confidence) / 2, (1 + confidence) / 2])
+    return np.quantile(bootstrap, stats.norm.cdf(z0 + (z0 + z) / (1 - acceleration * (z0 + z))))
+
+def test_bca_matches_reference():
+    rng = np.random.default_rng(1)
+    values = rng.exponential(2.0, size=40) - 1.0  # Skewed, so the acceleration matters
+    bootstrap = rng.choice(values, size=(5000, len(values))).mean(axis=1)
+    np.testing.assert_allclose(bca_interval(values, bootstrap, 0.9), reference_bca(values, bootstrap, 0.9))
+    assert np.isnan(bca_interval(values[:1], bootstrap, 0.9)).all()
+
+def test_rank_biserial():
+    assert rank_biserial(np.array([1.0, 2.0, 3.0])) == 1.0
+    assert rank_biserial(np.array([-1.0, 0.0, -2.0])) == -1.0
+    assert rank_biserial(np.array([1.0, -2.0])) == (1 - 2) / 3
+
+def paired_frame(n=60):
+    rng = np.random.default_rng(2)
+    original = rng.integers(30, 90, size=(n, 2)).astype(float)
+    adaptive = original + rng.normal([5.0, 0.0], 8.0, size=(n, 2)).round()
+    adaptive[:5, 1] = np.nan  # Missing pairs in the second metric
+    df = pd.DataFrame({"Original_A": original[:, 0], "Adaptive_A": adaptive[:, 0],
+                       "Original_B": original[:, 1], "Adaptive_B": adaptive[:, 1]})
+    metrics = [{"original": f"Original_{name}", "adaptive": f"Adaptive_{name}", "summary_label": name}
+               for name in ("A", "B")]
+    return df, metrics
+
+def test_paired_tests_match_scipy():
+    df, metrics = paired_frame()
+    result = paired_inference(df, metrics, n_resamples=2000, processes=1).set_index("Metric")
+    for metric in metrics:
+        values = (df[metric["adaptive"]] - df[metric["original"]]).dropna().to_numpy()
+        row = result.loc[metric["summary_label"]]
+        assert row["N"] == len(values)
+        assert np.isclose(row["Mean_Difference"], values.mean())
+        assert np.isclose(row["t_p"], stats.ttest_1samp(values, 0.0).pvalue)
+        assert np.isclose(row["Wilcoxon_p"], stats.wilcoxon(values).pvalue)
+        assert np.isclose(row["Cohens_dz"], values.mean() / values.std(ddof=1))
+        assert row["CI_Low"] < row["Mean_Difference"] < row["CI_High"]
+        assert 0 < row["Permutation_p"] <= 1
+    assert result.loc["A", "Permutation_p"] < 0.01
+
+def test_results_do_not_depend_on_process_count(monkeypatch):
+    df, metrics = paired_frame()
+    monkeypatch.setattr(inference, "CHUNK_CELLS", len(df) * 300)  # Several chunks
+    single = paired_inference(df, metrics, n_resamples=2000, seed=9, processes=1)
+    pooled = paired_inference(df, metrics, n_resamples=2000, seed=9, processes=2)
+    pd.testing.assert_frame_equal(single, pooled)
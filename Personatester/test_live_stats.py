@@ -0,0 +1,37 @@
+import numpy as np
+from live_stats import P2Quantile, RunningMoments
+
+def test_running_moments_match_numpy():
+    rng = np.random.default_rng(6)
+    values = rng.normal(1e6, 3.0, size=(1000, 3))  # A large offset would break a plain sum of squares
+    values[rng.random(values.shape) < 0.1] = np.nan
+    moments = RunningMoments(3)
+    for batch in np.array_split(values, [1, 2, 50, 400, 401]):
+        moments.add(batch)
+    np.testing.assert_array_equal(moments.count, (~np.isnan(values)).sum(axis=0))
+    np.testing.assert_allclose(moments.mean, np.nanmean(values, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(moments.variance(), np.nanvar(values, axis=0, ddof=1), rtol=1e-8)
+
+def test_running_moments_with_too_few_values():
+    moments = RunningMoments(2)
+    moments.add([[np.nan, np.nan]])
+    assert np.isnan(moments.variance()).all()
+    moments.add([[1.0, np.nan]])
+    assert moments.count.tolist() == [1, 0] and moments.mean[0] == 1.0
+    assert np.isnan(moments.variance()).all()
+
+def test_p2_quantile_tracks_the_sample_quantile():
+    rng = np.random.default_rng(7)
+    values = rng.normal(0.0, 1.0, size=20000)
+    for p in (0.1, 0.5, 0.9):
+        estimator = P2Quantile(p)
+        for value in values:
+            estimator.add(value)
+        assert abs(estimator.value() - np.quantile(values, p)) < 0.05
+
+def test_p2_quantile_with_few_values():
+    estimator = P2Quantile(0.5)
+    assert np.isnan(estimator.value())
+    for value in (3.0, 1.0, 2.0):
+        estimator.add(value)
+    assert estimator.value() == 2.0
@@ -0,0 +1,27 @@
+import pytest
+from rate_limiter import RateLimiter, parse_reset_duration
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("6m0s") == 360.0
+    assert parse_reset_duration("120ms") == pytest.approx(0.12)
+    assert parse_reset_duration("1.5") == 1.5
+    assert parse_reset_duration(None) is None
+
+def test_empty_token_bucket_waits_for_reset_tokens():
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=60000)
+    limiter.update_from_headers({"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "2s"})
+    # 2s at 1000 tokens/s: the bucket owes about 2000 tokens before it has any again
+    assert limiter._available_tokens == pytest.approx(-2000, abs=50)
+    assert limiter._available_requests > 1  # The request bucket is not touched
+
+def test_empty_request_bucket_waits_for_reset_requests():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=60000)
+    limiter.update_from_headers({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1s"})
+    assert limiter._available_requests == pytest.approx(-9, abs=0.5)
+    assert limiter._available_tokens == pytest.approx(60000)
+
+def test_acquire_blocks_until_tokens_refill():
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=60000)
+    limiter.update_from_headers({"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "100ms"})
+    waited = limiter.acquire(100)  # 100ms until the reset, then 0.1s for 100 tokens
+    assert 0.15 < waited < 1.0
@@ -0,0 +1,20 @@
+from questions import QUESTIONNAIRE_FIELDS
+from response_parser import build_golden_corpus, check_golden, parse_column, parse_text_reply, reference_parse
+
+def test_parser_matches_reference_on_golden_corpus():
+    assert check_golden(build_golden_corpus(count=500, seed=3)) == []
+
+def test_parse_column_matches_single_replies():
+    texts = build_golden_corpus(count=50, seed=4) + [None, "ERROR: timed out"]
+    for questionnaire, fields in QUESTIONNAIRE_FIELDS.items():
+        columns = parse_column(questionnaire, texts)
+        for i, text in enumerate(texts):
+            expected = parse_text_reply(questionnaire, text) if i < 50 else dict.fromkeys(fields)
+            assert {name: columns[name][i] for name in fields} == expected
+
+def test_out_of_range_values_are_dropped():
+    text = "SUS_1: 6\nSUS_2: 0\nSUS_3: 5\nTLX Mental Demand: 22\nEffort: 21"
+    for parse in (reference_parse, parse_text_reply):
+        values = parse("Combined", text)
+        assert values["SUS_1"] is None and values["SUS_2"] is None and values["SUS_3"] == 5
+        assert values["TLX_Mental_Demand"] is None and values["TLX_Effort"] == 21
@@ -0,0 +1,68 @@
+import threading
+from backends import CompletionBackend, CompletionResult
+from persona_generator import generate_personas
+from questions import QUESTIONNAIRE_FIELDS
+from results_journal import ResultsJournal, is_complete_result
+from simulation_engine import run_simulation
+
+class CountingBackend(CompletionBackend):
+    """Answers every questionnaire with valid values and counts the requests."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def complete(self, messages, max_tokens, temperature, response_format=None):
+        with self._lock:
+            self.calls += 1
+        return CompletionResult("\n".join(f"{name}: 3" for name in QUESTIONNAIRE_FIELDS["Combined"]))
+
+def simulate(personas, journal, backend):
+    return run_simulation(personas, "Old dashboard", "New dashboard", concurrency=4, journal=journal,
+                          backend=backend, delay=0)
+
+def test_resume_skips_recorded_pairs(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    personas = generate_personas(4)
+    first_backend = CountingBackend()
+    journal = ResultsJournal(path)
+    rows = simulate(personas, journal, first_backend)
+    journal.close()
+    assert first_backend.calls > 0
+
+    resumed = ResultsJournal(path, resume=True)
+    assert resumed.completed == {(p["id"], label) for p in personas for label in ("Original", "Adaptive")}
+    second_backend = CountingBackend()
+    resumed_rows = simulate(personas, resumed, second_backend)
+    resumed.close()
+    assert second_backend.calls == 0
+    assert resumed_rows == rows
+
+def test_resume_reruns_failed_pairs(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    personas = generate_personas(2)
+    journal = ResultsJournal(path)
+    journal.record(personas[0]["id"], "Original", {"Original_Raw_SUS": "SUS_1: 3"})
+    journal.record(personas[0]["id"], "Adaptive", {"Adaptive_Raw_SUS": "ERROR: timed out"})
+    journal.record(personas[1]["id"], "Original", {"Original_Raw_SUS": "SUS_1: 3"})
+    journal.record(personas[1]["id"], "Original", {"Original_Raw_SUS": "ERROR: timed out"})  # A later failure wins
+    journal.close()
+
+    resumed = ResultsJournal(path, resume=True)
+    resumed.close()
+    assert resumed.completed == {(personas[0]["id"], "Original")}
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    personas = generate_personas(1)
+    journal = ResultsJournal(str(path))
+    journal.record(personas[0]["id"], "Original", {"Original_SUS_1": 4})
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "result", "persona_id": ')  # Crash mid-write
+
+    resumed = ResultsJournal(str(path), resume=True)
+    rows = resumed.build_rows(personas)
+    resumed.close()
+    assert rows[0]["Original_SUS_1"] == 4
+    assert is_complete_result({"Original_Raw_SUS": "SUS_1: 4"})
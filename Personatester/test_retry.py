@@ -0,0 +1,59 @@
+import threading
+import time
+import pytest
+from backends import CompletionBackend
+from conversation import request_completion
+from retry import CircuitBreaker, RetryPolicy
+
+class StatusError(Exception):
+    """API error with an HTTP status, as is_transient_error reads it."""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class FailingBackend(CompletionBackend):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def complete(self, messages, max_tokens, temperature, response_format=None):
+        raise StatusError(self.status_code)
+
+def half_open_breaker():
+    breaker = CircuitBreaker(window=2, min_calls=2, cooldown=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(0.1)  # Past the cooldown: the next caller becomes the probe
+    return breaker
+
+def waits_less_than(breaker, seconds):
+    """True if a before_call() from another thread returns within `seconds`."""
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: (breaker.before_call(), done.set()), daemon=True)
+    thread.start()
+    return done.wait(seconds)
+
+def test_non_transient_probe_failure_closes_breaker():
+    breaker = half_open_breaker()
+    with pytest.raises(StatusError):
+        request_completion([{"role": "user", "content": "hi"}], 10, 0.0, backend=FailingBackend(400),
+                           retry_policy=RetryPolicy(max_retries=0, circuit_breaker=breaker))
+    assert breaker.state == "closed"
+    assert not breaker._probe_in_flight
+    assert waits_less_than(breaker, 2.0)
+
+def test_transient_probe_failure_reopens_breaker():
+    breaker = half_open_breaker()
+    with pytest.raises(StatusError):
+        request_completion([{"role": "user", "content": "hi"}], 10, 0.0, backend=FailingBackend(503),
+                           retry_policy=RetryPolicy(max_retries=0, circuit_breaker=breaker))
+    assert breaker.state == "open"
+    assert not breaker._probe_in_flight
+
+def test_probe_released_without_outcome():
+    breaker = half_open_breaker()
+    breaker.before_call()  # This thread holds the probe...
+    assert breaker._probe_in_flight
+    breaker.release_probe()  # ...and ends without recording success or failure
+    assert waits_less_than(breaker, 2.0)
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from persona_generator import generate_persona_frame
+from postprocessing import postprocess_results
+from questions import NASA_TLX_SUBSCALES_PAPER
+from rng import persona_random, stream_integers, stream_keys, stream_uniform
+
+def test_streams_depend_only_on_their_key():
+    ids = np.arange(100)
+    values = stream_uniform(7, ids, "Original", "tlx_Effort")
+    assert np.array_equal(values, stream_uniform(7, ids, "Original", "tlx_Effort"))
+    # Another order or another frame gives every persona the same value
+    order = np.random.default_rng(0).permutation(100)
+    assert np.array_equal(stream_uniform(7, ids[order], "Original", "tlx_Effort"), values[order])
+    assert np.array_equal(stream_uniform(7, ids[40:60], "Original", "tlx_Effort"), values[40:60])
+
+def test_key_parts_give_different_streams():
+    ids = np.arange(1000)
+    base = stream_keys(7, ids, "Original", "tlx_Effort")
+    for other in (stream_keys(8, ids, "Original", "tlx_Effort"), stream_keys(7, ids, "Adaptive", "tlx_Effort"),
+                  stream_keys(7, ids, "Original", "tlx_Frustration")):
+        assert not np.any(base == other)
+    assert len(np.unique(base)) == len(ids)
+    first = stream_uniform(7, ids, "Original", "tlx_Effort", draw=0)
+    assert abs(np.corrcoef(first, stream_uniform(7, ids, "Original", "tlx_Effort", draw=1))[0, 1]) < 0.1
+
+def test_ranges_and_string_ids():
+    ids = [f"r-{i:03d}" for i in range(500)]
+    values = stream_uniform(7, ids, "Original", "stage", -2.0, 2.0)
+    assert values.min() >= -2.0 and values.max() < 2.0
+    integers = stream_integers(7, ids, "Original", "stage", -2, 3)
+    assert set(integers) == {-2, -1, 0, 1, 2}
+    assert np.array_equal(stream_uniform(7, ids[:10], "Original", "stage", -2.0, 2.0), values[:10])
+
+def test_persona_random_is_reproducible():
+    first = persona_random(7, 12, "Adaptive", "tlx_fill")
+    second = persona_random(7, 12, "Adaptive", "tlx_fill")
+    assert [first.random() for _ in range(5)] == [second.random() for _ in range(5)]
+    assert persona_random(7, 13, "Adaptive", "tlx_fill").random() != persona_random(7, 12, "Adaptive", "tlx_fill").random()
+
+def results_frame(n):
+    df = generate_persona_frame(n, seed=1)
+    rng = np.random.default_rng(2)
+    for label in ("Original", "Adaptive"):
+        for i in range(1, 11):
+            df[f"{label}_SUS_{i}"] = rng.integers(1, 6, size=n)
+        for subscale in NASA_TLX_SUBSCALES_PAPER:
+            values = rng.integers(0, 22, size=n).astype(float)
+            values[rng.random(n) < 0.2] = np.nan  # Some missing answers get synthesised values
+            df[f"{label}_TLX_{subscale}"] = values
+    return df
+
+def test_postprocessing_does_not_depend_on_the_frame():
+    full = postprocess_results(results_frame(200), run_seed=7)
+    rows = [5, 150, 42, 99]
+    subset = postprocess_results(results_frame(200).iloc[rows].reset_index(drop=True), run_seed=7)
+    pd.testing.assert_frame_equal(subset, full.iloc[rows].reset_index(drop=True))
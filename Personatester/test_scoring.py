@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from analysis import (calculate_sus_score, calculate_tlx_raw, calculate_tlx_weighted, missing_score_report, sus_scores,
+                      tlx_raw_scores, tlx_weighted_scores)
+from questions import NASA_TLX_SUBSCALES
+
+def score_frame(n=300, missing=0.05, empty_row=True):
+    rng = np.random.default_rng(5)
+    columns = {}
+    for prefix in ("Original", "Adaptive"):
+        for i in range(1, 11):
+            columns[f"{prefix}_SUS_{i}"] = rng.integers(1, 6, size=n).astype(float)
+        for subscale in NASA_TLX_SUBSCALES:
+            columns[f"{prefix}_TLX_{subscale['name']}"] = rng.uniform(0, 21, size=n).round(1)
+    df = pd.DataFrame(columns)
+    df[df.columns] = df.mask(rng.random(df.shape) < missing)
+    if empty_row:
+        df.loc[0, [col for col in df.columns if col.startswith("Original_TLX_")]] = np.nan  # No subscale at all
+    return df
+
+def scalar_scores(df, function, prefix, **kwargs):
+    return df.apply(lambda row: function(row, prefix, **kwargs), axis=1).astype(float).to_numpy()
+
+def test_kernels_match_scalar_scoring(capsys):
+    df = score_frame()
+    weights = {subscale["name"]: weight for subscale, weight in zip(NASA_TLX_SUBSCALES, [5, 0, 3, 2, 4, 1])}
+    for prefix in ("Original", "Adaptive"):
+        np.testing.assert_allclose(sus_scores(df, prefix), scalar_scores(df, calculate_sus_score, prefix))
+        np.testing.assert_allclose(tlx_raw_scores(df, prefix), scalar_scores(df, calculate_tlx_raw, prefix))
+        np.testing.assert_allclose(tlx_weighted_scores(df, prefix), scalar_scores(df, calculate_tlx_weighted, prefix))
+        np.testing.assert_allclose(tlx_weighted_scores(df, prefix, weights),
+                                   scalar_scores(df, calculate_tlx_weighted, prefix, weights=weights))
+    capsys.readouterr()  # calculate_tlx_raw prints a warning per missing value
+
+def test_missing_columns_give_nan():
+    df = score_frame(n=10, missing=0).drop(columns=["Adaptive_SUS_3", "Adaptive_TLX_Effort"])
+    assert np.isnan(sus_scores(df, "Adaptive")).all()
+    assert np.isnan(tlx_weighted_scores(df, "Adaptive")).all()
+    np.testing.assert_allclose(tlx_raw_scores(df, "Adaptive"), scalar_scores(df, calculate_tlx_raw, "Adaptive"))
+
+def test_missing_score_report_counts_missing_values(capsys):
+    df = score_frame(n=50, missing=0, empty_row=False)
+    df.loc[[3, 7], "Original_SUS_2"] = np.nan
+    assert missing_score_report(df) == {"Original_SUS_2": 2}
+    assert "Original_SUS_2 2" in capsys.readouterr().out
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from persona_generator import generate_persona_frame
+from segmentation_cube import CUBE_METRICS, build_segmentation_cube, load_segmentation_cube, save_segmentation_cube, segment_table
+
+def metrics_frame(n=500):
+    df = generate_persona_frame(n, seed=3)
+    rng = np.random.default_rng(4)
+    for metric in CUBE_METRICS:
+        values = rng.normal(50.0, 15.0, size=n)
+        if metric.startswith("Adaptive"):
+            values[rng.random(n) < 0.1] = np.nan  # Missing scores are left out of the counts
+        df[metric] = values
+    return df
+
+def grouped(df, by):
+    return df.groupby(by, observed=True)[CUBE_METRICS]
+
+def test_single_attributes_match_groupby():
+    df = metrics_frame()
+    cube = build_segmentation_cube(df)
+    for attribute in ("role", "region", "prior_change_experience"):
+        for statistic, expected in (("count", grouped(df, attribute).count()), ("mean", grouped(df, attribute).mean()),
+                                    ("var", grouped(df, attribute).var())):
+            table = segment_table(cube, attribute, CUBE_METRICS, statistic=statistic)
+            np.testing.assert_allclose(table.loc[expected.index.astype(object)].to_numpy(dtype=float),
+                                       expected.to_numpy(dtype=float))
+
+def test_pairs_match_groupby_in_either_order():
+    df = metrics_frame()
+    cube = build_segmentation_cube(df)
+    expected = grouped(df, ["outlook", "tech_savvy"]).mean()
+    index = [tuple(levels) for levels in expected.index.to_flat_index()]
+    for first, second in (("tech_savvy", "outlook"), ("outlook", "tech_savvy")):
+        table = segment_table(cube, first, CUBE_METRICS, attribute_2=second)
+        if first == "tech_savvy":
+            table = table.swaplevel()
+        np.testing.assert_allclose(table.loc[index].to_numpy(dtype=float), expected.to_numpy(dtype=float))
+
+def test_saved_cube_keeps_level_strings(tmp_path):
+    df = metrics_frame(n=100)
+    cube = build_segmentation_cube(df, attributes=["prior_change_experience"], pairs=[])
+    path = tmp_path / "cube.csv"
+    save_segmentation_cube(cube, path)
+    loaded = load_segmentation_cube(path)
+    assert set(loaded["level"]) == {"None", "Some", "Extensive"}
+    pd.testing.assert_frame_equal(segment_table(loaded, "prior_change_experience"),
+                                  segment_table(cube, "prior_change_experience"), check_dtype=False)
@@ -4,6 +4,7 @@ import pandas as pd
 import os
 from questions import NASA_TLX_SUBSCALES_PAPER # Import for TLX subscale names
 from questions import NASA_TLX_SUBSCALES # Import for TLX subscale names
+from segmentation_cube import segment_table
 
 def plot_nasa_tlx_subscales(df, output_dir):
     # Check if we have any non-NaN TLX data before attempting to plot
@@ -265,11 +266,20 @@ def generate_standard_visualizations(df, numeric_cols_from_main, output_dir='vis
 
     print("--- Standard Visualization Generation Complete ---")
 
-def generate_grouped_bar_chart_for_segment(df, segment_attribute, value_columns, title_prefix, y_label, output_dir='visualizations', y_limit=None):
-    if not all(col in df.columns for col in value_columns):
+def generate_grouped_bar_chart_for_segment(df, segment_attribute, value_columns, title_prefix, y_label, output_dir='visualizations', y_limit=None, cube=None):
+    """Bar chart of the mean of `value_columns` per level of `segment_attribute`.
+
+    With a segmentation cube (segmentation_cube.py) the means are read from it instead of grouping
+    `df` again (which may then be None).
+    """
+    if cube is not None:
+        metric_names, attribute_names = set(cube["metric"]), set(cube["attribute"])
+    else:
+        metric_names = attribute_names = set(df.columns)
+    if not all(col in metric_names for col in value_columns):
         print(f"Skipping grouped bar chart for {title_prefix} by {segment_attribute}: one or more value columns missing.")
         return
-    if segment_attribute not in df.columns:
+    if segment_attribute not in attribute_names:
         print(f"Skipping grouped bar chart for {title_prefix} by {segment_attribute}: segment attribute column missing.")
         return
 
@@ -277,10 +287,12 @@ def generate_grouped_bar_chart_for_segment(df, segment_attribute, value_columns,
     try:
         # Group by the segment attribute and calculate the mean of the value columns
         # Ensure that value_columns are numeric before mean calculation
-        for col in value_columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        grouped_data = df.groupby(segment_attribute)[value_columns].mean()
+        if cube is not None:
+            grouped_data = segment_table(cube, segment_attribute, value_columns)
+        else:
+            for col in value_columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            grouped_data = df.groupby(segment_attribute)[value_columns].mean()
         
         if grouped_data.empty:
             print(f"No data to plot for {title_prefix} by {segment_attribute} after grouping.")